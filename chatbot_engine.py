@@ -10,11 +10,15 @@ This module handles the core chatbot logic:
 
 import os
 import re
+import threading
+import time
 from typing import List, Optional, Tuple
 
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
-from knowledge_base import search_knowledge_base, get_knowledge_base_stats
+from knowledge_base import search_knowledge_base, get_knowledge_base_stats, get_source_authority_level
+from lexical_analyzer import analyze_message, get_product_mention_matcher
+from context_compression import CONTEXT_COMPRESSION_ENABLED, compress_contents
 from safety_guardrails import apply_safety_filters, get_system_prompt, filter_response_for_safety, inject_product_links, append_contextual_links
 from database import (
     get_products_under_price,
@@ -60,31 +64,11 @@ def update_session_context(session_id: str, model: str = None, storage: str = No
     if color:
         ctx['color'] = color
     
-    import time
     ctx['last_updated'] = time.time()
 
 def detect_coreference(message: str) -> bool:
     """Detect if the message contains a co-reference to a previous product."""
-    coreference_patterns = [
-        r'\bsame\s*(product|model|phone|device|one)?\b',
-        r'\bthat\s*(one|product|model|phone)?\b',
-        r'\bthis\s*(one|product|model|phone)?\b',
-        r'\bwoh\s*wala\b',  # Hinglish: "that one"
-        r'\bwahi\b',  # Hinglish: "the same"
-        r'\biske\b',  # Hinglish: "of this"
-        r'\bisi\b',  # Hinglish: "of this same"
-        r'\buska\b',  # Hinglish: "of that"
-        r'\bprevious\b',
-        r'\babove\b',
-        r'\bmentioned\b',
-        r'\bvariant\b',  # "256GB variant" implies same product
-        r'\bit\b(?!\s*is)',  # "it" but not "it is"
-    ]
-    message_lower = message.lower()
-    for pattern in coreference_patterns:
-        if re.search(pattern, message_lower):
-            return True
-    return False
+    return analyze_message(message).has_coreference
 
 def merge_with_session_context(session_id: str, parsed_model: str, parsed_storage: str, 
                                 parsed_condition: str, parsed_color: str = None,
@@ -101,6 +85,13 @@ def merge_with_session_context(session_id: str, parsed_model: str, parsed_storag
     final_condition = parsed_condition
     final_color = parsed_color
     
+    # A model named directly in the message beats anything carried over
+    if not final_model:
+        mentioned = get_product_mention_matcher().find_mentions(message, models_only=True)
+        if mentioned:
+            final_model = mentioned[0]
+            print(f"[Session Context] Using model mentioned in message: {final_model}")
+    
     # If no model detected but has co-reference, use session context
     if not final_model and has_coreference and ctx.get('model'):
         final_model = ctx['model']
@@ -254,12 +245,21 @@ def get_compact_product_summary() -> str:
 
 
 def get_openai_client():
-    """Lazy initialization of OpenAI client with validation."""
+    """
+    Lazy initialization of OpenAI client with validation.
+    LLM_TRANSPORT_MODE=record/replay/stub swaps in the offline transport (see llm_transport.py).
+    """
     global _openai_client
     
     if _openai_client is not None:
         return _openai_client
     
+    from llm_transport import get_transport_mode, wrap_client
+    transport_mode = get_transport_mode()
+    if transport_mode in ("replay", "stub"):
+        _openai_client = wrap_client(None, transport_mode)
+        return _openai_client
+    
     api_key = os.environ.get("AI_INTEGRATIONS_OPENAI_API_KEY")
     base_url = os.environ.get("AI_INTEGRATIONS_OPENAI_BASE_URL")
     
@@ -268,10 +268,10 @@ def get_openai_client():
     
     try:
         from openai import OpenAI
-        _openai_client = OpenAI(
+        _openai_client = wrap_client(OpenAI(
             api_key=api_key,
             base_url=base_url
-        )
+        ), transport_mode)
         return _openai_client
     except Exception as e:
         print(f"Error initializing OpenAI client: {e}")
@@ -307,75 +307,15 @@ def detect_price_query(message: str) -> Tuple[bool, Optional[float], Optional[fl
     - "suggest me an iPhone"
     - "kitne ka hai iPhone 12"
     """
-    message_lower = message.lower()
-    
-    price_keywords = [
-        'price', 'cost', 'kitne', 'kitna', 'rupee', 'rs', '₹', 'budget',
-        'under', 'below', 'less than', 'within', 'affordable', 'cheap',
-        'sasta', 'mehnga', 'expensive', 'range', 'between', 'suggest',
-        'recommend', 'best', 'which', 'kaunsa', 'konsa', 'available'
-    ]
-    
-    is_price_query = any(kw in message_lower for kw in price_keywords)
-    
-    if not is_price_query:
-        product_query_patterns = [
-            r'iphone\s*\d+',
-            r'ipad',
-            r'macbook',
-            r'do you have',
-            r'show me',
-            r'list.*products'
-        ]
-        for pattern in product_query_patterns:
-            if re.search(pattern, message_lower):
-                is_price_query = True
-                break
-    
-    max_price = None
-    min_price = None
-    
-    price_patterns = [
-        r'under\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
-        r'below\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
-        r'less than\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
-        r'within\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
-        r'(?:rs\.?|₹)\s*(\d[\d,]*)\s*(?:ke andar|tak|under)',
-        r'(\d[\d,]*)\s*(?:ke andar|tak|rupee|rs)',
-        r'budget\s*(?:of|is)?\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
-    ]
-    
-    for pattern in price_patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            price_str = match.group(1).replace(',', '')
-            max_price = float(price_str)
-            break
-    
-    range_patterns = [
-        r'between\s*(?:rs\.?|₹)?\s*(\d[\d,]*)\s*(?:to|and|-)\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
-        r'(\d[\d,]*)\s*(?:se|to)\s*(\d[\d,]*)',
-    ]
-    
-    for pattern in range_patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            min_price = float(match.group(1).replace(',', ''))
-            max_price = float(match.group(2).replace(',', ''))
-            break
-    
-    category = None
-    if 'iphone' in message_lower:
-        category = 'iPhone'
-    elif 'ipad' in message_lower:
-        category = 'iPad'
-    elif 'macbook' in message_lower or 'mac book' in message_lower:
-        category = 'MacBook'
+    features = analyze_message(message)
     
-    if 'sasta' in message_lower or 'cheapest' in message_lower or 'lowest' in message_lower:
-        is_price_query = True
+    is_price_query = (
+        features.has("price")
+        or features.has_product_query_pattern
+        or features.has("cheapest")
+    )
     
-    return (is_price_query, max_price, min_price, category)
+    return (is_price_query, features.max_price, features.min_price, features.category)
 
 
 def detect_variant_query(message: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
@@ -1088,6 +1028,24 @@ def get_product_context_from_database(message: str, session_id: str = None) -> s
     return "\n".join(context_parts)
 
 
+TRUST_SEARCH_QUERY = "GREST grest.in reviews ratings customer feedback India 2024"
+COMPETITOR_SEARCH_QUERY = "GREST vs {competitor} comparison refurbished phones India reviews 2024"
+
+# Web search results cache: trust/competitor queries are near-constant, so
+# they can be reused for much longer than ad-hoc product spec lookups.
+WEB_SEARCH_CACHE_TTL_SECONDS = {
+    "trust_verification": int(os.environ.get("WEB_SEARCH_TTL_TRUST_SECONDS", 24 * 3600)),
+    "competitor_comparison": int(os.environ.get("WEB_SEARCH_TTL_COMPETITOR_SECONDS", 24 * 3600)),
+}
+WEB_SEARCH_CACHE_DEFAULT_TTL_SECONDS = int(os.environ.get("WEB_SEARCH_TTL_DEFAULT_SECONDS", 3 * 3600))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("WEB_SEARCH_CACHE_MAX_ENTRIES", 256))
+
+_web_search_cache = {}
+_web_search_cache_lock = threading.Lock()
+_web_search_cache_stats = {"hits": 0, "misses": 0}
+_serper_session = None
+
+
 def should_trigger_web_search(message: str) -> Tuple[bool, str, str]:
     """
     Determine if GRESTA should perform a web search.
@@ -1101,61 +1059,112 @@ def should_trigger_web_search(message: str) -> Tuple[bool, str, str]:
     3. Product comparison with NON-GREST products: iPhone vs Realme, Samsung, OnePlus, etc.
     4. Specifications of non-Apple products
     """
-    message_lower = message.lower()
-    
-    non_apple_brands = [
-        'realme', 'samsung', 'oneplus', 'one plus', 'xiaomi', 'redmi', 'poco',
-        'vivo', 'oppo', 'motorola', 'moto', 'nokia', 'google pixel', 'pixel',
-        'nothing', 'iqoo', 'tecno', 'infinix', 'asus', 'rog', 'huawei', 'honor',
-        'mi ', 'note ', 'galaxy', 'a52', 'a53', 'a54', 's21', 's22', 's23', 's24'
-    ]
+    features = analyze_message(message)
     
-    has_non_apple = any(brand in message_lower for brand in non_apple_brands)
-    
-    if has_non_apple:
-        if re.search(r'(vs|versus|compare|comparison|difference|better|or)\b', message_lower):
+    if features.has("non_apple_brand"):
+        if features.triggers("external_comparison"):
             return (True, f"{message} comparison specifications features India", "external_product_comparison")
         
-        if re.search(r'(spec|specification|feature|camera|display|battery|price)', message_lower):
+        if features.triggers("external_spec_terms"):
             return (True, f"{message} specifications features India 2024", "external_product_specs")
     
-    trust_keywords = [
-        'trust', 'trustpilot', 'mouthshut', 'review', 'rating', 'ratings',
-        'reliable', 'genuine', 'fake', 'scam', 'fraud', 'legitimate',
-        'bharosa', 'vishwas', 'reputation', 'feedback', 'experience',
-        'safe to buy', 'is grest good', 'grest review'
-    ]
-    
-    if any(kw in message_lower for kw in trust_keywords):
-        return (True, "GREST grest.in reviews ratings customer feedback India 2024", "trust_verification")
-    
-    competitor_keywords = [
-        'cashify', 'togofogo', 'yaantra', 'budli', 'quikr', 'olx',
-        'other seller', 'competitor', 'vs other', 'dusra seller',
-        'why grest', 'why should i buy from grest', 'better than',
-        'kyon grest', 'grest kyun', 'grest se kyun', 'why not'
-    ]
+    if features.has("trust"):
+        return (True, TRUST_SEARCH_QUERY, "trust_verification")
     
-    if any(kw in message_lower for kw in competitor_keywords):
-        competitor = "cashify" if "cashify" in message_lower else "refurbished phone sellers"
-        return (True, f"GREST vs {competitor} comparison refurbished phones India reviews 2024", "competitor_comparison")
+    if features.has("competitor"):
+        competitor = "cashify" if "cashify" in features.matched("competitor") else "refurbished phone sellers"
+        return (True, COMPETITOR_SEARCH_QUERY.format(competitor=competitor), "competitor_comparison")
     
-    if re.search(r'(iphone|ipad|macbook).*(vs|versus|compare|difference|better).*(iphone|ipad|macbook)', message_lower):
+    if features.triggers("apple_comparison"):
         return (True, f"{message} comparison specifications features", "apple_product_comparison")
     
-    if re.search(r'difference between.*and|compare.*with|which is better', message_lower):
+    if features.triggers("generic_comparison"):
         return (True, f"{message} comparison specifications", "product_comparison")
     
-    non_grest_specs = re.search(
-        r'(specs?|specifications?|features?)\s*(of|for)?\s*(realme|samsung|oneplus|xiaomi|redmi|poco|vivo|oppo|motorola|nokia|pixel)',
-        message_lower
-    )
-    if non_grest_specs:
+    if features.triggers("non_grest_specs"):
         return (True, f"{message} specifications features India 2024", "external_product_specs")
     
     return (False, "", "")
 
 
+def _get_serper_session():
+    """Keep-alive HTTP session for Serper so repeated searches reuse the TLS connection."""
+    global _serper_session
+    if _serper_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+        _serper_session = session
+    return _serper_session
+
+
+def _web_search_cache_key(query: str, category: str) -> Tuple[str, str]:
+    return (" ".join(query.lower().split()), category)
+
+
+def _get_cached_web_search(cache_key: Tuple[str, str]) -> Optional[str]:
+    with _web_search_cache_lock:
+        entry = _web_search_cache.get(cache_key)
+        if entry and entry[0] > time.time():
+            _web_search_cache_stats["hits"] += 1
+            return entry[1]
+        if entry:
+            del _web_search_cache[cache_key]
+        _web_search_cache_stats["misses"] += 1
+        return None
+
+
+def _store_cached_web_search(cache_key: Tuple[str, str], category: str, results: str):
+    ttl = WEB_SEARCH_CACHE_TTL_SECONDS.get(category, WEB_SEARCH_CACHE_DEFAULT_TTL_SECONDS)
+    if ttl <= 0:
+        return
+    
+    with _web_search_cache_lock:
+        if len(_web_search_cache) >= WEB_SEARCH_CACHE_MAX_ENTRIES:
+            now = time.time()
+            for key in [k for k, (expires, _) in _web_search_cache.items() if expires <= now]:
+                del _web_search_cache[key]
+            while len(_web_search_cache) >= WEB_SEARCH_CACHE_MAX_ENTRIES:
+                oldest = min(_web_search_cache, key=lambda k: _web_search_cache[k][0])
+                del _web_search_cache[oldest]
+        _web_search_cache[cache_key] = (time.time() + ttl, results)
+
+
+def get_web_search_cache_stats() -> dict:
+    """Get web search cache size and hit/miss counters."""
+    with _web_search_cache_lock:
+        return {
+            "entries": len(_web_search_cache),
+            "hits": _web_search_cache_stats["hits"],
+            "misses": _web_search_cache_stats["misses"],
+        }
+
+
+def prewarm_web_search_cache() -> int:
+    """
+    Refresh the cached results for the fixed trust and competitor queries.
+    Returns the number of queries that came back with results.
+    """
+    queries = [
+        (TRUST_SEARCH_QUERY, "trust_verification"),
+        (COMPETITOR_SEARCH_QUERY.format(competitor="cashify"), "competitor_comparison"),
+        (COMPETITOR_SEARCH_QUERY.format(competitor="refurbished phone sellers"), "competitor_comparison"),
+    ]
+    
+    warmed = 0
+    for query, category in queries:
+        # Fetch before touching the cache: a failed refresh keeps the entry still valid
+        results = _fetch_web_search(query, category)
+        if results:
+            _store_cached_web_search(_web_search_cache_key(query, category), category, results)
+            warmed += 1
+    
+    print(f"[Web Search] Pre-warmed {warmed}/{len(queries)} cached queries")
+    return warmed
+
+
 def perform_web_search(query: str, category: str) -> str:
     """
     Perform a real web search using Serper.dev API.
@@ -1167,6 +1176,20 @@ def perform_web_search(query: str, category: str) -> str:
     3. Competitor comparisons (GREST vs Cashify, Togofogo, etc.)
     4. External reviews and trust verification
     """
+    cache_key = _web_search_cache_key(query, category)
+    cached = _get_cached_web_search(cache_key)
+    if cached is not None:
+        print(f"[Web Search] Cache hit for: {query}")
+        return cached
+    
+    search_results = _fetch_web_search(query, category)
+    if search_results:
+        _store_cached_web_search(cache_key, category, search_results)
+    return search_results
+
+
+def _fetch_web_search(query: str, category: str) -> str:
+    """Run one Serper search and format the results (no caching). Returns "" on failure."""
     try:
         import requests
         
@@ -1187,7 +1210,7 @@ def perform_web_search(query: str, category: str) -> str:
             "num": 5
         }
         
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = _get_serper_session().post(url, headers=headers, json=payload, timeout=10)
         
         if response.status_code != 200:
             print(f"[Web Search] Serper API returned status {response.status_code}: {response.text}")
@@ -1255,8 +1278,7 @@ def get_web_search_context(message: str) -> str:
     if not should_search:
         return ""
     
-    forbidden_topics = ['medical', 'doctor', 'medicine', 'legal', 'lawyer', 'financial', 'investment']
-    if any(topic in message.lower() for topic in forbidden_topics):
+    if analyze_message(message).has("forbidden_topic"):
         return ""
     
     print(f"[Web Search] Triggered for category: {category}, query: {search_query}")
@@ -1342,57 +1364,20 @@ SPECIFICATIONS:
     return ""
 
 
-def get_source_authority_level(source: str) -> tuple:
-    """
-    Assign authority level to sources. Lower number = higher authority.
-    Returns (authority_level, source_type_label).
-    
-    Authority Hierarchy:
-    1. GREST official policy documents (warranty, refund, shipping policies)
-    2. Official FAQ page
-    3. Contact info and about pages
-    4. Custom knowledge base documents (curated by admin)
-    5. Product collection pages
-    6. Individual product pages (least authoritative - may have simplified info)
-    """
-    source_lower = source.lower()
-    
-    # Level 1: Official policy documents (MOST AUTHORITATIVE)
-    if any(x in source_lower for x in ['warranty_policy', 'grest_warranty', 'refund_policy', 'shipping_policy']):
-        return (1, "OFFICIAL POLICY - HIGHEST AUTHORITY")
-    if '/policies/' in source_lower or '/pages/warranty' in source_lower:
-        return (1, "OFFICIAL POLICY - HIGHEST AUTHORITY")
-    
-    # Level 2: FAQ page (official answers)
-    if '/pages/faq' in source_lower or 'faqs' in source_lower:
-        return (2, "OFFICIAL FAQ")
-    
-    # Level 3: Contact and about pages
-    if any(x in source_lower for x in ['contact', 'about', 'grest_contact']):
-        return (3, "OFFICIAL INFO")
-    
-    # Level 4: Curated knowledge base docs
-    if source_lower.endswith('.txt') and 'grest_' in source_lower:
-        return (4, "CURATED DOCUMENT")
-    
-    # Level 5: Collection pages
-    if '/collections/' in source_lower:
-        return (5, "PRODUCT COLLECTION")
-    
-    # Level 6: Individual product pages (LEAST AUTHORITATIVE for policies)
-    if '/products/' in source_lower:
-        return (6, "PRODUCT PAGE - may contain simplified info")
-    
-    # Default: Unknown source
-    return (7, "GENERAL INFO")
-
-
-def format_context_from_docs(documents: List[dict]) -> str:
+def format_context_from_docs(documents: List[dict], query: Optional[str] = None,
+                             compress: Optional[bool] = None) -> str:
     """
     Format retrieved documents into context for the LLM.
     Aggregates chunks by source URL and sorts by authority level.
     Higher authority sources appear first with clear labels.
+    
+    When compression is on (CONTEXT_COMPRESSION, or compress=True) and a query
+    is given, each source keeps only its sentences most relevant to the query,
+    within CONTEXT_SOURCE_CHAR_BUDGET characters.
     """
+    if compress is None:
+        compress = CONTEXT_COMPRESSION_ENABLED
+    
     if not documents:
         return "No relevant information found in the knowledge base."
     
@@ -1403,7 +1388,10 @@ def format_context_from_docs(documents: List[dict]) -> str:
         content = doc.get("content", "")
         
         if source not in source_data:
-            authority_level, authority_label = get_source_authority_level(source)
+            authority_level = doc.get("authority_level")
+            authority_label = doc.get("authority_label")
+            if authority_level is None or not authority_label:
+                authority_level, authority_label = get_source_authority_level(source)
             source_data[source] = {
                 'contents': [],
                 'authority_level': authority_level,
@@ -1417,7 +1405,10 @@ def format_context_from_docs(documents: List[dict]) -> str:
     # Format with authority labels
     context_parts = []
     for i, (source, data) in enumerate(sorted_sources, 1):
-        combined_content = "\n\n".join(data['contents'])
+        if compress and query:
+            combined_content = compress_contents(query, data['contents'])
+        else:
+            combined_content = "\n\n".join(data['contents'])
         authority_label = data['authority_label']
         context_parts.append(f"[Source {i} - {authority_label}: {source}]\n{combined_content}")
     
@@ -1449,43 +1440,25 @@ def build_context_aware_query(user_message: str, conversation_history: List[dict
     if not conversation_history:
         return user_message
     
-    product_names = [
-        "iPhone 12", "iPhone 13", "iPhone 14", "iPhone 15",
-        "iPhone 12 Pro", "iPhone 13 Pro", "iPhone 14 Pro", "iPhone 15 Pro",
-        "iPhone 12 Pro Max", "iPhone 13 Pro Max", "iPhone 14 Pro Max", "iPhone 15 Pro Max",
-        "MacBook Air", "MacBook Pro", "MacBook Air M1", "MacBook Air M2",
-        "MacBook Pro M1", "MacBook Pro M2", "refurbished", "warranty"
-    ]
-    
-    message_lower = user_message.lower()
-    
-    follow_up_indicators = [
-        "this", "that", "it", "the product", "the phone", "the macbook",
-        "more details", "more information", "tell me more",
-        "details", "about it", "learn more", "know more",
-        "give me", "share more", "explain", "what is it",
-        "how does it", "how much", "price", "cost", "specs",
-        "buy", "order", "purchase", "warranty", "delivery"
-    ]
-    
-    product_typo_patterns = ["iphone", "macbook", "phone", "laptop", "product"]
+    features = analyze_message(user_message)
     
-    has_follow_up = any(phrase in message_lower for phrase in follow_up_indicators)
-    has_product_reference = any(pattern in message_lower for pattern in product_typo_patterns)
-    is_short_query = len(user_message.split()) <= 8
+    has_follow_up = features.has("follow_up")
+    has_product_reference = features.has("product_reference")
+    is_short_query = features.word_count <= 8
     
     should_add_context = has_follow_up or (has_product_reference and is_short_query)
     
     if not should_add_context:
         return user_message
     
+    matcher = get_product_mention_matcher()
     recent_products = []
     for msg in reversed(conversation_history[-6:]):
-        content = msg.get("content", "")
-        for product in product_names:
-            if product.lower() in content.lower():
-                if product not in recent_products:
-                    recent_products.append(product)
+        for product in matcher.find_mentions(msg.get("content", "")):
+            if product not in recent_products:
+                recent_products.append(product)
+        if len(recent_products) >= 3:
+            break
     
     if recent_products:
         context_str = " ".join(recent_products[:3])
@@ -1607,8 +1580,12 @@ def generate_response(
         }
     
     search_query = build_context_aware_query(user_message, conversation_history)
-    relevant_docs = search_knowledge_base(search_query, n_results=n_context_docs)
-    context = format_context_from_docs(relevant_docs)
+    relevant_docs = search_knowledge_base(
+        search_query,
+        n_results=n_context_docs,
+        prefer_authoritative=analyze_message(user_message).has("policy")
+    )
+    context = format_context_from_docs(relevant_docs, query=search_query)
     
     parsed_intent = parse_query_with_llm(user_message)
     
@@ -1777,8 +1754,12 @@ def generate_response_stream(
         return
     
     search_query = build_context_aware_query(user_message, conversation_history)
-    relevant_docs = search_knowledge_base(search_query, n_results=n_context_docs)
-    context = format_context_from_docs(relevant_docs)
+    relevant_docs = search_knowledge_base(
+        search_query,
+        n_results=n_context_docs,
+        prefer_authoritative=analyze_message(user_message).has("policy")
+    )
+    context = format_context_from_docs(relevant_docs, query=search_query)
     
     parsed_intent = parse_query_with_llm(user_message)
     
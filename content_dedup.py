@@ -0,0 +1,141 @@
+"""
+Content Deduplication for Website Ingestion
+
+Shopify pages repeat the same header, footer, announcement bar and
+collection-grid text on every page. Two passes keep that out of the index:
+
+1. strip_boilerplate_lines: lines that appear on many crawled pages are
+   site chrome and are removed from every page. Keeping one copy would
+   attach it to whichever page comes first - with the priority crawl, the
+   most authoritative policy page.
+2. ChunkDeduplicator: after chunking, exact duplicates (same text) and near
+   duplicates (MinHash over word shingles, banded LSH, estimated Jaccard at
+   or above a threshold) of an already-kept chunk are dropped.
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+BOILERPLATE_MIN_PAGES = int(os.environ.get("KB_BOILERPLATE_MIN_PAGES", 4))
+BOILERPLATE_PAGE_FRACTION = float(os.environ.get("KB_BOILERPLATE_PAGE_FRACTION", 0.3))
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("KB_NEAR_DUPLICATE_THRESHOLD", 0.85))
+
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 8  # 8 bands x 8 rows: candidate pairs from roughly 0.77 Jaccard up
+
+_MERSENNE_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_WORD = re.compile(r"\w+")
+
+
+def normalize_line(line: str) -> str:
+    return " ".join(line.lower().split())
+
+
+def strip_boilerplate_lines(documents: List[dict], min_pages: int = BOILERPLATE_MIN_PAGES,
+                            page_fraction: float = BOILERPLATE_PAGE_FRACTION) -> Tuple[List[dict], dict]:
+    """
+    Remove lines repeated across pages (site chrome) from crawled documents.
+
+    A line is boilerplate when it appears on at least max(min_pages,
+    page_fraction * pages) pages. Documents keep their order and all other keys.
+
+    Returns (documents, stats).
+    """
+    page_lines = [{normalize_line(line) for line in doc["content"].split("\n") if line.strip()} for doc in documents]
+    frequency = Counter(line for lines in page_lines for line in lines)
+    cutoff = max(min_pages, int(page_fraction * len(documents) + 0.5))
+    boilerplate = {line for line, pages in frequency.items() if pages >= cutoff}
+
+    cleaned = []
+    lines_removed = 0
+    chars_before = chars_after = 0
+    for doc in documents:
+        kept_lines = []
+        for line in doc["content"].split("\n"):
+            key = normalize_line(line)
+            if key in boilerplate:
+                lines_removed += 1
+                continue
+            kept_lines.append(line)
+        content = "\n".join(kept_lines)
+        chars_before += len(doc["content"])
+        chars_after += len(content)
+        cleaned.append({**doc, "content": content})
+
+    stats = {
+        "pages": len(documents),
+        "boilerplate_lines": len(boilerplate),
+        "lines_removed": lines_removed,
+        "chars_removed": chars_before - chars_after,
+    }
+    return cleaned, stats
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+        dtype=np.uint64
+    )
+
+
+class ChunkDeduplicator:
+    """Streaming exact + near-duplicate filter; call is_duplicate() in priority order."""
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, permutations: int = MINHASH_PERMUTATIONS,
+                 bands: int = LSH_BANDS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.rows = permutations // bands
+        self.bands = bands
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=permutations, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=permutations, dtype=np.uint64)
+        self._exact = set()
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: List[np.ndarray] = []
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = _shingle_hashes(text)
+        # (a*x + b) mod p stays below 2**64 because a, b, x < 2**32
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def is_duplicate(self, text: str) -> bool:
+        """True if text duplicates a previously kept chunk; otherwise remember it and return False."""
+        key = hashlib.sha256(normalize_line(text).encode("utf-8")).digest()
+        if key in self._exact:
+            self.exact_duplicates += 1
+            return True
+
+        signature = self.signature(text)
+        bands = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        candidates = {index for band in bands for index in self._buckets.get(band, ())}
+        for index in candidates:
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                self.near_duplicates += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        self._exact.add(key)
+        for band in bands:
+            self._buckets.setdefault(band, []).append(index)
+        return False
+
+    def get_stats(self) -> dict:
+        return {
+            "chunks_kept": len(self._signatures),
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+        }
@@ -0,0 +1,152 @@
+"""
+Extractive Context Compression for GRESTA
+
+Retrieved chunks are ~1,000 characters, but usually only a sentence or two
+answers the question. When CONTEXT_COMPRESSION is enabled, each source's
+chunks are split into sentences, the sentences are scored against the query,
+and only the best ones are kept, up to CONTEXT_SOURCE_CHAR_BUDGET characters
+per source, in their original order.
+
+Scoring is lexical: IDF-weighted overlap between query terms and sentence
+terms, with IDF computed over the sentences retrieved for this turn. With
+CONTEXT_COMPRESSION_MODE=embedding, cosine similarity to the query embedding
+is blended in; the query vector comes from the embedding service cache, so
+only the sentences are embedded.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from typing import List
+
+CONTEXT_COMPRESSION_ENABLED = os.environ.get("CONTEXT_COMPRESSION", "false").lower() == "true"
+CONTEXT_COMPRESSION_MODE = os.environ.get("CONTEXT_COMPRESSION_MODE", "lexical").lower()
+CONTEXT_SOURCE_CHAR_BUDGET = int(os.environ.get("CONTEXT_SOURCE_CHAR_BUDGET", 600))
+
+# Sentences shorter than this are merged into the following sentence
+MIN_SENTENCE_CHARS = 25
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(₹])|\n+')
+_TERM = re.compile(r"[a-z0-9₹]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the this to what when where which who why will with you your we our us "
+    "hai kya ka ki ke ko se me mein".split()
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences (and lines), merging fragments that are too short."""
+    sentences = []
+    carry = ""
+    for piece in _SENTENCE_BOUNDARY.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        piece = f"{carry} {piece}".strip() if carry else piece
+        if len(piece) < MIN_SENTENCE_CHARS:
+            carry = piece
+            continue
+        sentences.append(piece)
+        carry = ""
+    if carry:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {carry}"
+        else:
+            sentences.append(carry)
+    return sentences
+
+
+def tokenize(text: str) -> List[str]:
+    terms = []
+    for term in _TERM.findall(text.lower()):
+        if term in STOPWORDS:
+            continue
+        # crude plural folding so "warranties"/"warranty", "iphones"/"iphone" match
+        if len(term) > 4 and term.endswith("ies"):
+            term = term[:-3] + "y"
+        elif len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def _lexical_scores(query: str, sentences: List[str]) -> List[float]:
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return [0.0] * len(sentences)
+
+    sentence_terms = [set(tokenize(sentence)) for sentence in sentences]
+    document_frequency = Counter(term for terms in sentence_terms for term in terms & query_terms)
+    total = len(sentences)
+    idf = {term: math.log(1 + total / (1 + document_frequency[term])) for term in query_terms}
+    max_score = sum(idf.values())
+
+    return [sum(idf[term] for term in terms & query_terms) / max_score for terms in sentence_terms]
+
+
+def _embedding_scores(query: str, sentences: List[str]) -> List[float]:
+    from embedding_service import get_embedding_service
+    from knowledge_base import get_embedding_function
+
+    query_vector = get_embedding_service().embed_query(query)
+    # Sentences go straight to the model: passing them through the query
+    # service would evict real query embeddings from its LRU cache
+    scores = []
+    for vector in get_embedding_function()(sentences):
+        dot = sum(a * b for a, b in zip(query_vector, vector))
+        norm = math.sqrt(sum(a * a for a in query_vector)) * math.sqrt(sum(b * b for b in vector))
+        scores.append(dot / norm if norm else 0.0)
+    return scores
+
+
+def score_sentences(query: str, sentences: List[str], mode: str = "lexical") -> List[float]:
+    scores = _lexical_scores(query, sentences)
+    if mode == "embedding" and sentences:
+        try:
+            semantic = _embedding_scores(query, sentences)
+            scores = [0.5 * lexical + 0.5 * max(0.0, cosine) for lexical, cosine in zip(scores, semantic)]
+        except Exception as e:
+            print(f"Embedding sentence scoring failed, using lexical scores: {e}")
+    return scores
+
+
+def compress_contents(query: str, contents: List[str], char_budget: int = None, mode: str = None) -> str:
+    """
+    Keep the sentences of one source's chunks that best match the query.
+
+    The top-scoring sentence is always kept; further matching sentences are
+    added in score order while they fit in char_budget. If nothing matches,
+    the leading sentences are kept. Output keeps document order.
+    """
+    char_budget = CONTEXT_SOURCE_CHAR_BUDGET if char_budget is None else char_budget
+    mode = CONTEXT_COMPRESSION_MODE if mode is None else mode
+    combined = "\n\n".join(contents)
+    if len(combined) <= char_budget:
+        return combined
+
+    sentences = []
+    for content in contents:
+        for sentence in split_sentences(content):
+            if sentence not in sentences:
+                sentences.append(sentence)
+    if not sentences:
+        return combined
+
+    scores = score_sentences(query, sentences, mode)
+    if max(scores) <= 0:
+        # nothing matches lexically: fall back to the leading sentences
+        scores = [1.0] * len(sentences)
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+
+    selected = []
+    used = 0
+    for i in ranked:
+        if selected and (scores[i] <= 0 or used + len(sentences[i]) > char_budget):
+            continue
+        selected.append(i)
+        used += len(sentences[i]) + 1
+
+    return "\n".join(sentences[i] for i in sorted(selected))
@@ -10,7 +10,7 @@ PostgreSQL database for:
 
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Numeric
+from sqlalchemy import create_engine, inspect, text, Column, Integer, BigInteger, String, Text, Boolean, DateTime, Float, ForeignKey, UniqueConstraint, Numeric
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from contextlib import contextmanager
 
@@ -147,10 +147,21 @@ class GRESTProduct(Base):
     image_url = Column(String(500), nullable=True)
     description = Column(Text, nullable=True)
     specifications = Column(Text, nullable=True)
+    row_hash = Column(String(64), nullable=True)  # sha256 of the synced content, see scrape_grest_products.row_hash
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class ShopifyMetafieldCache(Base):
+    """Parsed product metafield specs, valid while the product's updated_at is unchanged."""
+    __tablename__ = "shopify_metafield_cache"
+    
+    product_id = Column(BigInteger, primary_key=True)
+    product_updated_at = Column(String(40), nullable=True)
+    specs = Column(Text, nullable=False)  # JSON dict from specs_from_metafields
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class SyncRun(Base):
     """Tracks Shopify sync runs for monitoring and auditing."""
     __tablename__ = "sync_runs"
@@ -164,9 +175,14 @@ class SyncRun(Base):
     products_created = Column(Integer, default=0)
     products_updated = Column(Integer, default=0)
     products_deleted = Column(Integer, default=0)
+    products_unchanged = Column(Integer, nullable=True)  # upserted variants whose content was unchanged
     shopify_product_count = Column(Integer, nullable=True)
     db_product_count = Column(Integer, nullable=True)
     error_log = Column(Text, nullable=True)
+    sync_mode = Column(String(10), nullable=True)  # 'full' | 'delta' (NULL on runs before delta sync: full)
+    api_calls = Column(Integer, nullable=True)  # Shopify REST calls made
+    api_calls_saved = Column(Integer, nullable=True)  # delta runs: vs the last full sync
+    seconds_saved = Column(Float, nullable=True)  # delta runs: vs the last full sync
     
     events = relationship("SyncRunEvent", back_populates="sync_run", cascade="all, delete-orphan")
 
@@ -184,10 +200,43 @@ class SyncRunEvent(Base):
     sync_run = relationship("SyncRun", back_populates="events")
 
 
+# Columns added to existing tables after their first release. create_all()
+# only creates missing tables, so these are added with ALTER TABLE.
+ADDED_COLUMNS = {
+    "grest_products": ["row_hash"],
+    "sync_runs": ["sync_mode", "api_calls", "api_calls_saved", "seconds_saved", "products_unchanged"],
+}
+
+_columns_checked = False
+
+
+def _add_missing_columns():
+    """Add ADDED_COLUMNS that an existing table doesn't have yet (once per process)."""
+    global _columns_checked
+    if _columns_checked:
+        return
+    
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, column_names in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            table = Base.metadata.tables[table_name]
+            for name in column_names:
+                if name in existing:
+                    continue
+                column_type = table.columns[name].type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {name} {column_type}"))
+                print(f"Added column {table_name}.{name}")
+    _columns_checked = True
+
+
 def init_database():
     """Initialize database tables."""
     if engine:
         Base.metadata.create_all(bind=engine)
+        _add_missing_columns()
         return True
     return False
 
@@ -393,6 +442,19 @@ def get_all_products(category: str = None, in_stock_only: bool = True):
         ]
 
 
+def get_catalog_model_names():
+    """
+    Get the distinct (name, model_key) pairs in the product catalog.
+    Used to compile the product mention matcher.
+    """
+    with get_db_session() as db:
+        if db is None:
+            return []
+        
+        rows = db.query(GRESTProduct.name, GRESTProduct.model_key).distinct().all()
+        return [(name, model_key) for name, model_key in rows if name]
+
+
 def get_product_by_name(name: str):
     """
     Search for products by name (case-insensitive partial match).
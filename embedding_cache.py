@@ -0,0 +1,133 @@
+"""
+Embedding Cache for GRESTA Knowledge Base
+
+Persistent cache of chunk embeddings keyed by (content hash, embedding model),
+so re-ingesting unchanged text - e.g. the full website rebuild on cold start -
+skips the embedding model entirely and only embeds new or changed chunks.
+
+Stored in a single SQLite file next to the vector database. Vectors are kept
+as packed float32 blobs.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+EMBEDDING_CACHE_PATH = Path(os.environ.get("KB_EMBEDDING_CACHE_PATH", "vector_db/embedding_cache.sqlite3"))
+EMBEDDING_CACHE_ENABLED = os.environ.get("KB_EMBEDDING_CACHE", "true").lower() != "false"
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def content_hash(text: str) -> str:
+    """Hash of the exact chunk text (source-independent, unlike generate_doc_id)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed (content_hash, model) -> vector store."""
+
+    def __init__(self, path: Path = EMBEDDING_CACHE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " content_hash TEXT NOT NULL,"
+                " model TEXT NOT NULL,"
+                " dim INTEGER NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (content_hash, model))"
+            )
+        return self._conn
+
+    def get_many(self, hashes: Sequence[str], model: str) -> Dict[str, List[float]]:
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                part = unique[i:i + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(part))
+                rows = conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? AND content_hash IN ({placeholders})",
+                    [model, *part]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, Sequence[float]], model: str):
+        if not items:
+            return
+        rows = [
+            (key, model, len(vector), array("f", vector).tobytes())
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_hash, model, dim, vector) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+    def embed(self, texts: List[str], model: str, embed_fn: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Return embeddings for texts, calling embed_fn only for cache misses."""
+        hashes = [content_hash(text) for text in texts]
+        cached = self.get_many(hashes, model)
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.put_many(fresh, model)
+            cached.update(fresh)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        return [cached[key] for key in hashes]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            entries = 0
+            if self.path.exists():
+                entries = self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "path": str(self.path),
+            }
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide embedding cache."""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
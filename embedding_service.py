@@ -0,0 +1,170 @@
+"""
+Embedding Service for GRESTA
+
+Shared front end to the knowledge base embedding function for query-time
+embeddings:
+
+- LRU cache of query embeddings keyed by a normalized query string, so
+  repeated questions ("warranty?", "Warranty") are embedded once
+- micro-batching: concurrent requests are queued for a few milliseconds and
+  embedded together in one model call
+- single-flight: concurrent requests for the same normalized query share
+  one pending result
+
+Vectors are passed to Chroma with `query_embeddings=` and can be reused by
+any other component that needs the same query vector.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", 5))
+EMBEDDING_MAX_BATCH = int(os.environ.get("EMBEDDING_MAX_BATCH", 32))
+
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.,;:]+$')
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = " ".join((text or "").lower().split())
+    return _TRAILING_PUNCTUATION.sub("", text) or text
+
+
+class EmbeddingService:
+    """Query embedding with LRU caching and micro-batched model calls."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+        batch_window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+        max_batch: int = EMBEDDING_MAX_BATCH
+    ):
+        self.embed_fn = embed_fn
+        self.cache_size = cache_size
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max(1, max_batch)
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._pending: List[str] = []
+        self._wakeup = threading.Condition(self._lock)
+        self._dispatcher: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_texts = 0
+
+    def embed_query(self, text: str, timeout: float = 30) -> List[float]:
+        """Embedding for one query, from cache or the next micro-batch."""
+        return self.embed_many([text], timeout=timeout)[0]
+
+    def embed_many(self, texts: List[str], timeout: float = 30) -> List[List[float]]:
+        """Embeddings for several queries; misses are batched together."""
+        keys = [normalize_query(text) for text in texts]
+        futures: Dict[str, Future] = {}
+        results: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in results or key in futures:
+                    continue
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[key] = self._cache[key]
+                    self.hits += 1
+                elif key in self._in_flight:
+                    futures[key] = self._in_flight[key]
+                    self.coalesced += 1
+                else:
+                    future = Future()
+                    self._in_flight[key] = future
+                    self._pending.append(key)
+                    futures[key] = future
+                    self.misses += 1
+            if futures:
+                self._ensure_dispatcher_locked()
+                self._wakeup.notify()
+
+        for key, future in futures.items():
+            results[key] = future.result(timeout=timeout)
+        return [results[key] for key in keys]
+
+    def _ensure_dispatcher_locked(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="embedding-batcher", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+                deadline = time.monotonic() + self.batch_window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            try:
+                vectors = [list(map(float, v)) for v in self.embed_fn(batch)]
+                error = None
+            except Exception as e:
+                vectors = None
+                error = e
+
+            with self._lock:
+                self.batches += 1
+                self.batched_texts += len(batch)
+                for i, key in enumerate(batch):
+                    future = self._in_flight.pop(key, None)
+                    if error is None:
+                        self._cache[key] = vectors[i]
+                        self._cache.move_to_end(key)
+                    if future is not None:
+                        if error is None:
+                            future.set_result(vectors[i])
+                        else:
+                            future.set_exception(error)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "cached_queries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "batches": self.batches,
+                "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else None,
+            }
+
+
+_embedding_service: Optional[EmbeddingService] = None
+_embedding_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Get the process-wide embedding service backed by the knowledge base embedding function."""
+    global _embedding_service
+    with _embedding_service_lock:
+        if _embedding_service is None:
+            from knowledge_base import get_embedding_function
+
+            _embedding_service = EmbeddingService(lambda texts: get_embedding_function()(texts))
+        return _embedding_service
@@ -0,0 +1,206 @@
+"""
+Text Extraction Pipeline for GRESTA
+
+HTML extraction (trafilatura plus the regex fallback) and PDF page extraction
+are CPU-bound. Run on the caller's thread they hold the GIL in the web server
+process, and chat latency suffers while a sync is crawling. This module runs
+them in a pool of worker processes started with "spawn", so workers never
+inherit the server's threads, DB connections or Chroma client.
+
+Work is bounded: at most KB_EXTRACTION_MAX_IN_FLIGHT tasks are queued or
+running at once across all callers, and map() yields results in order as they
+complete, so a large PDF or crawl streams through extraction, validation and
+chunking instead of being held in memory whole.
+
+KB_EXTRACTION_WORKERS=0 runs everything inline (no worker processes).
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator, List, Optional
+
+EXTRACTION_WORKERS = int(os.environ.get("KB_EXTRACTION_WORKERS", min(2, os.cpu_count() or 1)))
+EXTRACTION_MAX_IN_FLIGHT = int(os.environ.get("KB_EXTRACTION_MAX_IN_FLIGHT", max(2, 2 * EXTRACTION_WORKERS)))
+
+# PDF pages handed to a worker per task
+PDF_PAGES_PER_TASK = int(os.environ.get("KB_PDF_PAGES_PER_TASK", 8))
+
+
+def is_valid_text_content(text: str, min_printable_ratio: float = 0.85) -> bool:
+    """
+    Validate that text content is mostly printable characters.
+    Rejects binary/encoded content that would poison the knowledge base.
+    """
+    if not text or len(text.strip()) < 50:
+        return False
+
+    printable_chars = sum(1 for c in text if c.isprintable() or c in '\n\r\t')
+    ratio = printable_chars / len(text)
+
+    return ratio >= min_printable_ratio
+
+
+class ExtractionPipeline:
+    """Bounded process pool for CPU-bound extraction tasks."""
+
+    def __init__(self, workers: int = EXTRACTION_WORKERS, max_in_flight: int = EXTRACTION_MAX_IN_FLIGHT):
+        self.workers = max(0, workers)
+        self.max_in_flight = max(1, max_in_flight)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.tasks_completed = 0
+        self.pool_restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.pool_restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn: Callable, *args):
+        self._slots.acquire()
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._task_done)
+        return executor, future
+
+    def _task_done(self, future):
+        self.tasks_completed += 1
+        self._slots.release()
+
+    def _result(self, executor: ProcessPoolExecutor, future):
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory); the next task gets a fresh pool
+            self._discard_executor(executor)
+            raise
+
+    def run(self, fn: Callable, *args):
+        """Run one task in a worker process and wait for its result."""
+        if self.workers == 0:
+            return fn(*args)
+        return self._result(*self._submit(fn, *args))
+
+    def map(self, fn: Callable, *iterables) -> Iterator:
+        """
+        Like map(), across worker processes. Arguments are consumed lazily and
+        results yielded in order; at most max_in_flight results are pending.
+        """
+        if self.workers == 0:
+            yield from map(fn, *iterables)
+            return
+
+        pending = deque()
+        for args in zip(*iterables):
+            while len(pending) >= self.max_in_flight:
+                yield self._result(*pending.popleft())
+            pending.append(self._submit(fn, *args))
+        while pending:
+            yield self._result(*pending.popleft())
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "pool_started": self._executor is not None,
+            "tasks_completed": self.tasks_completed,
+            "pool_restarts": self.pool_restarts,
+        }
+
+
+_extraction_pipeline: Optional[ExtractionPipeline] = None
+_extraction_pipeline_lock = threading.Lock()
+
+
+def get_extraction_pipeline() -> ExtractionPipeline:
+    """Get the process-wide extraction pipeline (worker processes start on first use)."""
+    global _extraction_pipeline
+    with _extraction_pipeline_lock:
+        if _extraction_pipeline is None:
+            _extraction_pipeline = ExtractionPipeline()
+            atexit.register(_extraction_pipeline.shutdown)
+        return _extraction_pipeline
+
+
+# Worker tasks. They run in the pool's processes, so they take plain, picklable
+# arguments and import their dependencies lazily.
+
+def extract_html_text(html: str) -> str:
+    """Cleaned, quality-checked text of one HTML page (see web_scraper.page_text_from_html)."""
+    from web_scraper import page_text_from_html
+    return page_text_from_html(html)
+
+
+def count_pdf_pages(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int, stop: int, chunk_size: int, chunk_overlap: int) -> dict:
+    """
+    Extract, validate and chunk pages [start, stop) of a PDF.
+
+    Returns {"chars", "valid", "chunks", "chunks_rejected"}; valid is False when
+    the pages' text fails the printable-text check (binary or malformed), and
+    chunks holds the texts of chunks that pass the stricter per-chunk check.
+    """
+    from pypdf import PdfReader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    reader = PdfReader(path)
+    text = ""
+    for page in reader.pages[start:stop]:
+        page_text = page.extract_text()
+        if page_text:
+            text += page_text + "\n\n"
+
+    if not text.strip():
+        return {"chars": 0, "valid": True, "chunks": [], "chunks_rejected": 0}
+    if not is_valid_text_content(text):
+        return {"chars": len(text), "valid": False, "chunks": [], "chunks_rejected": 0}
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    chunks: List[str] = []
+    rejected = 0
+    for chunk in splitter.split_text(text):
+        if is_valid_text_content(chunk, min_printable_ratio=0.90):
+            chunks.append(chunk)
+        else:
+            rejected += 1
+    return {"chars": len(text), "valid": True, "chunks": chunks, "chunks_rejected": rejected}
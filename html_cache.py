@@ -0,0 +1,141 @@
+"""
+Raw HTML Cache for GRESTA
+
+Every page the crawler downloads is stored gzip-compressed under
+KB_HTML_CACHE_DIR, addressed by the SHA-256 of its HTML, with a manifest
+mapping each crawled URL to its current object:
+
+    html_cache/
+        manifest.json               url -> {"sha256", "fetched_at", "bytes"}
+        objects/ab/abcdef....html.gz
+
+Identical pages (unchanged between crawls, or served under two URLs) are
+stored once. The cache lets the knowledge base be rebuilt after changing
+extraction, cleaning or chunking without touching the network - see
+knowledge_base.rebuild_from_cache().
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+HTML_CACHE_DIR = Path(os.environ.get("KB_HTML_CACHE_DIR", "knowledge_base/html_cache"))
+
+
+class HtmlCache:
+    """Content-addressed, gzip-compressed store of crawled HTML with a URL manifest."""
+
+    def __init__(self, root: Path = HTML_CACHE_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = threading.Lock()
+        self._manifest = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read {self.manifest_path}, starting a new manifest: {e}")
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}.html.gz"
+
+    def put(self, url: str, html: str) -> str:
+        """Store a page's HTML and point its URL at it. Returns the content digest."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=6, mtime=0))
+                os.replace(tmp_name, path)
+            finally:
+                if os.path.exists(tmp_name):
+                    os.remove(tmp_name)
+        with self._lock:
+            self._manifest[url.rstrip('/')] = {
+                "sha256": digest,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+                "bytes": len(data),
+            }
+        return digest
+
+    def get(self, url: str) -> Optional[str]:
+        """Cached HTML for a URL, or None."""
+        with self._lock:
+            entry = self._manifest.get(url.rstrip('/'))
+        if not entry:
+            return None
+        return read_object(self.object_path(entry["sha256"]))
+
+    def urls(self) -> list:
+        with self._lock:
+            return list(self._manifest)
+
+    def entries(self) -> dict:
+        with self._lock:
+            return dict(self._manifest)
+
+    def save(self, keep_urls: set = None):
+        """
+        Write the manifest atomically, keeping only keep_urls if given, and
+        delete objects no longer referenced by any URL.
+        """
+        with self._lock:
+            if keep_urls is not None:
+                keep = {url.rstrip('/') for url in keep_urls}
+                self._manifest = {url: entry for url, entry in self._manifest.items() if url in keep}
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix(".json.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+            referenced = {entry["sha256"] for entry in self._manifest.values()}
+
+        if self.objects_dir.exists():
+            for path in self.objects_dir.glob("*/*.html.gz"):
+                if path.name[:-len(".html.gz")] not in referenced:
+                    path.unlink(missing_ok=True)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            digests = {entry["sha256"] for entry in self._manifest.values()}
+            raw_bytes = sum(entry["bytes"] for entry in self._manifest.values())
+        stored_bytes = sum(self.object_path(d).stat().st_size for d in digests if self.object_path(d).exists())
+        return {
+            "urls": len(self._manifest),
+            "objects": len(digests),
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+        }
+
+
+def read_object(path: Path) -> Optional[str]:
+    """Decompress one cached page; None if the object is missing."""
+    try:
+        with open(path, "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def extract_cached_page(url: str, path: str) -> dict:
+    """
+    Re-extract one cached page. Runs in a worker process, so it takes a file
+    path rather than the HTML and imports the extractor lazily.
+    Returns {"url", "content"}; content is empty if the page has no usable text.
+    """
+    from web_scraper import page_text_from_html
+
+    html = read_object(Path(path))
+    return {"url": url, "content": page_text_from_html(html) if html else ""}
@@ -0,0 +1,160 @@
+"""
+Knowledge Base Snapshots for GRESTA
+
+A snapshot is the whole built index - chunk vectors, chunk text and metadata,
+plus knowledge_base/metadata.json (page hashes, last scrape, documents) - in
+one versioned, compressed zip under KB_SNAPSHOT_DIR:
+
+    kb-<UTC timestamp>-<chunks>.zip
+        manifest.json       format version, chunk count, dimension, embedding model
+        vectors.npy         (chunks, dim) float32
+        records.jsonl       one {"id", "document", "metadata"} per row
+        kb_metadata.json    knowledge_base/metadata.json at export time
+
+A snapshot is exported after every successful website sync/ingest. A fresh
+autoscale instance restores the newest one in seconds instead of crawling
+and embedding grest.in before it can serve; the crawl then runs as a normal
+background sync. Snapshots are read and written through the VectorStore
+interface, so they work with either vector backend.
+"""
+
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+SNAPSHOT_DIR = Path(os.environ.get("KB_SNAPSHOT_DIR", "kb_snapshots"))
+SNAPSHOTS_TO_KEEP = int(os.environ.get("KB_SNAPSHOTS_TO_KEEP", 3))
+SNAPSHOT_FORMAT_VERSION = 1
+
+_RESTORE_BATCH_SIZE = 512
+
+
+def list_snapshots() -> List[Path]:
+    """Snapshot files, newest first."""
+    if not SNAPSHOT_DIR.exists():
+        return []
+    return sorted(SNAPSHOT_DIR.glob("kb-*.zip"), reverse=True)
+
+
+def read_manifest(path: Path) -> dict:
+    with zipfile.ZipFile(path) as archive:
+        return json.loads(archive.read("manifest.json"))
+
+
+def export_snapshot(reason: str = "manual") -> Optional[Path]:
+    """
+    Write the current index to a new snapshot and prune old ones.
+    Returns the snapshot path, or None if the knowledge base is empty.
+    """
+    from knowledge_base import get_or_create_collection, get_embedding_model_name, load_metadata
+
+    start = time.perf_counter()
+    collection = get_or_create_collection()
+    data = collection.get(include=["documents", "metadatas", "embeddings"])
+    ids = list(data.get("ids") or [])
+    if not ids:
+        print("Snapshot skipped: knowledge base is empty.")
+        return None
+
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    created_at = datetime.now(timezone.utc)
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": created_at.isoformat(),
+        "reason": reason,
+        "chunks": len(ids),
+        "dim": int(vectors.shape[1]),
+        "embedding_model": get_embedding_model_name(),
+        "vector_backend": getattr(collection, "backend", "unknown"),
+    }
+
+    vectors_buffer = io.BytesIO()
+    np.save(vectors_buffer, vectors)
+    records = "".join(
+        json.dumps({"id": chunk_id, "document": document, "metadata": metadata}, ensure_ascii=False) + "\n"
+        for chunk_id, document, metadata in zip(ids, data["documents"], data["metadatas"])
+    )
+
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOT_DIR / f"kb-{created_at.strftime('%Y%m%dT%H%M%SZ')}-{len(ids)}.zip"
+    fd, tmp_name = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".zip.tmp")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_name, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+            archive.writestr("vectors.npy", vectors_buffer.getvalue())
+            archive.writestr("records.jsonl", records)
+            archive.writestr("kb_metadata.json", json.dumps(load_metadata(), indent=2))
+        os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+    for old in list_snapshots()[max(1, SNAPSHOTS_TO_KEEP):]:
+        old.unlink(missing_ok=True)
+
+    size_mb = path.stat().st_size / (1024 * 1024)
+    print(f"Exported knowledge base snapshot {path.name} ({len(ids)} chunks, {size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def restore_snapshot(path: Path) -> int:
+    """Load a snapshot into the (empty) vector store. Returns chunks restored."""
+    from knowledge_base import get_or_create_collection, get_embedding_model_name, save_metadata, next_kb_version
+
+    start = time.perf_counter()
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')}")
+        if manifest.get("embedding_model") != get_embedding_model_name():
+            raise ValueError(
+                f"Snapshot embedded with {manifest.get('embedding_model')}, current model is {get_embedding_model_name()}"
+            )
+        vectors = np.load(io.BytesIO(archive.read("vectors.npy")))
+        records = [json.loads(line) for line in archive.read("records.jsonl").decode("utf-8").splitlines() if line]
+        kb_metadata = json.loads(archive.read("kb_metadata.json"))
+
+    if len(records) != len(vectors):
+        raise ValueError(f"Snapshot is inconsistent: {len(records)} records, {len(vectors)} vectors")
+
+    collection = get_or_create_collection()
+    with collection.deferred_writes():
+        for i in range(0, len(records), _RESTORE_BATCH_SIZE):
+            batch = records[i:i + _RESTORE_BATCH_SIZE]
+            collection.upsert(
+                ids=[r["id"] for r in batch],
+                documents=[r["document"] for r in batch],
+                metadatas=[r["metadata"] for r in batch],
+                embeddings=vectors[i:i + _RESTORE_BATCH_SIZE].tolist()
+            )
+    kb_metadata["kb_version"] = next_kb_version()
+    save_metadata(kb_metadata)
+
+    print(f"Restored {len(records)} chunks from snapshot {path.name} in {time.perf_counter() - start:.1f}s")
+    return len(records)
+
+
+def restore_latest_snapshot() -> Optional[dict]:
+    """
+    Restore the newest usable snapshot, falling back to older ones.
+    Returns the restored snapshot's manifest, or None if none could be restored.
+    """
+    for path in list_snapshots():
+        try:
+            chunks = restore_snapshot(path)
+            manifest = read_manifest(path)
+            manifest["file"] = path.name
+            manifest["restored_chunks"] = chunks
+            return manifest
+        except Exception as e:
+            print(f"Warning: could not restore snapshot {path.name}: {e}")
+    return None
@@ -9,26 +9,54 @@ This module handles:
 """
 
 import os
+import sys
+import copy
 import json
 import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from typing import List, Optional
 
 import chromadb
 from chromadb.config import Settings
-from pypdf import PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from web_scraper import scrape_grest_website
+from embedding_cache import EMBEDDING_CACHE_ENABLED, get_embedding_cache
+from embedding_service import get_embedding_service
+from vector_store import ChromaVectorStore, FlatVectorStore, VectorStore
+from content_dedup import ChunkDeduplicator, strip_boilerplate_lines
+from retrieval_cache import get_retrieval_cache
+from extraction_pipeline import (
+    PDF_PAGES_PER_TASK, ExtractionPipeline, count_pdf_pages, extract_pdf_pages,
+    get_extraction_pipeline, is_valid_text_content
+)
 
 KNOWLEDGE_BASE_DIR = Path("knowledge_base")
 VECTOR_DB_DIR = Path("vector_db")
 DOCUMENTS_DIR = KNOWLEDGE_BASE_DIR / "documents"
 METADATA_FILE = KNOWLEDGE_BASE_DIR / "metadata.json"
 
+# Vector index backend: "chroma" (default) or "flat" (exact search over a
+# memory-mapped NumPy matrix in FLAT_INDEX_DIR, see vector_store.py)
+VECTOR_BACKEND = os.environ.get("KB_VECTOR_BACKEND", "chroma").lower()
+FLAT_INDEX_DIR = VECTOR_DB_DIR / "flat"
+
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Chunks are embedded and written to Chroma in batches of this size;
+# KB_EMBED_WORKERS > 1 embeds several batches concurrently.
+UPSERT_BATCH_SIZE = int(os.environ.get("KB_UPSERT_BATCH_SIZE", 128))
+EMBED_WORKERS = int(os.environ.get("KB_EMBED_WORKERS", 1))
+
+# Chunks at or above this authority (policy pages, FAQ) form the first retrieval
+# tier for policy-type questions; see get_source_authority_level.
+AUTHORITATIVE_LEVEL = 2
+
 
 def ensure_directories():
     """Ensure all necessary directories exist."""
@@ -37,63 +65,195 @@ def ensure_directories():
     VECTOR_DB_DIR.mkdir(exist_ok=True)
 
 
+# Process-wide vector store handle: the Chroma client is opened once and the store
+# reused across searches, until reset_knowledge_base_handle() drops it.
+_kb_handle_lock = threading.RLock()
+_chroma_client = None
+_collection = None
+_embedding_function = None
+
+# metadata.json cache, invalidated by file mtime/size
+_metadata_cache = None
+_metadata_cache_stamp = None
+
+
 def get_chroma_client():
-    """Get or create ChromaDB client."""
-    ensure_directories()
-    return chromadb.PersistentClient(
-        path=str(VECTOR_DB_DIR),
-        settings=Settings(anonymized_telemetry=False)
-    )
+    """Get the process-wide ChromaDB client, opening it on first use."""
+    global _chroma_client
+    with _kb_handle_lock:
+        if _chroma_client is None:
+            ensure_directories()
+            _chroma_client = chromadb.PersistentClient(
+                path=str(VECTOR_DB_DIR),
+                settings=Settings(anonymized_telemetry=False)
+            )
+        return _chroma_client
 
 
-def get_or_create_collection(client=None):
-    """Get or create the GREST knowledge collection."""
-    if client is None:
-        client = get_chroma_client()
-    
+def get_embedding_function():
+    """
+    Get the embedding function used by the collection.
+    Same model as Chroma's default, held explicitly so chunks can be embedded in batches.
+    """
+    global _embedding_function
+    with _kb_handle_lock:
+        if _embedding_function is None:
+            from chromadb.utils import embedding_functions
+            _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return _embedding_function
+
+
+def _open_chroma_collection(client):
     return client.get_or_create_collection(
         name="grest_knowledge",
-        metadata={"description": "GREST website and document knowledge base for refurbished Apple products"}
+        metadata={"description": "GREST website and document knowledge base for refurbished Apple products"},
+        embedding_function=get_embedding_function()
     )
 
 
-def load_metadata() -> dict:
-    """Load knowledge base metadata."""
+def get_or_create_collection(client=None) -> VectorStore:
+    """
+    Get the knowledge base vector store (cached when using the shared client).
+    Backed by the Chroma collection, or the flat NumPy index when KB_VECTOR_BACKEND=flat.
+    """
+    global _collection
+    if client is not None:
+        return ChromaVectorStore(_open_chroma_collection(client))
+    
+    with _kb_handle_lock:
+        if _collection is None:
+            if VECTOR_BACKEND == "flat":
+                ensure_directories()
+                collection = FlatVectorStore(FLAT_INDEX_DIR, embedding_function=get_embedding_function())
+            else:
+                collection = ChromaVectorStore(_open_chroma_collection(get_chroma_client()))
+            backfill_authority_metadata(collection)
+            _collection = collection
+        return _collection
+
+
+def reset_knowledge_base_handle(reopen_client: bool = False):
+    """
+    Drop the cached collection so the next call reloads it.
+    
+    Args:
+        reopen_client: Also discard the client and Chroma's shared system cache,
+            forcing the persisted index to be re-read from disk.
+    """
+    global _chroma_client, _collection
+    with _kb_handle_lock:
+        _collection = None
+        if reopen_client:
+            _chroma_client = None
+            try:
+                from chromadb.api.client import SharedSystemClient
+                SharedSystemClient.clear_system_cache()
+            except Exception as e:
+                print(f"Warning: could not clear Chroma system cache: {e}")
+
+
+def _cached_metadata() -> dict:
+    global _metadata_cache, _metadata_cache_stamp
     ensure_directories()
     if METADATA_FILE.exists():
         try:
-            with open(METADATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stat = METADATA_FILE.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if _metadata_cache is None or _metadata_cache_stamp != stamp:
+                with open(METADATA_FILE, 'r', encoding='utf-8') as f:
+                    _metadata_cache = json.load(f)
+                _metadata_cache_stamp = stamp
+            return _metadata_cache
         except (json.JSONDecodeError, IOError):
             return {"documents": [], "last_scrape": None}
     return {"documents": [], "last_scrape": None}
 
 
+def load_metadata() -> dict:
+    """Load knowledge base metadata (cached until metadata.json changes on disk)."""
+    return copy.deepcopy(_cached_metadata())
+
+
 def save_metadata(metadata: dict):
     """Save knowledge base metadata."""
+    global _metadata_cache, _metadata_cache_stamp
     ensure_directories()
     with open(METADATA_FILE, 'w', encoding='utf-8') as f:
         json.dump(metadata, f, indent=2, default=str)
+    _metadata_cache = None
+    _metadata_cache_stamp = None
 
 
-def generate_doc_id(content: str, source: str, chunk_index: int) -> str:
-    """Generate a unique ID for a document chunk using full content."""
-    hash_input = f"{source}:{chunk_index}:{content}"
-    return hashlib.md5(hash_input.encode()).hexdigest()
+def get_kb_version() -> int:
+    """
+    Knowledge base content version, bumped by every ingest, sync and clear.
+    Stored in metadata.json so changes made by other processes are seen too.
+    """
+    return _cached_metadata().get("kb_version", 0)
+
+
+def next_kb_version() -> int:
+    """Version to store with the next metadata save that changes indexed content."""
+    return get_kb_version() + 1
+
 
+def bump_kb_version() -> int:
+    """Bump the knowledge base version on its own (content changed without other metadata)."""
+    metadata = load_metadata()
+    metadata["kb_version"] = next_kb_version()
+    save_metadata(metadata)
+    return metadata["kb_version"]
 
-def is_valid_text_content(text: str, min_printable_ratio: float = 0.85) -> bool:
+
+def get_source_authority_level(source: str) -> tuple:
     """
-    Validate that text content is mostly printable characters.
-    Rejects binary/encoded content that would poison the knowledge base.
+    Assign authority level to sources. Lower number = higher authority.
+    Returns (authority_level, source_type_label).
+    
+    Authority Hierarchy:
+    1. GREST official policy documents (warranty, refund, shipping policies)
+    2. Official FAQ page
+    3. Contact info and about pages
+    4. Custom knowledge base documents (curated by admin)
+    5. Product collection pages
+    6. Individual product pages (least authoritative - may have simplified info)
     """
-    if not text or len(text.strip()) < 50:
-        return False
+    source_lower = source.lower()
+    
+    # Level 1: Official policy documents (MOST AUTHORITATIVE)
+    if any(x in source_lower for x in ['warranty_policy', 'grest_warranty', 'refund_policy', 'shipping_policy']):
+        return (1, "OFFICIAL POLICY - HIGHEST AUTHORITY")
+    if '/policies/' in source_lower or '/pages/warranty' in source_lower:
+        return (1, "OFFICIAL POLICY - HIGHEST AUTHORITY")
+    
+    # Level 2: FAQ page (official answers)
+    if '/pages/faq' in source_lower or 'faqs' in source_lower:
+        return (2, "OFFICIAL FAQ")
+    
+    # Level 3: Contact and about pages
+    if any(x in source_lower for x in ['contact', 'about', 'grest_contact']):
+        return (3, "OFFICIAL INFO")
     
-    printable_chars = sum(1 for c in text if c.isprintable() or c in '\n\r\t')
-    ratio = printable_chars / len(text)
+    # Level 4: Curated knowledge base docs
+    if source_lower.endswith('.txt') and 'grest_' in source_lower:
+        return (4, "CURATED DOCUMENT")
     
-    return ratio >= min_printable_ratio
+    # Level 5: Collection pages
+    if '/collections/' in source_lower:
+        return (5, "PRODUCT COLLECTION")
+    
+    # Level 6: Individual product pages (LEAST AUTHORITATIVE for policies)
+    if '/products/' in source_lower:
+        return (6, "PRODUCT PAGE - may contain simplified info")
+    
+    # Default: Unknown source
+    return (7, "GENERAL INFO")
+
+
+def generate_doc_id(content: str, source: str, chunk_index: int) -> str:
+    """Generate a unique ID for a document chunk using full content."""
+    hash_input = f"{source}:{chunk_index}:{content}"
+    return hashlib.md5(hash_input.encode()).hexdigest()
 
 
 def split_text_into_chunks(text: str, source: str = "") -> List[dict]:
@@ -117,6 +277,146 @@ def split_text_into_chunks(text: str, source: str = "") -> List[dict]:
     ]
 
 
+def get_embedding_model_name() -> str:
+    """Name of the embedding model, used to key cached embeddings."""
+    embedding_function = get_embedding_function()
+    return getattr(embedding_function, "MODEL_NAME", type(embedding_function).__name__)
+
+
+def with_authority_metadata(metadata: dict) -> dict:
+    """Stamp a chunk's metadata with its source authority level and label (in place)."""
+    if "authority" not in metadata or "authority_label" not in metadata:
+        authority_level, authority_label = get_source_authority_level(metadata.get("source", ""))
+        metadata["authority"] = authority_level
+        metadata["authority_label"] = authority_label
+    return metadata
+
+
+def backfill_authority_metadata(collection) -> int:
+    """
+    Add authority metadata to chunks ingested before it was stored. Returns chunks updated.
+    Runs once per backend: completion is recorded in metadata.json, and chunks
+    ingested since carry authority metadata already.
+    """
+    done_flag = f"authority_backfilled_{collection.backend}"
+    if load_metadata().get(done_flag):
+        return 0
+    
+    try:
+        existing = collection.get(include=["metadatas"])
+    except Exception as e:
+        print(f"Warning: could not read chunks for authority backfill: {e}")
+        return 0
+    
+    ids = []
+    metadatas = []
+    for chunk_id, metadata in zip(existing.get("ids") or [], existing.get("metadatas") or []):
+        metadata = dict(metadata or {})
+        if "authority" in metadata and "authority_label" in metadata:
+            continue
+        ids.append(chunk_id)
+        metadatas.append(with_authority_metadata(metadata))
+    
+    for i in range(0, len(ids), UPSERT_BATCH_SIZE):
+        collection.update(ids=ids[i:i + UPSERT_BATCH_SIZE], metadatas=metadatas[i:i + UPSERT_BATCH_SIZE])
+    
+    metadata = load_metadata()
+    metadata[done_flag] = True
+    if ids:
+        print(f"Backfilled authority metadata on {len(ids)} chunks.")
+        metadata["kb_version"] = next_kb_version()
+    save_metadata(metadata)
+    return len(ids)
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed a batch of chunk texts with the collection's embedding function.
+    Unchanged text is served from the persistent embedding cache.
+    """
+    if not texts:
+        return []
+    
+    def compute(batch: List[str]) -> List[List[float]]:
+        return [list(map(float, vector)) for vector in get_embedding_function()(batch)]
+    
+    if not EMBEDDING_CACHE_ENABLED:
+        return compute(texts)
+    return get_embedding_cache().embed(texts, get_embedding_model_name(), compute)
+
+
+def upsert_chunks(collection, records: List[dict], batch_size: int = None, workers: int = None) -> int:
+    """
+    Embed and upsert chunk records in batches.
+    
+    Each record has "id", "content" and "metadata". Embeddings are computed per
+    batch (optionally across several workers) and passed to Chroma explicitly.
+    If a batch fails, its chunks are retried one at a time so a single bad chunk
+    doesn't drop the batch. Returns the number of chunks written.
+    """
+    if not records:
+        return 0
+
+    # Chroma rejects duplicate ids within one upsert call; the last record wins
+    records = list({r["id"]: r for r in records}.values())
+    for record in records:
+        with_authority_metadata(record["metadata"])
+    batch_size = max(1, batch_size or UPSERT_BATCH_SIZE)
+    workers = max(1, workers or EMBED_WORKERS)
+    batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+    cache = get_embedding_cache()
+    hits_before, misses_before = cache.hits, cache.misses
+    start = time.perf_counter()
+    
+    def embed_batch(batch):
+        try:
+            return embed_texts([r["content"] for r in batch])
+        except Exception as e:
+            print(f"Error embedding batch of {len(batch)} chunks: {e}")
+            return None
+    
+    if workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            embedded = executor.map(embed_batch, batches)
+            written = sum(_write_batch(collection, batch, embeddings) for batch, embeddings in zip(batches, embedded))
+    else:
+        written = sum(_write_batch(collection, batch, embed_batch(batch)) for batch in batches)
+    
+    elapsed = time.perf_counter() - start
+    rate = written / elapsed if elapsed > 0 else 0
+    print(f"Upserted {written} chunks in {elapsed:.1f}s ({rate:.1f} chunks/sec, batch size {batch_size}, {workers} embed worker(s))")
+    if EMBEDDING_CACHE_ENABLED:
+        print(f"  Embedding cache: {cache.hits - hits_before} reused, {cache.misses - misses_before} newly embedded")
+    return written
+
+
+def _write_batch(collection, batch: List[dict], embeddings: Optional[List[List[float]]]) -> int:
+    if embeddings is not None:
+        try:
+            collection.upsert(
+                ids=[r["id"] for r in batch],
+                documents=[r["content"] for r in batch],
+                metadatas=[r["metadata"] for r in batch],
+                embeddings=embeddings
+            )
+            return len(batch)
+        except Exception as e:
+            print(f"Error upserting batch of {len(batch)} chunks, retrying individually: {e}")
+    
+    written = 0
+    for record in batch:
+        try:
+            collection.upsert(
+                ids=[record["id"]],
+                documents=[record["content"]],
+                metadatas=[record["metadata"]]
+            )
+            written += 1
+        except Exception as e:
+            print(f"Error adding chunk: {e}")
+    return written
+
+
 def clear_website_chunks():
     """Remove all website-sourced chunks from the collection."""
     try:
@@ -124,6 +424,7 @@ def clear_website_chunks():
         results = collection.get(where={"type": "website"})
         if results and results.get("ids"):
             collection.delete(ids=results["ids"])
+            bump_kb_version()
             print(f"Cleared {len(results['ids'])} existing website chunks.")
     except Exception as e:
         print(f"Error clearing website chunks: {e}")
@@ -147,6 +448,75 @@ def save_page_hashes(hashes: dict):
     save_metadata(metadata)
 
 
+def build_website_chunks(documents: List[dict]) -> dict:
+    """
+    Turn scraped pages into chunk records, without boilerplate or duplicates.
+    
+    Site-wide boilerplate lines are stripped first (see content_dedup), then the
+    pages are chunked and exact/near-duplicate chunks dropped. Chunks are visited
+    in authority order (policy and FAQ pages first) then by URL, so the copy that
+    survives is the most authoritative one and the choice is stable across syncs.
+    
+    Returns a dict with:
+        chunks_by_url: url -> list of {id, content, metadata} records
+        page_hashes: url -> hash of the cleaned page and its surviving chunk ids
+        pages_rejected / chunks_rejected: invalid pages and chunks
+        dedup: boilerplate and duplicate counts
+    """
+    documents, boilerplate_stats = strip_boilerplate_lines(documents)
+    
+    chunks_by_url = {}
+    page_hashes = {}
+    pages_rejected = 0
+    chunks_rejected = 0
+    
+    for doc in documents:
+        url = doc["url"]
+        if not is_valid_text_content(doc["content"]):
+            print(f"  Rejecting invalid content from {url}")
+            pages_rejected += 1
+            continue
+        
+        page_hashes[url] = compute_content_hash(doc["content"])
+        chunks_by_url[url] = []
+        
+        for chunk in split_text_into_chunks(doc["content"], url):
+            if not is_valid_text_content(chunk["content"], min_printable_ratio=0.90):
+                chunks_rejected += 1
+                continue
+            
+            chunks_by_url[url].append({
+                "id": chunk["id"],
+                "content": chunk["content"],
+                "metadata": {
+                    "source": chunk["source"],
+                    "type": "website",
+                    "chunk_index": chunk["chunk_index"]
+                }
+            })
+    
+    deduplicator = ChunkDeduplicator()
+    for url in sorted(chunks_by_url, key=lambda u: (get_source_authority_level(u)[0], u)):
+        chunks_by_url[url] = [r for r in chunks_by_url[url] if not deduplicator.is_duplicate(r["content"])]
+        # an unchanged page whose surviving chunks changed (a duplicate elsewhere appeared
+        # or went away) must still be rewritten by the incremental sync
+        page_hashes[url] = compute_content_hash(page_hashes[url] + "".join(r["id"] for r in chunks_by_url[url]))
+    
+    dedup_stats = {**boilerplate_stats, **deduplicator.get_stats()}
+    dedup_stats["chunks_removed"] = dedup_stats["exact_duplicates"] + dedup_stats["near_duplicates"]
+    print(f"  Dedup: stripped {dedup_stats['lines_removed']} boilerplate lines "
+          f"({dedup_stats['boilerplate_lines']} distinct), removed {dedup_stats['exact_duplicates']} exact and "
+          f"{dedup_stats['near_duplicates']} near-duplicate chunks, kept {dedup_stats['chunks_kept']}")
+    
+    return {
+        "chunks_by_url": chunks_by_url,
+        "page_hashes": page_hashes,
+        "pages_rejected": pages_rejected,
+        "chunks_rejected": chunks_rejected,
+        "dedup": dedup_stats
+    }
+
+
 def sync_website_incremental(max_pages: int = 50) -> dict:
     """
     Incrementally sync website content with vector database.
@@ -154,12 +524,15 @@ def sync_website_incremental(max_pages: int = 50) -> dict:
     Only updates pages that have changed since last sync.
     Deletes embeddings for pages that no longer exist.
     
+    Pages are requested conditionally (ETag / Last-Modified); if every page
+    answers 304 and the page set is unchanged, nothing is re-chunked or hashed.
+    
     Returns sync statistics.
     """
     from datetime import datetime
     
     print("Starting incremental website sync...")
-    documents = scrape_grest_website(max_pages=max_pages)
+    documents = scrape_grest_website(max_pages=max_pages, conditional=True)
     
     if not documents:
         print("No content found from website.")
@@ -172,75 +545,67 @@ def sync_website_incremental(max_pages: int = 50) -> dict:
         }
     
     old_hashes = get_page_hashes()
-    new_hashes = {}
-    current_urls = set()
+    current_urls = {doc["url"] for doc in documents}
+    pages_not_modified = sum(1 for doc in documents if doc.get("not_modified"))
+    
+    if pages_not_modified == len(documents) and current_urls == set(old_hashes):
+        metadata = load_metadata()
+        metadata["last_scrape"] = datetime.now().isoformat()
+        save_metadata(metadata)
+        print(f"Incremental sync complete: all {len(documents)} pages not modified")
+        return {
+            "pages_processed": len(documents),
+            "pages_updated": 0,
+            "pages_unchanged": len(documents),
+            "pages_not_modified": pages_not_modified,
+            "pages_deleted": 0,
+            "chunks_added": 0,
+            "chunks_rejected": 0,
+            "chunks_deduplicated": 0,
+            "boilerplate_lines_removed": 0
+        }
+    
+    prepared = build_website_chunks(documents)
+    new_hashes = prepared["page_hashes"]
+    chunks_rejected = prepared["pages_rejected"] + prepared["chunks_rejected"]
     
     collection = get_or_create_collection()
     
     pages_updated = 0
     pages_unchanged = 0
-    chunks_added = 0
-    chunks_rejected = 0
+    pages_deleted = 0
+    pending_chunks = []
     
-    for doc in documents:
-        url = doc["url"]
-        content = doc["content"]
-        current_urls.add(url)
-        
-        if not is_valid_text_content(content):
-            print(f"  Rejecting invalid content from {url}")
-            chunks_rejected += 1
-            continue
-        
-        content_hash = compute_content_hash(content)
-        new_hashes[url] = content_hash
-        
-        if url in old_hashes and old_hashes[url] == content_hash:
-            pages_unchanged += 1
-            continue
-        
-        print(f"  Updating: {url}")
-        pages_updated += 1
-        
-        try:
-            existing = collection.get(where={"source": url})
-            if existing and existing.get("ids"):
-                collection.delete(ids=existing["ids"])
-        except Exception as e:
-            print(f"  Warning: Could not delete old chunks for {url}: {e}")
-        
-        chunks = split_text_into_chunks(content, url)
-        
-        for chunk in chunks:
-            if not is_valid_text_content(chunk["content"], min_printable_ratio=0.90):
-                chunks_rejected += 1
+    with collection.deferred_writes():
+        for url, content_hash in new_hashes.items():
+            if url in old_hashes and old_hashes[url] == content_hash:
+                pages_unchanged += 1
                 continue
-                
-            try:
-                collection.upsert(
-                    ids=[chunk["id"]],
-                    documents=[chunk["content"]],
-                    metadatas=[{
-                        "source": chunk["source"],
-                        "type": "website",
-                        "chunk_index": chunk["chunk_index"]
-                    }]
-                )
-                chunks_added += 1
-            except Exception as e:
-                print(f"Error adding chunk: {e}")
-    
-    pages_deleted = 0
-    for old_url in old_hashes:
-        if old_url not in current_urls:
-            print(f"  Deleting removed page: {old_url}")
+            
+            print(f"  Updating: {url}")
+            pages_updated += 1
+            
             try:
-                existing = collection.get(where={"source": old_url})
+                existing = collection.get(where={"source": url})
                 if existing and existing.get("ids"):
                     collection.delete(ids=existing["ids"])
-                    pages_deleted += 1
             except Exception as e:
-                print(f"  Warning: Could not delete chunks for removed page {old_url}: {e}")
+                print(f"  Warning: Could not delete old chunks for {url}: {e}")
+            
+            pending_chunks.extend(prepared["chunks_by_url"][url])
+        
+        chunks_added = upsert_chunks(collection, pending_chunks)
+        
+        for old_url in old_hashes:
+            if old_url not in current_urls:
+                print(f"  Deleting removed page: {old_url}")
+                try:
+                    existing = collection.get(where={"source": old_url})
+                    if existing and existing.get("ids"):
+                        collection.delete(ids=existing["ids"])
+                        pages_deleted += 1
+                except Exception as e:
+                    print(f"  Warning: Could not delete chunks for removed page {old_url}: {e}")
     
     save_page_hashes(new_hashes)
     
@@ -248,6 +613,7 @@ def sync_website_incremental(max_pages: int = 50) -> dict:
     metadata["last_scrape"] = datetime.now().isoformat()
     metadata["website_pages"] = len(documents)
     metadata["website_chunks"] = collection.count()
+    metadata["kb_version"] = next_kb_version()
     save_metadata(metadata)
     
     print(f"Incremental sync complete: {pages_updated} updated, {pages_unchanged} unchanged, {pages_deleted} deleted")
@@ -256,21 +622,29 @@ def sync_website_incremental(max_pages: int = 50) -> dict:
         "pages_processed": len(documents),
         "pages_updated": pages_updated,
         "pages_unchanged": pages_unchanged,
+        "pages_not_modified": pages_not_modified,
         "pages_deleted": pages_deleted,
         "chunks_added": chunks_added,
-        "chunks_rejected": chunks_rejected
+        "chunks_rejected": chunks_rejected,
+        "chunks_deduplicated": prepared["dedup"]["chunks_removed"],
+        "boilerplate_lines_removed": prepared["dedup"]["lines_removed"]
     }
 
 
-def ingest_website_content(max_pages: int = 50, clear_existing: bool = True) -> int:
+def ingest_website_content(max_pages: int = 50, clear_existing: bool = True, documents: List[dict] = None) -> int:
     """
     Scrape the GREST website and add content to the knowledge base.
     Returns the number of chunks added.
+    
+    Args:
+        documents: Already-extracted pages ({url, content}) to ingest instead of
+            crawling, e.g. local fixtures or cached HTML.
     """
     from datetime import datetime
     
-    print("Scraping GREST website...")
-    documents = scrape_grest_website(max_pages=max_pages)
+    if documents is None:
+        print("Scraping GREST website...")
+        documents = scrape_grest_website(max_pages=max_pages)
     
     if not documents:
         print("No content found from website.")
@@ -282,98 +656,141 @@ def ingest_website_content(max_pages: int = 50, clear_existing: bool = True) ->
         metadata["website_pages"] = 0
         metadata["website_chunks"] = 0
         metadata["page_hashes"] = {}
+        metadata["kb_version"] = next_kb_version()
         save_metadata(metadata)
     
     collection = get_or_create_collection()
-    chunks_added = 0
-    chunks_rejected = 0
-    page_hashes = {}
     
-    for doc in documents:
-        if not is_valid_text_content(doc["content"]):
-            print(f"  Rejecting invalid content from {doc['url']}")
-            chunks_rejected += 1
-            continue
-        
-        page_hashes[doc["url"]] = compute_content_hash(doc["content"])
-            
-        chunks = split_text_into_chunks(doc["content"], doc["url"])
-        
-        for chunk in chunks:
-            if not is_valid_text_content(chunk["content"], min_printable_ratio=0.90):
-                chunks_rejected += 1
-                continue
-                
-            try:
-                collection.upsert(
-                    ids=[chunk["id"]],
-                    documents=[chunk["content"]],
-                    metadatas=[{
-                        "source": chunk["source"],
-                        "type": "website",
-                        "chunk_index": chunk["chunk_index"]
-                    }]
-                )
-                chunks_added += 1
-            except Exception as e:
-                print(f"Error adding chunk: {e}")
+    prepared = build_website_chunks(documents)
+    page_hashes = prepared["page_hashes"]
+    chunks_rejected = prepared["pages_rejected"] + prepared["chunks_rejected"]
+    pending_chunks = [record for records in prepared["chunks_by_url"].values() for record in records]
+    
+    with collection.deferred_writes():
+        chunks_added = upsert_chunks(collection, pending_chunks)
     
     metadata = load_metadata()
     metadata["last_scrape"] = datetime.now().isoformat()
     metadata["website_pages"] = len(documents)
     metadata["website_chunks"] = chunks_added
     metadata["page_hashes"] = page_hashes
+    metadata["kb_version"] = next_kb_version()
     save_metadata(metadata)
     
-    print(f"Added {chunks_added} chunks from {len(documents)} pages (rejected {chunks_rejected} invalid chunks).")
+    print(f"Added {chunks_added} chunks from {len(documents)} pages (rejected {chunks_rejected} invalid chunks, "
+          f"removed {prepared['dedup']['chunks_removed']} duplicate chunks).")
     return chunks_added
 
 
+def rebuild_from_cache(workers: int = None) -> int:
+    """
+    Rebuild the website part of the knowledge base from the raw HTML cache,
+    without any network access.
+    
+    Re-runs extraction and cleaning for every cached page across worker
+    processes (default: one per CPU core), then chunks, deduplicates and embeds
+    as a normal ingest (KB_EMBED_WORKERS applies). Use after changing
+    extraction, cleaning or chunking.
+    Returns the number of chunks added.
+    """
+    from html_cache import HtmlCache, extract_cached_page
+    
+    cache = HtmlCache()
+    entries = cache.entries()
+    if not entries:
+        print(f"HTML cache at {cache.root} is empty; crawl the website first.")
+        return 0
+    
+    workers = max(1, workers or os.cpu_count() or 1)
+    urls = list(entries)
+    paths = [str(cache.object_path(entries[url]["sha256"])) for url in urls]
+    
+    print(f"Re-extracting {len(urls)} cached pages with {workers} worker process(es)...")
+    start = time.perf_counter()
+    pipeline = ExtractionPipeline(workers=workers, max_in_flight=4 * workers)
+    try:
+        pages = list(pipeline.map(extract_cached_page, urls, paths))
+    finally:
+        pipeline.shutdown()
+    documents = [
+        {"url": page["url"], "content": page["content"], "source": "website"}
+        for page in pages if page["content"]
+    ]
+    print(f"Extracted {len(documents)} pages with content in {time.perf_counter() - start:.1f}s")
+    
+    return ingest_website_content(clear_existing=True, documents=documents)
+
+
 def ingest_pdf_file(file_path: str, original_filename: str = None) -> int:
     """
     Ingest a PDF file into the knowledge base.
     Returns the number of chunks added.
+    
+    Pages are extracted, validated and chunked PDF_PAGES_PER_TASK at a time in
+    the extraction pipeline's worker processes and embedded as they arrive, so
+    the whole document's text is never held in memory. Chunks from a previous
+    upload of the same file that are no longer produced are removed.
     """
     if original_filename is None:
         original_filename = os.path.basename(file_path)
     
     try:
-        reader = PdfReader(file_path)
-        text_content = ""
-        
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text_content += page_text + "\n\n"
+        pipeline = get_extraction_pipeline()
+        page_count = pipeline.run(count_pdf_pages, file_path)
+        source = f"PDF: {original_filename}"
         
-        if not text_content.strip():
-            print(f"No text content found in PDF: {original_filename}")
-            return 0
+        collection = get_or_create_collection()
+        existing = collection.get(where={"source": original_filename})
+        old_ids = set(existing.get("ids") or [])
         
-        if not is_valid_text_content(text_content):
-            print(f"PDF content failed validation (binary/malformed): {original_filename}")
-            return 0
+        starts = range(0, page_count, PDF_PAGES_PER_TASK)
+        stops = [min(start + PDF_PAGES_PER_TASK, page_count) for start in starts]
+        results = pipeline.map(extract_pdf_pages, repeat(file_path), starts, stops,
+                               repeat(CHUNK_SIZE), repeat(CHUNK_OVERLAP))
         
-        chunks = split_text_into_chunks(text_content, f"PDF: {original_filename}")
-        collection = get_or_create_collection()
+        text_chars = 0
+        invalid_pages = 0
+        chunk_index = 0
         chunks_added = 0
+        new_ids = set()
+        pending_chunks = []
+        with collection.deferred_writes():
+            for start, stop, result in zip(starts, stops, results):
+                text_chars += result["chars"]
+                if not result["valid"]:
+                    invalid_pages += stop - start
+                    continue
+                for content in result["chunks"]:
+                    chunk_id = generate_doc_id(content, source, chunk_index)
+                    new_ids.add(chunk_id)
+                    pending_chunks.append({
+                        "id": chunk_id,
+                        "content": content,
+                        "metadata": {
+                            "source": original_filename,
+                            "type": "pdf",
+                            "chunk_index": chunk_index
+                        }
+                    })
+                    chunk_index += 1
+                if len(pending_chunks) >= UPSERT_BATCH_SIZE:
+                    chunks_added += upsert_chunks(collection, pending_chunks)
+                    pending_chunks = []
+            chunks_added += upsert_chunks(collection, pending_chunks)
+            
+            stale_ids = list(old_ids - new_ids)
+            if new_ids and stale_ids:
+                collection.delete(ids=stale_ids)
         
-        for chunk in chunks:
-            if not is_valid_text_content(chunk["content"], min_printable_ratio=0.90):
-                continue
-            try:
-                collection.upsert(
-                    ids=[chunk["id"]],
-                    documents=[chunk["content"]],
-                    metadatas=[{
-                        "source": original_filename,
-                        "type": "pdf",
-                        "chunk_index": chunk["chunk_index"]
-                    }]
-                )
-                chunks_added += 1
-            except Exception as e:
-                print(f"Error adding chunk: {e}")
+        if not new_ids:
+            if text_chars == 0:
+                print(f"No text content found in PDF: {original_filename}")
+            else:
+                print(f"PDF content failed validation (binary/malformed): {original_filename}")
+            return 0
+        
+        if invalid_pages:
+            print(f"  Skipped {invalid_pages} of {page_count} pages that failed validation")
         
         metadata = load_metadata()
         if "documents" not in metadata:
@@ -387,9 +804,10 @@ def ingest_pdf_file(file_path: str, original_filename: str = None) -> int:
                 "type": "pdf",
                 "chunks": chunks_added
             })
+        metadata["kb_version"] = next_kb_version()
         save_metadata(metadata)
         
-        print(f"Added {chunks_added} chunks from PDF: {original_filename}")
+        print(f"Added {chunks_added} chunks from PDF: {original_filename} ({page_count} pages)")
         return chunks_added
         
     except Exception as e:
@@ -419,24 +837,21 @@ def ingest_text_file(file_path: str, original_filename: str = None) -> int:
         
         chunks = split_text_into_chunks(text_content, f"Document: {original_filename}")
         collection = get_or_create_collection()
-        chunks_added = 0
         
-        for chunk in chunks:
-            if not is_valid_text_content(chunk["content"], min_printable_ratio=0.90):
-                continue
-            try:
-                collection.upsert(
-                    ids=[chunk["id"]],
-                    documents=[chunk["content"]],
-                    metadatas=[{
-                        "source": original_filename,
-                        "type": "text",
-                        "chunk_index": chunk["chunk_index"]
-                    }]
-                )
-                chunks_added += 1
-            except Exception as e:
-                print(f"Error adding chunk: {e}")
+        pending_chunks = [
+            {
+                "id": chunk["id"],
+                "content": chunk["content"],
+                "metadata": {
+                    "source": original_filename,
+                    "type": "text",
+                    "chunk_index": chunk["chunk_index"]
+                }
+            }
+            for chunk in chunks
+            if is_valid_text_content(chunk["content"], min_printable_ratio=0.90)
+        ]
+        chunks_added = upsert_chunks(collection, pending_chunks)
         
         metadata = load_metadata()
         if "documents" not in metadata:
@@ -450,6 +865,7 @@ def ingest_text_file(file_path: str, original_filename: str = None) -> int:
                 "type": "text",
                 "chunks": chunks_added
             })
+        metadata["kb_version"] = next_kb_version()
         save_metadata(metadata)
         
         print(f"Added {chunks_added} chunks from text file: {original_filename}")
@@ -460,52 +876,98 @@ def ingest_text_file(file_path: str, original_filename: str = None) -> int:
         return 0
 
 
-def search_knowledge_base(query: str, n_results: int = 5, retry_count: int = 0) -> List[dict]:
+def _query_collection(collection, query_embedding: List[float], n_results: int, where: dict = None) -> List[dict]:
+    """Run one vector store query and convert the results to document dicts."""
+    query_args = {"query_embeddings": [query_embedding], "n_results": n_results}
+    if where:
+        query_args["where"] = where
+    results = collection.query(**query_args)
+    
+    if not results or not results.get("documents"):
+        return []
+    
+    documents = []
+    for i, doc in enumerate(results["documents"][0]):
+        metadata = results["metadatas"][0][i] if results.get("metadatas") else {}
+        distance = results["distances"][0][i] if results.get("distances") else None
+        source = metadata.get("source", "Unknown")
+        
+        if "authority" in metadata:
+            authority_level, authority_label = metadata["authority"], metadata.get("authority_label")
+        else:
+            authority_level, authority_label = get_source_authority_level(source)
+        
+        documents.append({
+            "id": results["ids"][0][i] if results.get("ids") else None,
+            "content": doc,
+            "source": source,
+            "type": metadata.get("type", "Unknown"),
+            "relevance_score": 1 - distance if distance else None,
+            "authority_level": authority_level,
+            "authority_label": authority_label
+        })
+    
+    return documents
+
+
+def search_knowledge_base(query: str, n_results: int = 5, retry_count: int = 0,
+                          prefer_authoritative: bool = False) -> List[dict]:
     """
     Search the knowledge base for relevant content.
     Returns a list of matching documents with their metadata.
-    Includes retry logic for ChromaDB index issues.
+    Reloads the shared collection handle once if ChromaDB reports a stale index.
+    Results are cached per KB version (see retrieval_cache).
+    
+    Args:
+        prefer_authoritative: Two-tier retrieval for policy-type questions - take
+            the best matches from policy/FAQ chunks first, then fill the remaining
+            slots from the general pool.
     """
+    cache = get_retrieval_cache()
+    cache_key = cache.make_key(query, n_results, prefer_authoritative, get_kb_version())
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        client = get_chroma_client()
-        collection = client.get_or_create_collection(
-            name="grest_knowledge",
-            metadata={"description": "GREST website and document knowledge base for refurbished Apple products"}
-        )
+        collection = get_or_create_collection()
         
         count = collection.count()
         if count == 0:
             return []
         
-        results = collection.query(
-            query_texts=[query],
-            n_results=min(n_results, count)
-        )
-        
-        if not results or not results.get("documents"):
-            return []
+        query_embedding = get_embedding_service().embed_query(query)
+        n_results = min(n_results, count)
         
         documents = []
-        for i, doc in enumerate(results["documents"][0]):
-            metadata = results["metadatas"][0][i] if results.get("metadatas") else {}
-            distance = results["distances"][0][i] if results.get("distances") else None
-            
-            documents.append({
-                "content": doc,
-                "source": metadata.get("source", "Unknown"),
-                "type": metadata.get("type", "Unknown"),
-                "relevance_score": 1 - distance if distance else None
-            })
+        if prefer_authoritative:
+            try:
+                documents = _query_collection(
+                    collection, query_embedding, n_results,
+                    where={"authority": {"$lte": AUTHORITATIVE_LEVEL}}
+                )
+            except Exception as e:
+                print(f"Authoritative tier query failed, using general pool only: {e}")
+                documents = []
+        
+        if len(documents) < n_results:
+            seen_ids = {doc["id"] for doc in documents}
+            general = _query_collection(collection, query_embedding, min(n_results + len(documents), count))
+            for doc in general:
+                if doc["id"] not in seen_ids:
+                    documents.append(doc)
+                    if len(documents) >= n_results:
+                        break
         
+        cache.put(cache_key, documents)
         return documents
         
     except Exception as e:
         print(f"Error searching knowledge base: {e}")
-        if retry_count < 2 and "Error finding id" in str(e):
-            print(f"Retrying search with fresh client (attempt {retry_count + 2})...")
-            import time
-            time.sleep(0.5)
-            return search_knowledge_base(query, n_results, retry_count + 1)
+        if retry_count < 1 and "Error finding id" in str(e):
+            print("Reloading knowledge base handle and retrying search...")
+            reset_knowledge_base_handle(reopen_client=True)
+            return search_knowledge_base(query, n_results, retry_count + 1, prefer_authoritative)
         return []
 
 
@@ -530,13 +992,17 @@ def get_knowledge_base_stats() -> dict:
 def clear_knowledge_base():
     """Clear all content from the knowledge base."""
     try:
-        client = get_chroma_client()
-        try:
-            client.delete_collection("grest_knowledge")
-        except Exception:
-            pass
+        if VECTOR_BACKEND == "flat":
+            get_or_create_collection().delete_all()
+        else:
+            client = get_chroma_client()
+            try:
+                client.delete_collection("grest_knowledge")
+            except Exception:
+                pass
+        reset_knowledge_base_handle()
         
-        metadata = {"documents": [], "last_scrape": None}
+        metadata = {"documents": [], "last_scrape": None, "kb_version": next_kb_version()}
         save_metadata(metadata)
         
         print("Knowledge base cleared.")
@@ -604,3 +1070,10 @@ def initialize_knowledge_base(force_refresh: bool = False, enable_web_scrape: bo
         chunks_added += website_chunks
     
     return chunks_added > 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild-from-cache":
+        rebuild_from_cache(workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    else:
+        print("Usage: python knowledge_base.py rebuild-from-cache [workers]")
@@ -0,0 +1,543 @@
+"""
+Lexical Analyzer for GRESTA Chatbot
+
+Single-pass keyword and pattern scanner shared by the safety filters,
+intent detection and web-search triggers.
+
+Every keyword list that used to be scanned by its own `any(kw in ...)` loop
+is compiled at import into one Aho-Corasick automaton, and the regex checks
+are compiled once. `analyze_message()` runs both over a message a single time
+and returns a `MessageFeatures` record that all callers read from. Results are
+memoised per message, so the safety check, language detection, price/intent
+detection and web-search trigger for the same turn share one scan.
+
+The module also holds the product mention matcher, compiled from the live
+catalog's model names and model_key aliases and rebuilt after each product
+sync, which drives context-aware query building and co-reference resolution.
+"""
+
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# =============================================================================
+# Vocabularies
+# =============================================================================
+
+CRISIS_KEYWORDS = [
+    "suicide", "suicidal", "kill myself", "end my life", "want to die",
+    "don't want to live", "self-harm", "self harm", "hurt myself",
+    "cutting myself", "overdose", "ending it all", "no reason to live",
+    "better off dead", "can't go on", "goodbye forever"
+]
+
+ABUSE_VIOLENCE_KEYWORDS = [
+    "abuse", "abused", "abusive", "domestic violence", "being hit",
+    "physical abuse", "sexual abuse", "emotional abuse", "assault",
+    "rape", "molest", "threatening me", "violence", "violent"
+]
+
+HINGLISH_WORDS = frozenset([
+    "kya", "hai", "hain", "mujhe", "chahiye", "kitna", "kitne", "kaise",
+    "kaisa", "kyun", "kyon", "nahi", "nahin", "aur", "bhi", "mein", "main",
+    "aap", "aapka", "aapke", "aapki", "kab", "kahaan", "kahan", "accha",
+    "theek", "thik", "sahi", "galat", "bahut", "bohot", "zyada", "kam",
+    "bolo", "batao", "bata", "dijiye", "dedo", "dena", "lena", "lelo",
+    "karein", "karo", "karega", "karenge", "ho", "hoga", "honge", "tha",
+    "thi", "the", "chahte", "chaahte", "pasand", "pehle", "baad", "abhi",
+    "yahan", "wahan", "kuch", "sab", "sirf", "paisa", "rupees", "rupaye",
+    "lakh", "hazaar", "hazar", "crore", "wala", "wali", "wale", "ji",
+    "haan", "ya", "phone", "mobile", "laptop", "milega", "milenge",
+    "dikhao", "dikha", "samjha", "samjhao", "bataiye", "boliye"
+])
+
+PRICE_KEYWORDS = [
+    'price', 'cost', 'kitne', 'kitna', 'rupee', 'rs', '₹', 'budget',
+    'under', 'below', 'less than', 'within', 'affordable', 'cheap',
+    'sasta', 'mehnga', 'expensive', 'range', 'between', 'suggest',
+    'recommend', 'best', 'which', 'kaunsa', 'konsa', 'available'
+]
+
+CHEAPEST_KEYWORDS = ['sasta', 'cheapest', 'lowest']
+
+NON_APPLE_BRANDS = [
+    'realme', 'samsung', 'oneplus', 'one plus', 'xiaomi', 'redmi', 'poco',
+    'vivo', 'oppo', 'motorola', 'moto', 'nokia', 'google pixel', 'pixel',
+    'nothing', 'iqoo', 'tecno', 'infinix', 'asus', 'rog', 'huawei', 'honor',
+    'mi ', 'note ', 'galaxy', 'a52', 'a53', 'a54', 's21', 's22', 's23', 's24'
+]
+
+TRUST_KEYWORDS = [
+    'trust', 'trustpilot', 'mouthshut', 'review', 'rating', 'ratings',
+    'reliable', 'genuine', 'fake', 'scam', 'fraud', 'legitimate',
+    'bharosa', 'vishwas', 'reputation', 'feedback', 'experience',
+    'safe to buy', 'is grest good', 'grest review'
+]
+
+COMPETITOR_KEYWORDS = [
+    'cashify', 'togofogo', 'yaantra', 'budli', 'quikr', 'olx',
+    'other seller', 'competitor', 'vs other', 'dusra seller',
+    'why grest', 'why should i buy from grest', 'better than',
+    'kyon grest', 'grest kyun', 'grest se kyun', 'why not'
+]
+
+FORBIDDEN_SEARCH_TOPICS = ['medical', 'doctor', 'medicine', 'legal', 'lawyer', 'financial', 'investment']
+
+FOLLOW_UP_INDICATORS = [
+    "this", "that", "it", "the product", "the phone", "the macbook",
+    "more details", "more information", "tell me more",
+    "details", "about it", "learn more", "know more",
+    "give me", "share more", "explain", "what is it",
+    "how does it", "how much", "price", "cost", "specs",
+    "buy", "order", "purchase", "warranty", "delivery"
+]
+
+PRODUCT_REFERENCE_KEYWORDS = ["iphone", "macbook", "phone", "laptop", "product"]
+
+# Questions answered by official policy/FAQ pages (drives authority-first retrieval)
+POLICY_KEYWORDS = [
+    'warranty', 'guarantee', 'refund', 'return', 'replacement', 'replace',
+    'exchange', 'shipping', 'delivery', 'cash on delivery', 'cancel',
+    'policy', 'policies', 'payment', 'invoice', 'gst bill', 'faq',
+    'wapas', 'wapsi', 'guarantee card'
+]
+
+KEYWORD_GROUPS: Dict[str, List[str]] = {
+    "crisis": CRISIS_KEYWORDS,
+    "abuse": ABUSE_VIOLENCE_KEYWORDS,
+    "price": PRICE_KEYWORDS,
+    "cheapest": CHEAPEST_KEYWORDS,
+    "non_apple_brand": NON_APPLE_BRANDS,
+    "trust": TRUST_KEYWORDS,
+    "competitor": COMPETITOR_KEYWORDS,
+    "forbidden_topic": FORBIDDEN_SEARCH_TOPICS,
+    "follow_up": FOLLOW_UP_INDICATORS,
+    "product_reference": PRODUCT_REFERENCE_KEYWORDS,
+    "policy": POLICY_KEYWORDS,
+    "device_iphone": ["iphone"],
+    "device_ipad": ["ipad"],
+    "device_macbook": ["macbook", "mac book"],
+}
+
+# Keywords too short to match as substrings ("cod" in "code", "emi" in "premium"):
+# matched as whole words and reported under their group like KEYWORD_GROUPS hits.
+KEYWORD_GROUP_PATTERNS: Dict[str, str] = {
+    "policy": r'\b(cod|emi)\b',
+}
+
+COREFERENCE_PATTERNS = [
+    r'\bsame\s*(product|model|phone|device|one)?\b',
+    r'\bthat\s*(one|product|model|phone)?\b',
+    r'\bthis\s*(one|product|model|phone)?\b',
+    r'\bwoh\s*wala\b',  # Hinglish: "that one"
+    r'\bwahi\b',  # Hinglish: "the same"
+    r'\biske\b',  # Hinglish: "of this"
+    r'\bisi\b',  # Hinglish: "of this same"
+    r'\buska\b',  # Hinglish: "of that"
+    r'\bprevious\b',
+    r'\babove\b',
+    r'\bmentioned\b',
+    r'\bvariant\b',  # "256GB variant" implies same product
+    r'\bit\b(?!\s*is)',  # "it" but not "it is"
+]
+
+PRODUCT_QUERY_PATTERNS = [
+    r'iphone\s*\d+',
+    r'ipad',
+    r'macbook',
+    r'do you have',
+    r'show me',
+    r'list.*products'
+]
+
+MAX_PRICE_PATTERNS = [
+    r'under\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
+    r'below\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
+    r'less than\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
+    r'within\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
+    r'(?:rs\.?|₹)\s*(\d[\d,]*)\s*(?:ke andar|tak|under)',
+    r'(\d[\d,]*)\s*(?:ke andar|tak|rupee|rs)',
+    r'budget\s*(?:of|is)?\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
+]
+
+PRICE_RANGE_PATTERNS = [
+    r'between\s*(?:rs\.?|₹)?\s*(\d[\d,]*)\s*(?:to|and|-)\s*(?:rs\.?|₹)?\s*(\d[\d,]*)',
+    r'(\d[\d,]*)\s*(?:se|to)\s*(\d[\d,]*)',
+]
+
+# Boolean regex checks used by the web-search trigger, keyed by feature name.
+SEARCH_TRIGGER_PATTERNS = {
+    "external_comparison": r'(vs|versus|compare|comparison|difference|better|or)\b',
+    "external_spec_terms": r'(spec|specification|feature|camera|display|battery|price)',
+    "apple_comparison": r'(iphone|ipad|macbook).*(vs|versus|compare|difference|better).*(iphone|ipad|macbook)',
+    "generic_comparison": r'difference between.*and|compare.*with|which is better',
+    "non_grest_specs": r'(specs?|specifications?|features?)\s*(of|for)?\s*(realme|samsung|oneplus|xiaomi|redmi|poco|vivo|oppo|motorola|nokia|pixel)',
+}
+
+
+# =============================================================================
+# Aho-Corasick automaton
+# =============================================================================
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick multi-pattern matcher over literal keywords.
+
+    Each keyword carries one or more labels (group names). `scan()` walks the
+    text once and returns every (label, keyword) pair whose keyword occurs as
+    a substring, which is exactly what a `keyword in text` loop would report.
+    """
+
+    def __init__(self, labelled_keywords: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, str]]] = [[]]
+
+        for label, keyword in labelled_keywords:
+            if keyword:
+                self._add(keyword, label)
+        self._build_failure_links()
+
+    def _add(self, keyword: str, label: str):
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+        if (label, keyword) not in self._output[state]:
+            self._output[state].append((label, keyword))
+
+    def _build_failure_links(self):
+        queue = deque()
+        for next_state in self._goto[0].values():
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def iter_matches(self, text: str):
+        """Yield (end_index, label, keyword) for every keyword occurrence in text."""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for label, keyword in output[state]:
+                    yield index, label, keyword
+
+    def scan(self, text: str) -> Dict[str, FrozenSet[str]]:
+        """Return {label: frozenset(matched keywords)} for a single pass over text."""
+        hits: Dict[str, set] = {}
+        for _, label, keyword in self.iter_matches(text):
+            hits.setdefault(label, set()).add(keyword)
+        return {label: frozenset(words) for label, words in hits.items()}
+
+
+def _build_keyword_automaton() -> KeywordAutomaton:
+    return KeywordAutomaton(
+        (group, keyword.lower())
+        for group, keywords in KEYWORD_GROUPS.items()
+        for keyword in keywords
+    )
+
+
+def _combine_patterns(patterns: List[str]) -> "re.Pattern":
+    """Compile a list of patterns into one alternation (any-match semantics)."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+_COREFERENCE_REGEX = _combine_patterns(COREFERENCE_PATTERNS)
+_PRODUCT_QUERY_REGEX = _combine_patterns(PRODUCT_QUERY_PATTERNS)
+_PRICE_FIGURE_REGEX = _combine_patterns(MAX_PRICE_PATTERNS + PRICE_RANGE_PATTERNS)
+_MAX_PRICE_REGEXES = [re.compile(p) for p in MAX_PRICE_PATTERNS]
+_PRICE_RANGE_REGEXES = [re.compile(p) for p in PRICE_RANGE_PATTERNS]
+_SEARCH_TRIGGER_REGEXES = {name: re.compile(p) for name, p in SEARCH_TRIGGER_PATTERNS.items()}
+_KEYWORD_GROUP_REGEXES = {group: re.compile(p) for group, p in KEYWORD_GROUP_PATTERNS.items()}
+
+
+def _scan_keywords(text_lower: str) -> Dict[str, FrozenSet[str]]:
+    """Automaton hits plus whole-word KEYWORD_GROUP_PATTERNS hits, by group."""
+    hits = _KEYWORD_AUTOMATON.scan(text_lower)
+    for group, pattern in _KEYWORD_GROUP_REGEXES.items():
+        words = {match.group(0) for match in pattern.finditer(text_lower)}
+        if words:
+            hits[group] = hits.get(group, frozenset()) | words
+    return hits
+
+
+# =============================================================================
+# Feature record
+# =============================================================================
+
+@dataclass(frozen=True)
+class MessageFeatures:
+    """Everything the keyword/regex based detectors need to know about one message."""
+    text_lower: str
+    word_count: int
+    hinglish_count: int
+    keyword_hits: Dict[str, FrozenSet[str]]
+    has_coreference: bool
+    has_product_query_pattern: bool
+    max_price: Optional[float]
+    min_price: Optional[float]
+    search_triggers: FrozenSet[str]
+
+    def has(self, group: str) -> bool:
+        """True if any keyword from the named group occurs in the message."""
+        return group in self.keyword_hits
+
+    def matched(self, group: str) -> FrozenSet[str]:
+        """Keywords from the named group that occur in the message."""
+        return self.keyword_hits.get(group, frozenset())
+
+    def triggers(self, name: str) -> bool:
+        """True if the named web-search regex matched."""
+        return name in self.search_triggers
+
+    @property
+    def language(self) -> str:
+        if self.hinglish_count >= 2 or (self.word_count <= 5 and self.hinglish_count >= 1):
+            return "hinglish"
+        return "english"
+
+    @property
+    def category(self) -> Optional[str]:
+        if self.has("device_iphone"):
+            return 'iPhone'
+        if self.has("device_ipad"):
+            return 'iPad'
+        if self.has("device_macbook"):
+            return 'MacBook'
+        return None
+
+
+def _extract_prices(text_lower: str) -> Tuple[Optional[float], Optional[float]]:
+    """Apply the max-price then range patterns in priority order."""
+    max_price = None
+    min_price = None
+
+    if not _PRICE_FIGURE_REGEX.search(text_lower):
+        return max_price, min_price
+
+    for pattern in _MAX_PRICE_REGEXES:
+        match = pattern.search(text_lower)
+        if match:
+            max_price = float(match.group(1).replace(',', ''))
+            break
+
+    for pattern in _PRICE_RANGE_REGEXES:
+        match = pattern.search(text_lower)
+        if match:
+            min_price = float(match.group(1).replace(',', ''))
+            max_price = float(match.group(2).replace(',', ''))
+            break
+
+    return max_price, min_price
+
+
+@lru_cache(maxsize=512)
+def analyze_message(message: str) -> MessageFeatures:
+    """
+    Scan a message once and return its feature record.
+
+    Memoised so that every detector called for the same turn reuses one scan.
+    """
+    text_lower = (message or "").lower()
+    words = text_lower.split()
+    max_price, min_price = _extract_prices(text_lower)
+
+    return MessageFeatures(
+        text_lower=text_lower,
+        word_count=len(words),
+        hinglish_count=sum(1 for word in words if word in HINGLISH_WORDS),
+        keyword_hits=_scan_keywords(text_lower),
+        has_coreference=_COREFERENCE_REGEX.search(text_lower) is not None,
+        has_product_query_pattern=_PRODUCT_QUERY_REGEX.search(text_lower) is not None,
+        max_price=max_price,
+        min_price=min_price,
+        search_triggers=frozenset(
+            name for name, pattern in _SEARCH_TRIGGER_REGEXES.items()
+            if pattern.search(text_lower)
+        ),
+    )
+
+
+# =============================================================================
+# Product mention matcher
+# =============================================================================
+
+# Used until the catalog has been loaded, and whenever the database is unavailable.
+STATIC_PRODUCT_NAMES = [
+    "iPhone 12", "iPhone 13", "iPhone 14", "iPhone 15", "iPhone 16",
+    "iPhone 12 Pro", "iPhone 13 Pro", "iPhone 14 Pro", "iPhone 15 Pro", "iPhone 16 Pro",
+    "iPhone 12 Pro Max", "iPhone 13 Pro Max", "iPhone 14 Pro Max", "iPhone 15 Pro Max",
+    "iPhone 16 Pro Max", "MacBook Air", "MacBook Pro", "MacBook Air M1", "MacBook Air M2",
+    "MacBook Pro M1", "MacBook Pro M2",
+]
+
+# Non-model terms that still carry useful retrieval context from earlier turns.
+CONTEXT_TERMS = ["refurbished", "warranty"]
+
+_MODEL_KEY_TOKENS = {
+    "iphone": "iPhone", "ipad": "iPad", "macbook": "MacBook", "imac": "iMac",
+    "airpods": "AirPods", "se": "SE", "xr": "XR", "xs": "XS", "x": "X",
+}
+
+_TITLE_NOISE_REGEX = re.compile(r'\(.*?\)|\b(?:refurbished|apple|price in india)\b|[-–|:]\s*$', re.IGNORECASE)
+
+
+def model_key_to_display_name(model_key: str) -> str:
+    """Turn a canonical model_key ("iphone-13-pro-max") into "iPhone 13 Pro Max"."""
+    words = []
+    for token in model_key.split('-'):
+        if token in _MODEL_KEY_TOKENS:
+            words.append(_MODEL_KEY_TOKENS[token])
+        elif re.fullmatch(r'[a-z]\d+', token):
+            words.append(token.upper())
+        elif token.isdigit():
+            words.append(token)
+        else:
+            words.append(token.capitalize())
+    return " ".join(words)
+
+
+def _clean_catalog_title(title: str) -> str:
+    cleaned = _TITLE_NOISE_REGEX.sub(' ', title or '')
+    return re.sub(r'\s+', ' ', cleaned).strip(' -–|:')
+
+
+class ProductMentionMatcher:
+    """
+    Finds product mentions in free text with one Aho-Corasick pass.
+
+    Aliases map to a canonical display name. Matches must sit on word
+    boundaries, and where aliases overlap the longest one wins, so
+    "iphone 13 pro max" is reported once rather than also as "iPhone 13".
+    """
+
+    def __init__(self, aliases: Dict[str, str], terms: Iterable[str] = ()):
+        self._labels: Dict[str, Tuple[str, str]] = {}
+        for alias, label in aliases.items():
+            alias = alias.lower().strip()
+            if alias:
+                self._labels[alias] = (label, "model")
+        for term in terms:
+            self._labels.setdefault(term.lower(), (term, "term"))
+
+        self._automaton = KeywordAutomaton(("mention", alias) for alias in self._labels)
+        self.model_names = sorted({label for label, kind in self._labels.values() if kind == "model"})
+
+    @classmethod
+    def from_catalog(cls, catalog: Iterable[Tuple[str, Optional[str]]]) -> "ProductMentionMatcher":
+        """Build from (name, model_key) rows, adding model_key and title aliases."""
+        aliases: Dict[str, str] = {}
+        for name in STATIC_PRODUCT_NAMES:
+            aliases[name.lower()] = name
+
+        for name, model_key in catalog:
+            cleaned_title = _clean_catalog_title(name)
+            if model_key:
+                label = model_key_to_display_name(model_key)
+                aliases.setdefault(model_key.replace('-', ' '), label)
+                aliases.setdefault(model_key, label)
+                aliases.setdefault(model_key.replace('-', ''), label)
+            elif cleaned_title:
+                label = cleaned_title
+            else:
+                continue
+            if cleaned_title:
+                aliases.setdefault(cleaned_title.lower(), label)
+
+        return cls(aliases, CONTEXT_TERMS)
+
+    @classmethod
+    def from_static_seed(cls) -> "ProductMentionMatcher":
+        return cls({name.lower(): name for name in STATIC_PRODUCT_NAMES}, CONTEXT_TERMS)
+
+    def _resolve(self, text_lower: str) -> List[Tuple[int, int, str, str]]:
+        candidates = []
+        for end, _, alias in self._automaton.iter_matches(text_lower):
+            start = end - len(alias) + 1
+            if start > 0 and text_lower[start - 1].isalnum():
+                continue
+            if end + 1 < len(text_lower) and text_lower[end + 1].isalnum():
+                continue
+            label, kind = self._labels[alias]
+            candidates.append((start, end, label, kind))
+
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+        resolved = []
+        last_end = -1
+        for candidate in candidates:
+            if candidate[0] > last_end:
+                resolved.append(candidate)
+                last_end = candidate[1]
+            elif resolved and candidate[1] - candidate[0] > resolved[-1][1] - resolved[-1][0] and candidate[0] >= resolved[-1][0]:
+                resolved[-1] = candidate
+                last_end = candidate[1]
+        return resolved
+
+    def find_mentions(self, text: str, models_only: bool = False) -> List[str]:
+        """Return distinct mentioned labels in order of appearance."""
+        mentions = []
+        for _, _, label, kind in self._resolve((text or "").lower()):
+            if models_only and kind != "model":
+                continue
+            if label not in mentions:
+                mentions.append(label)
+        return mentions
+
+
+_product_matcher: Optional[ProductMentionMatcher] = None
+_product_matcher_lock = threading.Lock()
+
+
+def _load_catalog_rows() -> List[Tuple[str, Optional[str]]]:
+    try:
+        from database import get_catalog_model_names
+        return get_catalog_model_names()
+    except Exception as e:
+        print(f"[Lexical] Product catalog unavailable, using static product names: {e}")
+        return []
+
+
+def rebuild_product_mention_matcher() -> ProductMentionMatcher:
+    """Recompile the product matcher from the current catalog (call after a product sync)."""
+    global _product_matcher
+    rows = _load_catalog_rows()
+    matcher = ProductMentionMatcher.from_catalog(rows) if rows else ProductMentionMatcher.from_static_seed()
+    with _product_matcher_lock:
+        _product_matcher = matcher
+    print(f"[Lexical] Product mention matcher built with {len(matcher.model_names)} models")
+    return matcher
+
+
+def get_product_mention_matcher() -> ProductMentionMatcher:
+    """Return the shared product matcher, building it from the catalog on first use."""
+    if _product_matcher is None:
+        with _product_matcher_lock:
+            if _product_matcher is not None:
+                return _product_matcher
+        return rebuild_product_mention_matcher()
+    return _product_matcher
@@ -0,0 +1,340 @@
+"""
+LLM Transport for GRESTA
+
+Sits underneath `get_openai_client()` so the chat pipeline can run without
+a live OpenAI connection. Selected with LLM_TRANSPORT_MODE:
+
+- live   (default) the real OpenAI client, untouched
+- record  calls OpenAI and appends each request/response to a JSONL cassette,
+          keyed by a hash of the prompt and sampling parameters
+- replay  serves responses from the cassette with the latency and streaming
+          chunk timing recorded with them (LLM_REPLAY_TIMING=recorded), or
+          with fixed synthetic timings (=synthetic), so the pipeline can be
+          load-tested offline
+- stub    deterministic fake responses shaped like the real prompts expect
+          (typo fixer echoes, query parser returns JSON, summaries use the
+          KEY: value format)
+
+Only the `client.chat.completions.create(...)` surface used by chatbot_engine
+is implemented. Responses mimic the attributes the pipeline reads
+(`choices[0].message.content` and, when streaming, `choices[0].delta.content`).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+LLM_TRANSPORT_MODE = os.environ.get("LLM_TRANSPORT_MODE", "live").lower()
+LLM_CASSETTE_PATH = Path(os.environ.get("LLM_CASSETTE_PATH", "tests/fixtures/llm_cassette.jsonl"))
+LLM_REPLAY_TIMING = os.environ.get("LLM_REPLAY_TIMING", "recorded").lower()  # 'recorded' | 'synthetic'
+LLM_REPLAY_LATENCY_MS = int(os.environ.get("LLM_REPLAY_LATENCY_MS", 0))
+LLM_REPLAY_CHUNK_MS = int(os.environ.get("LLM_REPLAY_CHUNK_MS", 0))
+LLM_REPLAY_CHUNK_CHARS = int(os.environ.get("LLM_REPLAY_CHUNK_CHARS", 12))
+LLM_REPLAY_ON_MISS = os.environ.get("LLM_REPLAY_ON_MISS", "stub").lower()  # 'stub' | 'error'
+
+TRANSPORT_MODES = ("live", "record", "replay", "stub")
+
+# Request fields that change the model output; everything else (stream, timeouts) is ignored.
+_KEY_FIELDS = ("model", "messages", "temperature", "max_tokens", "max_completion_tokens", "response_format")
+
+
+def prompt_key(request: dict) -> str:
+    """Stable hash of the parts of a chat request that determine the response."""
+    material = {field: request.get(field) for field in _KEY_FIELDS if request.get(field) is not None}
+    return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _completion(content: str, model: str = "") -> SimpleNamespace:
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+        usage=None,
+    )
+
+
+def _chunk(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=content), finish_reason=None)])
+
+
+def _split_for_stream(content: str, chunk_chars: int) -> List[str]:
+    chunk_chars = max(1, chunk_chars)
+    return [content[i:i + chunk_chars] for i in range(0, len(content), chunk_chars)] or [""]
+
+
+# =============================================================================
+# Cassette
+# =============================================================================
+
+class Cassette:
+    """Append-only JSONL store of recorded completions keyed by prompt hash."""
+
+    def __init__(self, path: Path = LLM_CASSETTE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            entries = {}
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            entry = json.loads(line)
+                            entries[entry["key"]] = entry
+            self._entries = entries
+        return self._entries
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, request: dict, content: str, elapsed_ms: float, chunk_times_ms: List[float] = None,
+            chunks: List[str] = None):
+        entry = {
+            "key": key,
+            "model": request.get("model"),
+            "messages": request.get("messages"),
+            "stream": bool(request.get("stream")),
+            "content": content,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "chunk_times_ms": [round(t, 1) for t in (chunk_times_ms or [])],
+            "chunks": chunks or [],
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._load()[key] = entry
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+
+# =============================================================================
+# Stub responses
+# =============================================================================
+
+def _last_user_content(messages: List[dict]) -> str:
+    for message in reversed(messages or []):
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+
+def _system_content(messages: List[dict]) -> str:
+    for message in messages or []:
+        if message.get("role") == "system":
+            return message.get("content") or ""
+    return ""
+
+
+def _stub_query_parse(message: str) -> str:
+    from lexical_analyzer import analyze_message, ProductMentionMatcher
+
+    features = analyze_message(message)
+    models = ProductMentionMatcher.from_static_seed().find_mentions(message, models_only=True)
+    is_cheapest = features.has("cheapest")
+    is_comparison = len(models) > 1
+
+    if is_comparison:
+        query_type = "comparison"
+    elif is_cheapest:
+        query_type = "cheapest"
+    elif features.max_price:
+        query_type = "budget_search"
+    elif models:
+        query_type = "price_query" if features.has("price") else "specs"
+    else:
+        query_type = "other"
+
+    return json.dumps({
+        "model": models[0] if len(models) == 1 else None,
+        "storage": None,
+        "condition": None,
+        "color": None,
+        "category": features.category,
+        "budget_min": features.min_price,
+        "budget_max": features.max_price,
+        "is_price_query": features.has("price") or is_cheapest,
+        "is_cheapest_query": is_cheapest,
+        "spec_only": query_type == "specs",
+        "comparison_models": models if is_comparison else None,
+        "query_type": query_type,
+    })
+
+
+def stub_response(request: dict) -> str:
+    """Deterministic response shaped for whichever pipeline prompt sent the request."""
+    messages = request.get("messages") or []
+    system = _system_content(messages)
+    user = _last_user_content(messages)
+
+    if "typo correction assistant" in system:
+        return user
+    if "query parser" in system:
+        return _stub_query_parse(user)
+    if "conversation analyzer" in system:
+        return (
+            "EMOTIONAL_THEMES: none\n"
+            "RECOMMENDED_PROGRAMS: none\n"
+            "LAST_TOPICS: product enquiry\n"
+            "CONVERSATION_STATUS: general inquiry"
+        )
+
+    digest = hashlib.sha256(user.encode("utf-8")).hexdigest()[:8]
+    return (
+        f"Thanks for asking! Here is what I found about \"{user[:80]}\". "
+        "GREST devices go through 50+ quality checks and come with a 6-month warranty. "
+        f"Let me know if you'd like prices or availability. [stub:{digest}]"
+    )
+
+
+# =============================================================================
+# Client facade
+# =============================================================================
+
+class _Completions:
+    def __init__(self, transport: "TransportClient"):
+        self._transport = transport
+
+    def create(self, **request):
+        return self._transport.create(request)
+
+
+class TransportClient:
+    """Stand-in for `OpenAI` exposing `client.chat.completions.create`."""
+
+    def __init__(self, mode: str, live_client=None, cassette: Optional[Cassette] = None):
+        if mode not in TRANSPORT_MODES:
+            raise ValueError(f"Unknown LLM transport mode: {mode}")
+        self.mode = mode
+        self.live_client = live_client
+        self.cassette = cassette or Cassette()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "recorded": 0, "replayed": 0, "replay_misses": 0, "stubbed": 0}
+
+    def _count(self, field: str):
+        with self._stats_lock:
+            self.stats[field] += 1
+
+    def create(self, request: dict):
+        self._count("requests")
+        if self.mode == "record":
+            return self._record(request)
+        if self.mode == "replay":
+            return self._replay(request)
+        return self._stub(request)
+
+    # -- record ---------------------------------------------------------------
+
+    def _record(self, request: dict):
+        if self.live_client is None:
+            raise RuntimeError("LLM record mode needs a configured OpenAI client")
+
+        key = prompt_key(request)
+        start = time.perf_counter()
+        response = self.live_client.chat.completions.create(**request)
+
+        if not request.get("stream"):
+            content = response.choices[0].message.content or ""
+            self.cassette.put(key, request, content, (time.perf_counter() - start) * 1000)
+            self._count("recorded")
+            return response
+
+        return self._record_stream(key, request, response, start)
+
+    def _record_stream(self, key: str, request: dict, stream, start: float) -> Iterator:
+        parts = []
+        chunk_times = []
+        for chunk in stream:
+            if chunk.choices and getattr(chunk.choices[0].delta, "content", None):
+                parts.append(chunk.choices[0].delta.content)
+                chunk_times.append((time.perf_counter() - start) * 1000)
+            yield chunk
+        self.cassette.put(key, request, "".join(parts), (time.perf_counter() - start) * 1000, chunk_times, parts)
+        self._count("recorded")
+
+    # -- replay ---------------------------------------------------------------
+
+    def _replay(self, request: dict):
+        entry = self.cassette.get(prompt_key(request))
+        if entry is None:
+            self._count("replay_misses")
+            if LLM_REPLAY_ON_MISS == "error":
+                raise KeyError("No cassette entry for this LLM request")
+            return self._stub(request)
+
+        self._count("replayed")
+        content = entry.get("content", "")
+        recorded = LLM_REPLAY_TIMING == "recorded" and entry.get("elapsed_ms") is not None
+        if request.get("stream"):
+            if recorded and entry.get("chunk_times_ms"):
+                return self._replay_recorded_stream(entry)
+            return self._replay_stream(content)
+
+        if recorded:
+            time.sleep(entry["elapsed_ms"] / 1000)
+        elif LLM_REPLAY_LATENCY_MS:
+            time.sleep(LLM_REPLAY_LATENCY_MS / 1000)
+        return _completion(content, request.get("model", ""))
+
+    def _replay_recorded_stream(self, entry: dict) -> Iterator:
+        """Yield the recorded chunks at their recorded offsets from the request start."""
+        times = entry["chunk_times_ms"]
+        pieces = entry.get("chunks") or []
+        if len(pieces) != len(times):
+            # entries recorded before chunk texts were stored: split evenly
+            content = entry.get("content", "")
+            size = -(-len(content) // len(times))
+            pieces = [content[i * size:(i + 1) * size] for i in range(len(times))]
+        start = time.perf_counter()
+        for piece, offset_ms in zip(pieces, times):
+            delay = offset_ms / 1000 - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            yield _chunk(piece)
+
+    def _replay_stream(self, content: str) -> Iterator:
+        if LLM_REPLAY_LATENCY_MS:
+            time.sleep(LLM_REPLAY_LATENCY_MS / 1000)
+        for piece in _split_for_stream(content, LLM_REPLAY_CHUNK_CHARS):
+            if LLM_REPLAY_CHUNK_MS:
+                time.sleep(LLM_REPLAY_CHUNK_MS / 1000)
+            yield _chunk(piece)
+
+    # -- stub -----------------------------------------------------------------
+
+    def _stub(self, request: dict):
+        self._count("stubbed")
+        content = stub_response(request)
+        if request.get("stream"):
+            return iter([_chunk(piece) for piece in _split_for_stream(content, LLM_REPLAY_CHUNK_CHARS)])
+        return _completion(content, request.get("model", ""))
+
+
+def get_transport_mode() -> str:
+    mode = os.environ.get("LLM_TRANSPORT_MODE", LLM_TRANSPORT_MODE).lower()
+    return mode if mode in TRANSPORT_MODES else "live"
+
+
+def wrap_client(live_client=None, mode: Optional[str] = None):
+    """
+    Return the client chatbot_engine should use for the configured mode.
+    In live mode this is the real client unchanged.
+    """
+    mode = mode or get_transport_mode()
+    if mode == "live":
+        return live_client
+    print(f"[LLM Transport] Using '{mode}' transport (cassette: {LLM_CASSETTE_PATH})")
+    return TransportClient(mode, live_client=live_client)
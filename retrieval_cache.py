@@ -0,0 +1,93 @@
+"""
+Retrieval Result Cache for GRESTA
+
+Hot queries ("warranty policy", "return policy", "cod available") return the
+same chunks until the knowledge base changes. search_knowledge_base results
+are cached by (normalized query, n_results, tier flag, KB version); the KB
+version is bumped by every ingest, sync, clear and snapshot restore, so a new
+version simply stops matching old entries, which then age out of the LRU.
+
+A hit skips both the query embedding and the vector search.
+"""
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from embedding_service import normalize_query
+
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", 1024))
+
+
+class RetrievalCache:
+    """Bounded LRU of search results keyed by query and KB version."""
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, List[dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.last_kb_version = None
+
+    @staticmethod
+    def make_key(query: str, n_results: int, prefer_authoritative: bool, kb_version: int) -> Tuple:
+        return (normalize_query(query), n_results, bool(prefer_authoritative), kb_version)
+
+    def get(self, key: Tuple) -> Optional[List[dict]]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            self.last_kb_version = key[-1]
+            documents = self._entries.get(key)
+            if documents is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(documents)
+
+    def put(self, key: Tuple, documents: List[dict]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = copy.deepcopy(documents)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            current = sum(1 for key in self._entries if key[-1] == self.last_kb_version)
+            return {
+                "entries": len(self._entries),
+                "entries_current_version": current,
+                "max_entries": self.max_entries,
+                "kb_version": self.last_kb_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+_retrieval_cache: Optional[RetrievalCache] = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Get the process-wide retrieval cache."""
+    global _retrieval_cache
+    with _retrieval_cache_lock:
+        if _retrieval_cache is None:
+            _retrieval_cache = RetrievalCache()
+        return _retrieval_cache
@@ -10,6 +10,8 @@ This module implements safety filters and the GRESTA persona for:
 import re
 from typing import Tuple
 
+from lexical_analyzer import CRISIS_KEYWORDS, ABUSE_VIOLENCE_KEYWORDS, analyze_message
+
 GREST_URLS = {
     "iPhones": "https://grest.in/collections/iphones",
     "MacBooks": "https://grest.in/collections/macbook",
@@ -75,19 +77,6 @@ WARM_CLOSING_SENTENCES = [
     "Browse more options here:",
 ]
 
-CRISIS_KEYWORDS = [
-    "suicide", "suicidal", "kill myself", "end my life", "want to die", 
-    "don't want to live", "self-harm", "self harm", "hurt myself",
-    "cutting myself", "overdose", "ending it all", "no reason to live",
-    "better off dead", "can't go on", "goodbye forever"
-]
-
-ABUSE_VIOLENCE_KEYWORDS = [
-    "abuse", "abused", "abusive", "domestic violence", "being hit",
-    "physical abuse", "sexual abuse", "emotional abuse", "assault",
-    "rape", "molest", "threatening me", "violence", "violent"
-]
-
 SAFE_REDIRECT_RESPONSE = """I'm really sorry to hear you're going through a difficult time. This sounds serious and you deserve proper support.
 
 Please reach out to professional help:
@@ -110,29 +99,7 @@ def detect_language(message: str) -> str:
     Detect if message is in Hinglish/Hindi or English.
     Returns 'hinglish' or 'english'.
     """
-    hinglish_words = [
-        "kya", "hai", "hain", "mujhe", "chahiye", "kitna", "kitne", "kaise",
-        "kaisa", "kyun", "kyon", "nahi", "nahin", "aur", "bhi", "mein", "main",
-        "aap", "aapka", "aapke", "aapki", "kab", "kahaan", "kahan", "accha",
-        "theek", "thik", "sahi", "galat", "bahut", "bohot", "zyada", "kam",
-        "bolo", "batao", "bata", "dijiye", "dedo", "dena", "lena", "lelo",
-        "karein", "karo", "karega", "karenge", "ho", "hoga", "honge", "tha",
-        "thi", "the", "chahte", "chaahte", "pasand", "pehle", "baad", "abhi",
-        "yahan", "wahan", "kuch", "sab", "sirf", "paisa", "rupees", "rupaye",
-        "lakh", "hazaar", "hazar", "crore", "wala", "wali", "wale", "ji",
-        "haan", "ya", "phone", "mobile", "laptop", "milega", "milenge",
-        "dikhao", "dikha", "samjha", "samjhao", "bataiye", "boliye"
-    ]
-    
-    message_lower = message.lower()
-    words = message_lower.split()
-    
-    hinglish_count = sum(1 for word in words if word in hinglish_words)
-    
-    if hinglish_count >= 2 or (len(words) <= 5 and hinglish_count >= 1):
-        return "hinglish"
-    
-    return "english"
+    return analyze_message(message).language
 
 
 def check_for_crisis_content(message: str) -> Tuple[bool, str]:
@@ -140,14 +107,12 @@ def check_for_crisis_content(message: str) -> Tuple[bool, str]:
     Check if the message contains crisis-related content.
     Returns (is_crisis, redirect_response)
     """
-    message_lower = message.lower()
+    features = analyze_message(message)
     
-    for keyword in CRISIS_KEYWORDS:
-        if keyword in message_lower:
-            lang = detect_language(message)
-            if lang == "hinglish":
-                return True, SAFE_REDIRECT_RESPONSE_HINDI
-            return True, SAFE_REDIRECT_RESPONSE
+    if features.has("crisis"):
+        if features.language == "hinglish":
+            return True, SAFE_REDIRECT_RESPONSE_HINDI
+        return True, SAFE_REDIRECT_RESPONSE
     
     return False, ""
 
@@ -157,14 +122,12 @@ def check_for_abuse_violence(message: str) -> Tuple[bool, str]:
     Check if the message describes abuse or violence.
     Returns (is_abuse, redirect_response)
     """
-    message_lower = message.lower()
+    features = analyze_message(message)
     
-    for keyword in ABUSE_VIOLENCE_KEYWORDS:
-        if keyword in message_lower:
-            lang = detect_language(message)
-            if lang == "hinglish":
-                return True, SAFE_REDIRECT_RESPONSE_HINDI
-            return True, SAFE_REDIRECT_RESPONSE
+    if features.has("abuse"):
+        if features.language == "hinglish":
+            return True, SAFE_REDIRECT_RESPONSE_HINDI
+        return True, SAFE_REDIRECT_RESPONSE
     
     return False, ""
 
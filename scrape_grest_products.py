@@ -5,21 +5,51 @@ Optimized for bulk operations - syncs ~2,300 variants in under 60 seconds.
 Requires environment variables:
 - SHOPIFY_ACCESS_TOKEN: Admin API access token
 - SHOPIFY_STORE_URL: Store URL (e.g., grestmobile.myshopify.com)
+
+Optional:
+- SHOPIFY_SYNC_ENGINE: 'rest' (default, paginated products.json) or 'bulk'
+  (GraphQL bulk operation, see shopify_bulk_sync.py)
+- SHOPIFY_API_BUCKET_SIZE / SHOPIFY_API_LEAK_RATE: REST call limit bucket
+  (defaults 40 / 2 per second; Shopify Plus stores get 80 / 4)
+- SHOPIFY_METAFIELD_WORKERS: concurrent metafield requests (default 4)
+
+populate_database(updated_since=...) runs a delta sync: only products updated
+since then are fetched and upserted, and deletions are found from an id-only
+listing of active products (see sync_manager for the full/delta schedule).
 """
 
 import os
 import json
+import hashlib
+import threading
 import requests
-from time import time
+from time import time, sleep, monotonic
+from datetime import datetime, timedelta
 from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import func
-from database import get_db_session, GRESTProduct, init_database
+from sqlalchemy import func, literal_column
+from database import get_db_session, GRESTProduct, ShopifyMetafieldCache, init_database
 
 SHOPIFY_STORE_URL = os.environ.get('SHOPIFY_STORE_URL', 'grestmobile.myshopify.com')
 SHOPIFY_ACCESS_TOKEN = os.environ.get('SHOPIFY_ACCESS_TOKEN')
 API_VERSION = '2024-10'
 CHUNK_SIZE = 500
+SHOPIFY_SYNC_ENGINE = os.environ.get('SHOPIFY_SYNC_ENGINE', 'rest').lower()
+
+SHOPIFY_API_BUCKET_SIZE = int(os.environ.get('SHOPIFY_API_BUCKET_SIZE', 40))
+SHOPIFY_API_LEAK_RATE = float(os.environ.get('SHOPIFY_API_LEAK_RATE', 2))
+SHOPIFY_API_MAX_RETRIES = 5
+SHOPIFY_METAFIELD_WORKERS = int(os.environ.get('SHOPIFY_METAFIELD_WORKERS', 4))
+# Cached metafields are refetched after this long even if the product is unchanged,
+# since metafield edits through the API don't always touch the product's updated_at
+SHOPIFY_METAFIELD_CACHE_MAX_AGE_HOURS = int(os.environ.get('SHOPIFY_METAFIELD_CACHE_MAX_AGE_HOURS', 168))
+
+
+def shopify_admin_url(path: str) -> str:
+    """Admin API URL for a path. SHOPIFY_STORE_URL may carry a scheme (e.g. a local stand-in server)."""
+    base = SHOPIFY_STORE_URL if SHOPIFY_STORE_URL.startswith(('http://', 'https://')) else f"https://{SHOPIFY_STORE_URL}"
+    return f"{base.rstrip('/')}/admin/api/{API_VERSION}/{path}"
 
 
 def get_shopify_headers():
@@ -30,27 +60,135 @@ def get_shopify_headers():
     }
 
 
-def fetch_all_products():
+class ShopifyAPIError(Exception):
+    """A Shopify Admin API request failed (non-200 after retries)."""
+
+
+class ShopifyRateLimiter:
+    """
+    Client side of Shopify's leaky-bucket REST limit.
+    
+    The bucket level is tracked from each response's X-Shopify-Shop-Api-Call-Limit
+    header ("used/size") and drains at leak_rate calls per second in between.
+    acquire() waits until a call fits below the bucket size, keeping a small
+    headroom for other API clients of the store; a 429's Retry-After pauses every
+    caller until it has passed.
+    """
+    
+    def __init__(self, bucket_size: int = SHOPIFY_API_BUCKET_SIZE, leak_rate: float = SHOPIFY_API_LEAK_RATE,
+                 headroom: int = 2):
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.headroom = headroom
+        self._lock = threading.Lock()
+        self._level = 0.0
+        self._updated = monotonic()
+        self._blocked_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+    
+    def _drained_level(self, now: float) -> float:
+        return max(0.0, self._level - (now - self._updated) * self.leak_rate)
+    
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = monotonic()
+                level = self._drained_level(now)
+                limit = max(1, self.bucket_size - self.headroom)
+                if now >= self._blocked_until and level + 1 <= limit:
+                    self._level = level + 1
+                    self._updated = now
+                    self.calls += 1
+                    return
+                wait = max(self._blocked_until - now, (level + 1 - limit) / self.leak_rate)
+                self.wait_seconds += wait
+            sleep(wait)
+    
+    def update(self, response):
+        header = response.headers.get('X-Shopify-Shop-Api-Call-Limit')
+        with self._lock:
+            if header and '/' in header:
+                used, size = header.split('/', 1)
+                try:
+                    self.bucket_size = int(size)
+                    self._level = float(used)
+                    self._updated = monotonic()
+                except ValueError:
+                    pass
+            if response.status_code == 429:
+                self.throttled += 1
+                try:
+                    retry_after = float(response.headers.get('Retry-After', 2))
+                except ValueError:
+                    retry_after = 2.0
+                self._blocked_until = max(self._blocked_until, monotonic() + retry_after)
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "bucket_size": self.bucket_size,
+            }
+
+
+rate_limiter = ShopifyRateLimiter()
+_http = requests.Session()
+
+
+def _shopify_get(url, params=None, timeout=30):
+    """GET an Admin REST endpoint within the call limit, retrying 429 responses."""
+    for attempt in range(SHOPIFY_API_MAX_RETRIES):
+        rate_limiter.acquire()
+        response = _http.get(url, headers=get_shopify_headers(), params=params, timeout=timeout)
+        rate_limiter.update(response)
+        if response.status_code != 429:
+            return response
+        print(f"Shopify API throttled (429), retrying after {response.headers.get('Retry-After', '2')}s")
+    return response
+
+
+def shopify_timestamp(value: datetime) -> str:
+    """ISO 8601 UTC timestamp for Shopify query parameters (value is naive UTC)."""
+    return value.replace(microsecond=0).isoformat() + 'Z'
+
+
+def fetch_all_products(updated_at_min: datetime = None, fields: str = None):
     """Fetch ALL active products from Shopify Admin API with pagination.
     
     Only fetches products with status='active' to exclude:
     - Draft products (not ready for sale)
     - Archived products (removed from store)
+    
+    Args:
+        updated_at_min: Only products updated at or after this time (naive UTC)
+        fields: Comma-separated product fields to return (e.g. 'id')
+    
+    Raises ShopifyAPIError if any page fails: a partial listing would let a
+    full sync delete the missing products, and a delta sync skip them for good.
     """
     if not SHOPIFY_ACCESS_TOKEN:
         print("ERROR: SHOPIFY_ACCESS_TOKEN not set!")
         return []
     
     all_products = []
-    base_url = f"https://{SHOPIFY_STORE_URL}/admin/api/{API_VERSION}/products.json"
+    base_url = shopify_admin_url('products.json')
     params = {'limit': 250, 'status': 'active'}
+    if updated_at_min:
+        params['updated_at_min'] = shopify_timestamp(updated_at_min)
+    if fields:
+        params['fields'] = fields
     
     while True:
-        response = requests.get(base_url, headers=get_shopify_headers(), params=params)
+        response = _shopify_get(base_url, params=params)
         
         if response.status_code != 200:
             print(f"API Error: {response.status_code} - {response.text[:200]}")
-            break
+            raise ShopifyAPIError(f"Product listing failed after {len(all_products)} products: "
+                                  f"{response.status_code} - {response.text[:200]}")
         
         data = response.json()
         products = data.get('products', [])
@@ -73,6 +211,49 @@ def fetch_all_products():
     return all_products
 
 
+def fetch_active_product_ids():
+    """Ids of all active products (id-only listing), or None if the listing failed."""
+    base_url = shopify_admin_url('products.json')
+    params = {'limit': 250, 'status': 'active', 'fields': 'id'}
+    product_ids = set()
+    
+    while True:
+        response = _shopify_get(base_url, params=params)
+        if response.status_code != 200:
+            print(f"API Error listing product ids: {response.status_code} - {response.text[:200]}")
+            return None
+        
+        product_ids.update(product['id'] for product in response.json().get('products', []))
+        
+        next_link = response.links.get('next', {}).get('url')
+        if not next_link:
+            return product_ids
+        base_url, params = next_link, {}
+
+
+def sku_product_id(sku: str):
+    """Shopify product id from a SHOPIFY_<product>_<variant> SKU, or None."""
+    parts = sku.split('_')
+    if len(parts) == 3 and parts[0] == 'SHOPIFY' and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def fetch_products(engine: str = None, progress=None):
+    """
+    Fetch active products with the configured sync engine.
+    Returns a list (REST) or a stream of REST-shaped products (bulk).
+    """
+    engine = (engine or SHOPIFY_SYNC_ENGINE).lower()
+    if engine == 'bulk':
+        if not SHOPIFY_ACCESS_TOKEN:
+            print("ERROR: SHOPIFY_ACCESS_TOKEN not set!")
+            return []
+        from shopify_bulk_sync import fetch_bulk_products
+        return fetch_bulk_products(progress=progress)
+    return fetch_all_products()
+
+
 def _chunk(iterable, size):
     """Split an iterable into chunks of specified size."""
     it = iter(iterable)
@@ -197,39 +378,118 @@ def extract_specs_from_body(body_html):
     return specs
 
 
-def fetch_product_metafields(product_id):
-    """Fetch metafields for a specific product from Shopify API."""
-    if not SHOPIFY_ACCESS_TOKEN:
-        return {}
+def specs_from_metafields(metafields):
+    """Turn a product's metafields into a specs dict."""
+    specs = {}
     
-    url = f"https://{SHOPIFY_STORE_URL}/admin/api/{API_VERSION}/products/{product_id}/metafields.json"
+    for mf in metafields:
+        namespace = mf.get('namespace', '')
+        key = mf.get('key', '')
+        value = mf.get('value', '')
+        
+        # Extract custom namespace metafields as specs (these contain product specs)
+        if namespace == 'custom' and value:
+            # Convert key from snake_case to Title Case for display
+            display_key = key.replace('_', ' ').title()
+            # Clean up the value (remove leading/trailing whitespace)
+            clean_value = str(value).strip()
+            if clean_value and display_key not in ['Protection Variant', 'Charging', 'Case', 'Screenprotector']:
+                specs[display_key] = clean_value
+    
+    return specs
+
+
+def _fetch_metafield_specs(product_id):
+    """Metafield specs for a product, or None if the request failed."""
+    url = shopify_admin_url(f"products/{product_id}/metafields.json")
     
     try:
-        response = requests.get(url, headers=get_shopify_headers())
+        response = _shopify_get(url)
         if response.status_code != 200:
-            return {}
-        
-        metafields = response.json().get('metafields', [])
-        specs = {}
+            return None
         
-        for mf in metafields:
-            namespace = mf.get('namespace', '')
-            key = mf.get('key', '')
-            value = mf.get('value', '')
-            
-            # Extract custom namespace metafields as specs (these contain product specs)
-            if namespace == 'custom' and value:
-                # Convert key from snake_case to Title Case for display
-                display_key = key.replace('_', ' ').title()
-                # Clean up the value (remove leading/trailing whitespace)
-                clean_value = str(value).strip()
-                if clean_value and display_key not in ['Protection Variant', 'Charging', 'Case', 'Screenprotector']:
-                    specs[display_key] = clean_value
-        
-        return specs
+        return specs_from_metafields(response.json().get('metafields', []))
     except Exception as e:
         print(f"Error fetching metafields for product {product_id}: {e}")
+        return None
+
+
+def fetch_product_metafields(product_id):
+    """Fetch metafields for a specific product from Shopify API."""
+    if not SHOPIFY_ACCESS_TOKEN:
         return {}
+    
+    return _fetch_metafield_specs(product_id) or {}
+
+
+def prefetch_product_metafields(products, workers: int = None) -> dict:
+    """
+    Metafield specs for many products: product_id -> specs.
+    
+    Products whose updated_at matches the cached entry (and whose entry is younger
+    than SHOPIFY_METAFIELD_CACHE_MAX_AGE_HOURS) are served from the
+    shopify_metafield_cache table; the rest are fetched concurrently within the
+    API call limit and written back to the cache. Failed fetches map to {} (not
+    cached), so the caller falls back to the product description instead of
+    requesting them again.
+    """
+    if not SHOPIFY_ACCESS_TOKEN:
+        return {}
+    
+    wanted = {
+        product['id']: product.get('updated_at')
+        for product in products
+        if product.get('id') and get_category(product.get('title', ''), product.get('product_type', '')) != 'Protection Plan'
+    }
+    specs_by_product = {}
+    max_age = datetime.utcnow() - timedelta(hours=SHOPIFY_METAFIELD_CACHE_MAX_AGE_HOURS)
+    
+    try:
+        with get_db_session() as session:
+            if session is not None:
+                for entry in session.query(ShopifyMetafieldCache).filter(
+                    ShopifyMetafieldCache.product_id.in_(list(wanted))
+                ).all():
+                    if entry.product_updated_at == wanted[entry.product_id] and entry.fetched_at >= max_age:
+                        specs_by_product[entry.product_id] = json.loads(entry.specs)
+    except Exception as e:
+        print(f"Warning: could not read metafield cache: {e}")
+    
+    cached = len(specs_by_product)
+    missing = [product_id for product_id in wanted if product_id not in specs_by_product]
+    fetched = {}
+    if missing:
+        workers = max(1, workers or SHOPIFY_METAFIELD_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for product_id, specs in zip(missing, executor.map(_fetch_metafield_specs, missing)):
+                if specs is not None:
+                    fetched[product_id] = specs
+        specs_by_product.update(fetched)
+        specs_by_product.update((product_id, {}) for product_id in missing if product_id not in fetched)
+    
+    if fetched:
+        try:
+            with get_db_session() as session:
+                if session is not None:
+                    now = datetime.utcnow()
+                    rows = [
+                        {'product_id': product_id, 'product_updated_at': wanted[product_id],
+                         'specs': json.dumps(specs), 'fetched_at': now}
+                        for product_id, specs in fetched.items()
+                    ]
+                    table = ShopifyMetafieldCache.__table__
+                    for chunk in _chunk(rows, CHUNK_SIZE):
+                        stmt = insert(table).values(chunk)
+                        session.execute(stmt.on_conflict_do_update(
+                            index_elements=['product_id'],
+                            set_={c: stmt.excluded[c] for c in ('product_updated_at', 'specs', 'fetched_at')}
+                        ))
+        except Exception as e:
+            print(f"Warning: could not write metafield cache: {e}")
+    
+    print(f"Metafields: {cached} cached, {len(fetched)} fetched, {len(missing) - len(fetched)} failed "
+          f"({rate_limiter.get_stats()['throttled']} throttled responses)")
+    return specs_by_product
 
 
 def get_price_range(variants):
@@ -290,8 +550,11 @@ def parse_variant_options_single(variant):
     return storage, color, condition
 
 
-def _prepare_product_variants(product):
-    """Transform a Shopify product into a list of variant dictionaries for bulk insert."""
+def _prepare_product_variants(product, metafield_specs=None):
+    """
+    Transform a Shopify product into a list of variant dictionaries for bulk insert.
+    metafield_specs: specs already fetched for this product (see prefetch_product_metafields).
+    """
     title = product.get('title', '')
     product_id = product.get('id')
     handle = product.get('handle', '')
@@ -307,8 +570,14 @@ def _prepare_product_variants(product):
     if not variants:
         return []
     
-    # Fetch specs from metafields (canonical source for product specifications)
-    specs = fetch_product_metafields(product_id)
+    # Fetch specs from metafields (canonical source for product specifications);
+    # the bulk engine delivers them with the product
+    if metafield_specs is not None:
+        specs = metafield_specs
+    elif 'metafields' in product:
+        specs = specs_from_metafields(product['metafields'])
+    else:
+        specs = fetch_product_metafields(product_id)
     # Fallback to body_html if no metafields found
     if not specs:
         specs = extract_specs_from_body(product.get('body_html', ''))
@@ -372,7 +641,7 @@ def _prepare_product_variants(product):
         variant_image_id = variant.get('image_id')
         variant_image_url = image_id_to_url.get(variant_image_id, default_image_url) if variant_image_id else default_image_url
         
-        rows.append({
+        row = {
             'sku': sku,
             'name': title,
             'model_key': model_key,
@@ -389,15 +658,30 @@ def _prepare_product_variants(product):
             'product_url': f"{base_url}?variant={variant_id}",
             'image_url': variant_image_url,
             'specifications': specs_json,
-        })
+        }
+        row['row_hash'] = row_hash(row)
+        rows.append(row)
     
     return rows
 
 
+def row_hash(row: dict) -> str:
+    """Hash of a variant row's synced content; equal hashes mean nothing to update."""
+    content = json.dumps({k: v for k, v in row.items() if k != 'row_hash'}, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
 def _bulk_upsert_variants(session, rows):
-    """Perform bulk upsert using PostgreSQL ON CONFLICT DO UPDATE."""
+    """
+    Perform bulk upsert using PostgreSQL ON CONFLICT DO UPDATE.
+    
+    Existing rows are only rewritten when their row_hash differs, so unchanged
+    variants cost no row versions, index updates or updated_at bumps.
+    Returns (created, updated) counts of rows actually written.
+    """
+    created = updated = 0
     if not rows:
-        return
+        return created, updated
     
     table = GRESTProduct.__table__
     
@@ -413,25 +697,50 @@ def _bulk_upsert_variants(session, rows):
         
         upsert_stmt = insert_stmt.on_conflict_do_update(
             index_elements=['sku'],
-            set_=update_cols
-        )
+            set_=update_cols,
+            where=table.c.row_hash.is_distinct_from(insert_stmt.excluded.row_hash)
+        ).returning(literal_column('xmax = 0').label('inserted'))
         
-        session.execute(upsert_stmt)
+        # Only written rows are returned; xmax is 0 for a fresh insert
+        for (inserted,) in session.execute(upsert_stmt):
+            if inserted:
+                created += 1
+            else:
+                updated += 1
+    
+    return created, updated
 
 
-def populate_database(hard_delete_stale: bool = True, progress_callback=None):
+def _iter_variant_rows(products, counters, specs_by_product=None):
+    """Transform products into variant rows lazily, counting products seen."""
+    specs_by_product = specs_by_product or {}
+    for product in products:
+        counters['products'] += 1
+        yield from _prepare_product_variants(product, specs_by_product.get(product.get('id')))
+
+
+def populate_database(hard_delete_stale: bool = True, progress_callback=None, engine: str = None,
+                      updated_since: datetime = None):
     """
     Fetch all products from Shopify and sync to database using bulk operations.
     
     This is optimized for speed:
-    - Single API call to fetch all products
-    - In-memory transformation of all variants
+    - Products fetched by the configured engine (paginated REST, or one
+      GraphQL bulk operation streamed as JSONL)
+    - Variants transformed and upserted in chunks as products arrive
     - Bulk upsert using PostgreSQL ON CONFLICT
     - Single transaction for atomicity
     
+    With updated_since this is a delta sync: only products updated since then
+    are fetched (REST, updated_at_min) and upserted. Stale variants are those of
+    products missing from an id-only listing of active products, plus variants
+    dropped from the updated products.
+    
     Args:
         hard_delete_stale: If True, delete variants not in current Shopify data
         progress_callback: Optional function(step, message, progress_pct) for real-time updates
+        engine: 'rest' or 'bulk' (default: SHOPIFY_SYNC_ENGINE); delta syncs always use REST
+        updated_since: Run a delta sync of products updated since this time (naive UTC)
     
     Returns:
         dict with success status and metrics
@@ -446,36 +755,42 @@ def populate_database(hard_delete_stale: bool = True, progress_callback=None):
     
     init_database()
     
-    emit("connecting", "Connecting to Shopify API...", 5)
+    delta = updated_since is not None
+    engine = 'rest' if delta else (engine or SHOPIFY_SYNC_ENGINE).lower()
+    mode = 'delta' if delta else 'full'
+    emit("connecting", f"Connecting to Shopify API ({engine} engine, {mode} sync)...", 5)
     
     start = time()
+    calls_before = rate_limiter.get_stats()['calls']
     
-    emit("fetching", "Fetching products from Shopify...", 10)
-    products = fetch_all_products()
-    if not products:
-        emit("error", "No products fetched from Shopify", 0)
-        return {"success": False, "error": "No products fetched from Shopify"}
-    
-    emit("fetched", f"Fetched {len(products)} products from Shopify", 30)
-    
-    emit("processing", f"Processing {len(products)} products...", 40)
-    
-    variant_rows = []
+    try:
+        if delta:
+            emit("fetching", f"Fetching products updated since {shopify_timestamp(updated_since)}...", 10)
+            products = fetch_all_products(updated_at_min=updated_since)
+            active_product_ids = fetch_active_product_ids() if hard_delete_stale else None
+        else:
+            emit("fetching", "Fetching products from Shopify...", 10)
+            products = fetch_products(engine, progress=lambda message: emit("fetching", message, 20))
+    except Exception as exc:
+        emit("error", f"Failed to fetch products from Shopify: {exc}", 0)
+        return {"success": False, "error": f"Failed to fetch products from Shopify: {exc}"}
+    
+    specs_by_product = {}
+    if isinstance(products, list):
+        if not products and not delta:
+            emit("error", "No products fetched from Shopify", 0)
+            return {"success": False, "error": "No products fetched from Shopify"}
+        emit("fetched", f"Fetched {len(products)} products from Shopify", 30)
+        emit("metafields", "Fetching product specifications...", 35)
+        specs_by_product = prefetch_product_metafields(products)
+    else:
+        emit("fetched", "Bulk export ready, streaming products...", 30)
+    
+    emit("processing", "Processing products...", 40)
+    
+    counters = {'products': 0}
     seen_skus = set()
-    products_processed = 0
-    
-    for product in products:
-        rows = _prepare_product_variants(product)
-        variant_rows.extend(rows)
-        seen_skus.update(row['sku'] for row in rows)
-        products_processed += 1
-    
-    emit("processed", f"Prepared {len(variant_rows)} variants from {products_processed} products", 60)
-    
-    if not variant_rows:
-        emit("error", "No sellable variants found", 0)
-        return {"success": False, "error": "No sellable variants found"}
-    
+    variants_processed = 0
     deleted = 0
     created = 0
     updated = 0
@@ -486,23 +801,41 @@ def populate_database(hard_delete_stale: bool = True, progress_callback=None):
             return {"success": False, "error": "Database not available"}
         
         try:
-            # Count existing SKUs before upsert to calculate created vs updated
-            existing_skus = set(
-                row[0] for row in session.query(GRESTProduct.sku).filter(
-                    GRESTProduct.sku.in_(seen_skus)
-                ).all()
-            )
+            for rows in _chunk(_iter_variant_rows(products, counters, specs_by_product), CHUNK_SIZE):
+                chunk_created, chunk_updated = _bulk_upsert_variants(session, rows)
+                created += chunk_created
+                updated += chunk_updated
+                seen_skus.update(row['sku'] for row in rows)
+                variants_processed += len(rows)
+                emit("upserting", f"Updating database: {variants_processed} variants from {counters['products']} products "
+                                  f"({created} new, {updated} changed)...", 70)
             
-            new_skus = seen_skus - existing_skus
-            updated_skus = seen_skus & existing_skus
+            emit("processed", f"Prepared {variants_processed} variants from {counters['products']} products", 80)
             
-            created = len(new_skus)
-            updated = len(updated_skus)
+            if not seen_skus and not delta:
+                session.rollback()
+                emit("error", "No sellable variants found", 0)
+                return {"success": False, "error": "No sellable variants found"}
             
-            emit("upserting", f"Updating database: {created} new, {updated} existing...", 70)
-            _bulk_upsert_variants(session, variant_rows)
-            
-            if hard_delete_stale and seen_skus:
+            if delta and hard_delete_stale:
+                emit("cleaning", "Removing stale products...", 85)
+                updated_ids = {product.get('id') for product in products}
+                if not active_product_ids:
+                    # an empty or failed listing must not empty the catalog
+                    print("Warning: no active product ids listed, skipping deletions")
+                    active_product_ids = None
+                stale_skus = [
+                    sku for (sku,) in session.query(GRESTProduct.sku).all()
+                    if sku not in seen_skus and (
+                        sku_product_id(sku) in updated_ids
+                        or (active_product_ids is not None and sku_product_id(sku) not in active_product_ids)
+                    )
+                ]
+                for skus in _chunk(stale_skus, CHUNK_SIZE):
+                    deleted += session.query(GRESTProduct).filter(
+                        GRESTProduct.sku.in_(skus)
+                    ).delete(synchronize_session=False)
+            elif hard_delete_stale and seen_skus:
                 emit("cleaning", "Removing stale products...", 85)
                 stale_count = session.query(GRESTProduct).filter(
                     ~GRESTProduct.sku.in_(seen_skus)
@@ -527,13 +860,25 @@ def populate_database(hard_delete_stale: bool = True, progress_callback=None):
             total = session.query(GRESTProduct).count()
             in_stock = session.query(GRESTProduct).filter(GRESTProduct.in_stock == True).count()
             emit("complete", f"Sync complete! {total} variants ({created} new, {updated} updated, {deleted} removed)", 100)
-    
+
+    # Recompile product mention matching against the refreshed catalog
+    try:
+        from lexical_analyzer import rebuild_product_mention_matcher
+        rebuild_product_mention_matcher()
+    except Exception as e:
+        print(f"Warning: could not rebuild product mention matcher: {e}")
+
     return {
         "success": True,
-        "variants_processed": len(variant_rows),
+        "engine": engine,
+        "mode": mode,
+        "products_processed": counters['products'],
+        "variants_processed": variants_processed,
         "variants_created": created,
         "variants_updated": updated,
+        "variants_unchanged": variants_processed - created - updated,
         "variants_deleted": deleted,
+        "api_calls": rate_limiter.get_stats()['calls'] - calls_before,
         "elapsed_seconds": elapsed,
     }
 
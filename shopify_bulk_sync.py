@@ -0,0 +1,239 @@
+"""
+Shopify Bulk Operations Sync Engine for GRESTA
+
+Alternative to the paginated REST engine in scrape_grest_products, selected
+with SHOPIFY_SYNC_ENGINE=bulk. One GraphQL bulkOperationRunQuery exports every
+active product with its variants, images and custom metafields; Shopify runs
+it server-side and publishes the result as a JSONL file. That file is
+streamed line by line and regrouped into the REST product shape, so
+_prepare_product_variants transforms it unchanged and the rows are upserted in
+chunks without the catalog ever being held in memory - and without one
+metafields request per product.
+
+Bulk JSONL flattens nested connections: each variant, image and metafield is
+its own line carrying "__parentId", and follows its product. SKUs use the same
+numeric product and variant ids as the REST engine (SHOPIFY_<product>_<variant>),
+so switching engines never re-creates rows.
+
+For offline testing point SHOPIFY_STORE_URL at tests/shopify_standin_server.py,
+which serves recorded bulk output.
+"""
+
+import json
+import os
+import time
+from typing import Iterator, Optional
+
+import requests
+
+from scrape_grest_products import get_shopify_headers, shopify_admin_url
+
+BULK_POLL_INTERVAL_SECONDS = float(os.environ.get('SHOPIFY_BULK_POLL_INTERVAL', 2))
+BULK_TIMEOUT_SECONDS = int(os.environ.get('SHOPIFY_BULK_TIMEOUT', 900))
+
+PRODUCTS_BULK_QUERY = """
+{
+  products(query: "status:active") {
+    edges {
+      node {
+        id
+        title
+        handle
+        productType
+        tags
+        descriptionHtml
+        updatedAt
+        images {
+          edges {
+            node {
+              id
+              url
+            }
+          }
+        }
+        variants {
+          edges {
+            node {
+              id
+              price
+              compareAtPrice
+              selectedOptions {
+                name
+                value
+              }
+              image {
+                id
+              }
+            }
+          }
+        }
+        metafields(namespace: "custom") {
+          edges {
+            node {
+              id
+              namespace
+              key
+              value
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+RUN_BULK_QUERY_MUTATION = """
+mutation RunBulkQuery($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+BULK_OPERATION_STATUS_QUERY = """
+query BulkOperationStatus($id: ID!) {
+  node(id: $id) {
+    ... on BulkOperation { id status errorCode objectCount url partialDataUrl }
+  }
+}
+"""
+
+
+class BulkOperationError(Exception):
+    """A bulk operation could not be started, failed, or produced unusable output."""
+
+
+def graphql(query: str, variables: dict = None) -> dict:
+    """Run an Admin GraphQL request and return its data, raising on errors."""
+    response = requests.post(
+        shopify_admin_url('graphql.json'),
+        headers=get_shopify_headers(),
+        json={'query': query, 'variables': variables or {}},
+        timeout=30
+    )
+    if response.status_code != 200:
+        raise BulkOperationError(f"GraphQL API error: {response.status_code} - {response.text[:200]}")
+    payload = response.json()
+    if payload.get('errors'):
+        raise BulkOperationError(f"GraphQL errors: {payload['errors']}")
+    return payload.get('data') or {}
+
+
+def run_bulk_query(query: str = PRODUCTS_BULK_QUERY, progress=None) -> Optional[str]:
+    """
+    Start a bulk query and wait for it to finish.
+    Returns the URL of the JSONL result, or None if the query matched nothing.
+    """
+    data = graphql(RUN_BULK_QUERY_MUTATION, {'query': query})['bulkOperationRunQuery']
+    if data.get('userErrors'):
+        raise BulkOperationError(f"Could not start bulk operation: {data['userErrors']}")
+    operation_id = data['bulkOperation']['id']
+    print(f"Started bulk operation {operation_id}")
+
+    deadline = time.monotonic() + BULK_TIMEOUT_SECONDS
+    while True:
+        operation = graphql(BULK_OPERATION_STATUS_QUERY, {'id': operation_id}).get('node') or {}
+        status = operation.get('status')
+        if status == 'COMPLETED':
+            print(f"Bulk operation completed: {operation.get('objectCount')} objects")
+            return operation.get('url')
+        if status in ('FAILED', 'CANCELED', 'CANCELING', 'EXPIRED'):
+            raise BulkOperationError(f"Bulk operation {status.lower()}: {operation.get('errorCode')}")
+        if time.monotonic() > deadline:
+            raise BulkOperationError(f"Bulk operation still {status} after {BULK_TIMEOUT_SECONDS}s")
+        if progress:
+            progress(f"Bulk operation {status.lower()}, {operation.get('objectCount') or 0} objects so far")
+        time.sleep(BULK_POLL_INTERVAL_SECONDS)
+
+
+def iter_jsonl(url: str) -> Iterator[dict]:
+    """Stream a JSONL file line by line."""
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def legacy_id(gid: Optional[str]) -> Optional[int]:
+    """Numeric REST id from a GraphQL global id (gid://shopify/Product/123 -> 123)."""
+    if not gid:
+        return None
+    return int(gid.rsplit('/', 1)[-1])
+
+
+def _gid_type(gid: str) -> str:
+    return gid.split('/')[-2] if gid and gid.count('/') >= 3 else ''
+
+
+def _product_from_node(node: dict) -> dict:
+    tags = node.get('tags') or []
+    return {
+        'id': legacy_id(node['id']),
+        'admin_graphql_api_id': node['id'],
+        'title': node.get('title', ''),
+        'handle': node.get('handle', ''),
+        'product_type': node.get('productType', ''),
+        'tags': ', '.join(tags) if isinstance(tags, list) else tags,
+        'body_html': node.get('descriptionHtml', ''),
+        'updated_at': node.get('updatedAt'),
+        'images': [],
+        'variants': [],
+        'metafields': [],
+    }
+
+
+def _variant_from_node(node: dict) -> dict:
+    variant = {
+        'id': legacy_id(node['id']),
+        'price': node.get('price'),
+        'compare_at_price': node.get('compareAtPrice'),
+        'image_id': legacy_id((node.get('image') or {}).get('id')),
+    }
+    options = [option.get('value') for option in node.get('selectedOptions') or []]
+    for i in range(3):
+        variant[f'option{i + 1}'] = options[i] if i < len(options) else None
+    return variant
+
+
+def iter_bulk_products(url: str) -> Iterator[dict]:
+    """
+    Regroup bulk JSONL into REST-shaped product dicts (with a "metafields" list),
+    yielding each product once all of its child lines have been read.
+    """
+    current = None
+    for obj in iter_jsonl(url):
+        parent_id = obj.get('__parentId')
+        if parent_id is None:
+            if current is not None:
+                yield current
+            current = _product_from_node(obj)
+            continue
+
+        if current is None or parent_id != current['admin_graphql_api_id']:
+            raise BulkOperationError(f"Bulk output line for {obj.get('id')} does not follow its parent {parent_id}")
+
+        kind = _gid_type(obj.get('id', ''))
+        if kind == 'ProductVariant':
+            current['variants'].append(_variant_from_node(obj))
+        elif kind in ('ProductImage', 'MediaImage', 'Image'):
+            current['images'].append({'id': legacy_id(obj['id']), 'src': obj.get('url', '')})
+        elif kind == 'Metafield':
+            current['metafields'].append({
+                'namespace': obj.get('namespace', ''),
+                'key': obj.get('key', ''),
+                'value': obj.get('value', ''),
+            })
+
+    if current is not None:
+        yield current
+
+
+def fetch_bulk_products(progress=None) -> Iterator[dict]:
+    """Run the products bulk query and stream the resulting products."""
+    url = run_bulk_query(PRODUCTS_BULK_QUERY, progress=progress)
+    if not url:
+        return iter(())
+    return iter_bulk_products(url)
@@ -0,0 +1,200 @@
+"""
+Conversation Summary Worker for GRESTA
+
+Moves conversation-summary generation (an extra LLM call) off the chat
+request path. Chat endpoints call `notify()` after each turn; the worker
+keeps only the latest history snapshot per user (coalescing), and schedules
+a summary once a user has accumulated enough new turns or has gone idle.
+
+Summaries run on a small, bounded pool of daemon threads. Queue depth,
+in-flight jobs and lag (time from first unsummarised turn to summary saved)
+are exposed through `get_stats()` for the admin API.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+SUMMARY_MIN_HISTORY = int(os.environ.get('SUMMARY_MIN_HISTORY', 4))
+SUMMARY_EVERY_N_TURNS = int(os.environ.get('SUMMARY_EVERY_N_TURNS', 3))
+SUMMARY_IDLE_SECONDS = int(os.environ.get('SUMMARY_IDLE_SECONDS', 300))
+SUMMARY_WORKERS = int(os.environ.get('SUMMARY_WORKERS', 2))
+SUMMARY_SWEEP_INTERVAL_SECONDS = 15
+
+
+class ConversationSummaryWorker:
+    """
+    Debounced, coalescing background queue for per-user conversation summaries.
+
+    A user is enqueued when `every_n_turns` new turns have arrived since the
+    last summary, or when they have pending turns and have been idle for
+    `idle_seconds`. A user is never queued or summarised twice concurrently;
+    turns that arrive mid-summary are picked up by the next round.
+    """
+
+    def __init__(
+        self,
+        summarize_fn: Callable[[List[dict]], Optional[dict]],
+        persist_fn: Callable[[int, dict], None],
+        every_n_turns: int = SUMMARY_EVERY_N_TURNS,
+        idle_seconds: int = SUMMARY_IDLE_SECONDS,
+        max_workers: int = SUMMARY_WORKERS,
+        min_history: int = SUMMARY_MIN_HISTORY
+    ):
+        self.summarize_fn = summarize_fn
+        self.persist_fn = persist_fn
+        self.every_n_turns = max(1, every_n_turns)
+        self.idle_seconds = idle_seconds
+        self.max_workers = max(1, max_workers)
+        self.min_history = min_history
+
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[int]" = queue.Queue()
+        self._pending: Dict[int, dict] = {}
+        self._queued = set()
+        self._in_flight = set()
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+        self._completed = 0
+        self._failed = 0
+        self._coalesced = 0
+        self._last_lag = None
+        self._max_lag = 0.0
+        self._total_lag = 0.0
+
+    def start(self):
+        """Start worker and sweeper threads (idempotent)."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._work_loop, name=f"summary-worker-{i}", daemon=True)
+                self._threads.append(thread)
+            self._threads.append(threading.Thread(target=self._sweep_loop, name="summary-sweeper", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Signal threads to exit. Pending summaries are dropped."""
+        self._stop.set()
+
+    def notify(self, user_id: int, history: List[dict]):
+        """Record a new turn for a user. Cheap; never blocks on the LLM."""
+        if not user_id or len(history) < self.min_history:
+            return
+
+        now = time.time()
+        with self._lock:
+            entry = self._pending.get(user_id)
+            if entry is None:
+                entry = {"new_turns": 0, "first_turn_at": now}
+                self._pending[user_id] = entry
+            else:
+                self._coalesced += 1
+            entry["history"] = list(history)
+            entry["new_turns"] += 1
+            entry["last_turn_at"] = now
+
+            if entry["new_turns"] >= self.every_n_turns:
+                self._enqueue_locked(user_id)
+
+    def _enqueue_locked(self, user_id: int):
+        if user_id in self._queued or user_id in self._in_flight:
+            return
+        self._queued.add(user_id)
+        self._queue.put(user_id)
+
+    def _sweep_loop(self):
+        while not self._stop.wait(SUMMARY_SWEEP_INTERVAL_SECONDS):
+            cutoff = time.time() - self.idle_seconds
+            with self._lock:
+                for user_id, entry in self._pending.items():
+                    if entry["last_turn_at"] <= cutoff:
+                        self._enqueue_locked(user_id)
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            try:
+                user_id = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            with self._lock:
+                self._queued.discard(user_id)
+                entry = self._pending.pop(user_id, None)
+                if entry is None:
+                    continue
+                self._in_flight.add(user_id)
+
+            try:
+                summary = self.summarize_fn(entry["history"])
+                if summary:
+                    self.persist_fn(user_id, summary)
+                lag = time.time() - entry["first_turn_at"]
+                with self._lock:
+                    self._completed += 1
+                    self._last_lag = lag
+                    self._max_lag = max(self._max_lag, lag)
+                    self._total_lag += lag
+            except Exception as e:
+                print(f"[Summary Worker] Error updating conversation summary for user {user_id}: {e}")
+                with self._lock:
+                    self._failed += 1
+            finally:
+                with self._lock:
+                    self._in_flight.discard(user_id)
+                    follow_up = self._pending.get(user_id)
+                    if follow_up and follow_up["new_turns"] >= self.every_n_turns:
+                        self._enqueue_locked(user_id)
+
+    def get_stats(self) -> dict:
+        """Queue depth, in-flight jobs, lag and outcome counters."""
+        now = time.time()
+        with self._lock:
+            oldest_pending = min((e["first_turn_at"] for e in self._pending.values()), default=None)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "pending_users": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "workers": self.max_workers,
+                "completed": self._completed,
+                "failed": self._failed,
+                "coalesced_turns": self._coalesced,
+                "oldest_pending_seconds": round(now - oldest_pending, 1) if oldest_pending else 0,
+                "last_lag_seconds": round(self._last_lag, 1) if self._last_lag is not None else None,
+                "avg_lag_seconds": round(self._total_lag / self._completed, 1) if self._completed else None,
+                "max_lag_seconds": round(self._max_lag, 1),
+                "every_n_turns": self.every_n_turns,
+                "idle_seconds": self.idle_seconds,
+            }
+
+
+_summary_worker: Optional[ConversationSummaryWorker] = None
+_summary_worker_lock = threading.Lock()
+
+
+def _persist_summary(user_id: int, summary: dict):
+    from database import upsert_conversation_summary
+
+    upsert_conversation_summary(
+        user_id=user_id,
+        emotional_themes=summary.get('emotional_themes'),
+        recommended_programs=summary.get('recommended_programs'),
+        last_topics=summary.get('last_topics'),
+        conversation_status=summary.get('conversation_status')
+    )
+
+
+def get_summary_worker() -> ConversationSummaryWorker:
+    """Get or create (and start) the global summary worker."""
+    global _summary_worker
+    with _summary_worker_lock:
+        if _summary_worker is None:
+            from chatbot_engine import generate_conversation_summary
+
+            _summary_worker = ConversationSummaryWorker(generate_conversation_summary, _persist_summary)
+            _summary_worker.start()
+        return _summary_worker
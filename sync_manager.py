@@ -5,13 +5,15 @@ Handles automatic synchronization of:
 1. SQL Database (PostgreSQL) - synced from Shopify Admin API
 2. Vector Database (ChromaDB) - synced from GREST website
 
-Uses APScheduler to run syncs every 6 hours.
+Uses APScheduler to run syncs every 6 hours. Shopify syncs are deltas
+(products updated since the last successful run) except every
+SHOPIFY_FULL_SYNC_HOURS, when the whole catalog is re-fetched.
 No external dependencies on Replit infrastructure.
 """
 
 import os
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from threading import Lock
 from typing import Optional
 
@@ -24,13 +26,47 @@ logger = logging.getLogger(__name__)
 sync_lock = Lock()
 
 SYNC_INTERVAL_HOURS = int(os.environ.get('SYNC_INTERVAL_HOURS', 6))
+WEB_SEARCH_PREWARM_HOURS = int(os.environ.get('WEB_SEARCH_PREWARM_HOURS', 0))  # 0 disables
+SHOPIFY_FULL_SYNC_HOURS = int(os.environ.get('SHOPIFY_FULL_SYNC_HOURS', 24))  # 0 = always full
+# Delta syncs look back this far before the last run started, covering clock
+# skew and products saved while that run was fetching
+SHOPIFY_DELTA_MARGIN_MINUTES = int(os.environ.get('SHOPIFY_DELTA_MARGIN_MINUTES', 15))
+
+
+def plan_shopify_sync(db) -> dict:
+    """
+    Decide between a full and a delta Shopify sync.
+    
+    Returns {"mode", "updated_since", "last_full"}: a delta sync fetches products
+    updated since the last successful run started (minus the margin); a full sync
+    runs when there is no successful full run within SHOPIFY_FULL_SYNC_HOURS.
+    last_full is the latest successful full run, the baseline for savings.
+    """
+    from database import SyncRun
+    
+    successful = db.query(SyncRun).filter(SyncRun.status == 'success')
+    last_run = successful.order_by(SyncRun.started_at.desc()).first()
+    last_full = successful.filter(
+        (SyncRun.sync_mode == 'full') | (SyncRun.sync_mode.is_(None))
+    ).order_by(SyncRun.started_at.desc()).first()
+    
+    plan = {"mode": "full", "updated_since": None, "last_full": last_full}
+    if SHOPIFY_FULL_SYNC_HOURS <= 0 or last_run is None or last_full is None:
+        return plan
+    if datetime.utcnow() - last_full.started_at >= timedelta(hours=SHOPIFY_FULL_SYNC_HOURS):
+        return plan
+    
+    plan["mode"] = "delta"
+    plan["updated_since"] = last_run.started_at - timedelta(minutes=SHOPIFY_DELTA_MARGIN_MINUTES)
+    return plan
 
 
 def sync_shopify_products() -> dict:
     """
     Sync SQL database with Shopify Admin API.
     
-    - Fetches all products from Shopify
+    - Fetches all products from Shopify, or only those updated since the last
+      successful run (delta, see plan_shopify_sync)
     - Upserts into PostgreSQL
     - Hard deletes any SKUs not in current Shopify fetch
     - Records sync run to database for tracking
@@ -47,35 +83,58 @@ def sync_shopify_products() -> dict:
     
     start_time = datetime.now()
     run_id = None
+    mode = 'full'
+    updated_since = None
+    baseline = None
     
     try:
         with get_db_session() as db:
             if db:
+                plan = plan_shopify_sync(db)
+                mode, updated_since = plan["mode"], plan["updated_since"]
+                last_full = plan["last_full"]
+                if last_full and last_full.finished_at and last_full.api_calls is not None:
+                    baseline = {
+                        "api_calls": last_full.api_calls,
+                        "seconds": (last_full.finished_at - last_full.started_at).total_seconds(),
+                    }
+                
                 sync_run = SyncRun(
                     trigger_source='scheduled',
                     triggered_by='scheduler',
-                    status='running'
+                    status='running',
+                    sync_mode=mode
                 )
                 db.add(sync_run)
                 db.flush()
                 run_id = sync_run.id
-                logger.info(f"Created sync run record: {run_id}")
+                logger.info(f"Created sync run record: {run_id} ({mode} sync)")
     except Exception as e:
         logger.warning(f"Failed to create sync run record: {e}")
     
     try:
-        result = populate_database(hard_delete_stale=True)
+        result = populate_database(hard_delete_stale=True, updated_since=updated_since)
         duration = (datetime.now() - start_time).total_seconds()
         
         created = result.get('variants_created', 0)
         updated = result.get('variants_updated', 0)
+        unchanged = result.get('variants_unchanged')
         deleted = result.get('variants_deleted', 0)
+        api_calls = result.get('api_calls')
+        api_calls_saved = seconds_saved = None
+        if mode == 'delta' and baseline and api_calls is not None:
+            api_calls_saved = baseline["api_calls"] - api_calls
+            seconds_saved = round(baseline["seconds"] - duration, 1)
         
         if result and result.get('success'):
-            logger.info(f"SHOPIFY SYNC COMPLETE in {duration:.1f}s")
+            logger.info(f"SHOPIFY SYNC COMPLETE ({mode}) in {duration:.1f}s")
             logger.info(f"  Created: {created}")
             logger.info(f"  Updated: {updated}")
+            logger.info(f"  Unchanged: {unchanged}")
             logger.info(f"  Deleted: {deleted}")
+            logger.info(f"  API calls: {api_calls}")
+            if api_calls_saved is not None:
+                logger.info(f"  Saved vs last full sync: {api_calls_saved} API calls, {seconds_saved}s")
             
             if run_id:
                 try:
@@ -83,19 +142,25 @@ def sync_shopify_products() -> dict:
                         if db:
                             sync_run = db.query(SyncRun).filter(SyncRun.id == run_id).first()
                             if sync_run:
-                                sync_run.finished_at = datetime.now()
+                                sync_run.finished_at = datetime.utcnow()
                                 sync_run.status = 'success'
                                 sync_run.products_created = created
                                 sync_run.products_updated = updated
+                                sync_run.products_unchanged = unchanged
                                 sync_run.products_deleted = deleted
                                 sync_run.shopify_product_count = result.get('variants_processed', 0)
                                 sync_run.db_product_count = db.query(func.count(GRESTProduct.id)).scalar() or 0
+                                sync_run.api_calls = api_calls
+                                sync_run.api_calls_saved = api_calls_saved
+                                sync_run.seconds_saved = seconds_saved
                 except Exception as e:
                     logger.warning(f"Failed to update sync run record: {e}")
             
             return {
                 "success": True,
                 "duration_seconds": duration,
+                "api_calls_saved": api_calls_saved,
+                "seconds_saved": seconds_saved,
                 **result
             }
         else:
@@ -107,7 +172,7 @@ def sync_shopify_products() -> dict:
                         if db:
                             sync_run = db.query(SyncRun).filter(SyncRun.id == run_id).first()
                             if sync_run:
-                                sync_run.finished_at = datetime.now()
+                                sync_run.finished_at = datetime.utcnow()
                                 sync_run.status = 'failed'
                                 sync_run.error_log = result.get('error') if result else "Unknown error"
                 except Exception as e:
@@ -129,7 +194,7 @@ def sync_shopify_products() -> dict:
                     if db:
                         sync_run = db.query(SyncRun).filter(SyncRun.id == run_id).first()
                         if sync_run:
-                            sync_run.finished_at = datetime.now()
+                            sync_run.finished_at = datetime.utcnow()
                             sync_run.status = 'failed'
                             sync_run.error_log = str(e)
             except Exception as ex:
@@ -167,12 +232,18 @@ def sync_knowledge_base() -> dict:
         logger.info(f"KNOWLEDGE BASE SYNC COMPLETE in {duration:.1f}s")
         logger.info(f"  Pages processed: {result.get('pages_processed', 0)}")
         logger.info(f"  Pages updated: {result.get('pages_updated', 0)}")
-        logger.info(f"  Pages unchanged: {result.get('pages_unchanged', 0)}")
+        logger.info(f"  Pages unchanged: {result.get('pages_unchanged', 0)} ({result.get('pages_not_modified', 0)} not modified)")
+        logger.info(f"  Duplicate chunks removed: {result.get('chunks_deduplicated', 0)}")
         logger.info(f"  Total chunks: {stats.get('total_chunks', 0)}")
         
+        snapshot = None
+        if result.get('pages_updated', 0) or result.get('pages_deleted', 0) or not has_knowledge_base_snapshot():
+            snapshot = export_knowledge_base_snapshot("sync")
+        
         return {
             "success": True,
             "duration_seconds": duration,
+            "snapshot": snapshot,
             **result
         }
         
@@ -186,6 +257,27 @@ def sync_knowledge_base() -> dict:
         }
 
 
+def has_knowledge_base_snapshot() -> bool:
+    """Whether at least one knowledge base snapshot exists."""
+    from kb_snapshot import list_snapshots
+    return bool(list_snapshots())
+
+
+def export_knowledge_base_snapshot(reason: str) -> Optional[str]:
+    """
+    Export a knowledge base snapshot so new instances can restore instead of crawling.
+    
+    Returns the snapshot file name, or None if nothing was exported.
+    """
+    try:
+        from kb_snapshot import export_snapshot
+        path = export_snapshot(reason)
+        return path.name if path else None
+    except Exception as e:
+        logger.warning(f"Knowledge base snapshot export failed: {e}")
+        return None
+
+
 def run_full_sync() -> dict:
     """
     Run full synchronization of both databases.
@@ -235,6 +327,23 @@ def run_full_sync() -> dict:
         sync_lock.release()
 
 
+def prewarm_web_search() -> dict:
+    """
+    Refresh cached web search results for the fixed trust/competitor queries.
+    
+    Keeps those chat turns from waiting on the Serper API.
+    """
+    from chatbot_engine import prewarm_web_search_cache
+    
+    try:
+        warmed = prewarm_web_search_cache()
+        logger.info(f"Web search cache pre-warmed ({warmed} queries)")
+        return {"success": True, "queries_warmed": warmed}
+    except Exception as e:
+        logger.error(f"Web search pre-warm error: {e}")
+        return {"success": False, "error": str(e)}
+
+
 class SyncManager:
     """
     Manages automatic synchronization of GREST databases.
@@ -269,6 +378,16 @@ class SyncManager:
             replace_existing=True
         )
         
+        if WEB_SEARCH_PREWARM_HOURS > 0:
+            self.scheduler.add_job(
+                prewarm_web_search,
+                trigger=IntervalTrigger(hours=WEB_SEARCH_PREWARM_HOURS),
+                id='web_search_prewarm',
+                name=f'Web Search Pre-warm (every {WEB_SEARCH_PREWARM_HOURS} hours)',
+                next_run_time=datetime.now(),
+                replace_existing=True
+            )
+        
         self.scheduler.start()
         self.is_running = True
         
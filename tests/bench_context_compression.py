@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Context Compression Benchmark
+Retrieves knowledge base context for every golden test query and formats it
+twice - full chunks and extractively compressed - to measure the prompt size
+saved per turn. As a quality check, expected answer strings from the golden
+assertions (contains / contains_any) that appear in the full context are
+checked for in the compressed context.
+
+Usage: python tests/bench_context_compression.py [--budget 600] [--mode lexical|embedding] [--n-results 5]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens via tiktoken when available, else the ~4 chars/token rule of thumb."""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    except ImportError:
+        return len(text) // 4
+
+
+def expected_strings(test: dict) -> list:
+    values = []
+    for assertion in test.get("assertions", []):
+        if assertion.get("type") == "contains":
+            values.append([assertion["value"]])
+        elif assertion.get("type") == "contains_any":
+            values.append(list(assertion["values"]))
+    return values
+
+
+def run_benchmark(budget: int = 600, mode: str = "lexical", n_results: int = 5) -> dict:
+    import context_compression
+    from chatbot_engine import format_context_from_docs
+    from knowledge_base import search_knowledge_base
+    from lexical_analyzer import analyze_message
+    from tests.golden_test_data import GOLDEN_TESTS
+
+    context_compression.CONTEXT_SOURCE_CHAR_BUDGET = budget
+    context_compression.CONTEXT_COMPRESSION_MODE = mode
+
+    tests = [t for t in GOLDEN_TESTS if t.get("query") and not t.get("skip")]
+    full_tokens, compressed_tokens, compress_ms = [], [], []
+    retained = checked = 0
+    per_category = {}
+
+    for test in tests:
+        query = test["query"]
+        docs = search_knowledge_base(query, n_results=n_results, prefer_authoritative=analyze_message(query).has("policy"))
+        full = format_context_from_docs(docs, query=query, compress=False)
+        start = time.perf_counter()
+        compressed = format_context_from_docs(docs, query=query, compress=True)
+        compress_ms.append((time.perf_counter() - start) * 1000)
+
+        full_count, compressed_count = count_tokens(full), count_tokens(compressed)
+        full_tokens.append(full_count)
+        compressed_tokens.append(compressed_count)
+
+        category = per_category.setdefault(test.get("category", "other"), {"full": 0, "compressed": 0})
+        category["full"] += full_count
+        category["compressed"] += compressed_count
+
+        for options in expected_strings(test):
+            present = [v for v in options if v.lower() in full.lower()]
+            if present:
+                checked += 1
+                retained += any(v.lower() in compressed.lower() for v in present)
+
+    total_full, total_compressed = sum(full_tokens), sum(compressed_tokens)
+    results = {
+        "queries": len(tests),
+        "budget_chars_per_source": budget,
+        "mode": mode,
+        "mean_context_tokens_full": round(statistics.mean(full_tokens), 1) if tests else 0,
+        "mean_context_tokens_compressed": round(statistics.mean(compressed_tokens), 1) if tests else 0,
+        "token_reduction_pct": round(100 * (1 - total_compressed / total_full), 1) if total_full else 0,
+        "compress_mean_ms": round(statistics.mean(compress_ms), 2) if compress_ms else 0,
+        "answer_strings_checked": checked,
+        "answer_strings_retained_pct": round(100 * retained / checked, 1) if checked else None,
+        "per_category_reduction_pct": {
+            name: round(100 * (1 - c["compressed"] / c["full"]), 1) if c["full"] else 0
+            for name, c in sorted(per_category.items())
+        },
+    }
+
+    print("\n" + "="*70)
+    print("CONTEXT COMPRESSION")
+    print("="*70)
+    print(f"  Queries:                    {results['queries']}")
+    print(f"  Context tokens/turn (full): {results['mean_context_tokens_full']}")
+    print(f"  Context tokens/turn (comp): {results['mean_context_tokens_compressed']}")
+    print(f"  Reduction:                  {results['token_reduction_pct']}%")
+    print(f"  Compression time:           {results['compress_mean_ms']} ms/turn")
+    print(f"  Answer strings retained:    {results['answer_strings_retained_pct']}% of {checked}")
+    print("="*70 + "\n")
+
+    with open("tests/bench_context_compression_results.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results saved to: tests/bench_context_compression_results.json\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extractive context compression benchmark")
+    parser.add_argument("--budget", "-b", type=int, default=600, help="Characters kept per source (default: 600)")
+    parser.add_argument("--mode", "-m", choices=["lexical", "embedding"], default="lexical", help="Sentence scoring (default: lexical)")
+    parser.add_argument("--n-results", "-k", type=int, default=5, help="Chunks retrieved per query (default: 5)")
+    args = parser.parse_args()
+
+    run_benchmark(budget=args.budget, mode=args.mode, n_results=args.n_results)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Knowledge Base Search Latency Benchmark
+Compares cold searches (client and collection reopened for every query, as
+before the shared handle) with warm searches on the process-wide handle.
+
+Usage: python tests/bench_knowledge_base.py [--rounds 3] [--n-results 8]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import knowledge_base as kb
+from tests.golden_test_data import GOLDEN_TESTS
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(timings: list) -> dict:
+    return {
+        "count": len(timings),
+        "mean_ms": round(statistics.mean(timings), 2) if timings else 0,
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+    }
+
+
+def time_searches(queries: list, n_results: int, rounds: int, cold: bool) -> list:
+    timings = []
+    for _ in range(rounds):
+        for query in queries:
+            if cold:
+                kb.reset_knowledge_base_handle(reopen_client=True)
+            start = time.perf_counter()
+            kb.search_knowledge_base(query, n_results=n_results)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def time_stats_calls(rounds: int) -> list:
+    timings = []
+    for _ in range(rounds * 10):
+        start = time.perf_counter()
+        kb.get_knowledge_base_stats()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run_benchmark(rounds: int = 3, n_results: int = 8) -> dict:
+    stats = kb.get_knowledge_base_stats()
+    if stats["total_chunks"] == 0:
+        print("Knowledge base is empty - run initialize_knowledge_base() first.")
+        return {}
+
+    queries = [t["query"] for t in GOLDEN_TESTS if t.get("query")][:40]
+
+    cold = time_searches(queries, n_results, rounds, cold=True)
+    kb.reset_knowledge_base_handle(reopen_client=True)
+    kb.search_knowledge_base(queries[0], n_results=n_results)  # open the handle once
+    warm = time_searches(queries, n_results, rounds, cold=False)
+    stats_warm = time_stats_calls(rounds)
+
+    results = {
+        "total_chunks": stats["total_chunks"],
+        "queries": len(queries),
+        "rounds": rounds,
+        "cold_search": summarize(cold),
+        "warm_search": summarize(warm),
+        "warm_stats_call": summarize(stats_warm),
+    }
+
+    print("\n" + "="*70)
+    print("KNOWLEDGE BASE SEARCH LATENCY")
+    print("="*70)
+    for name in ("cold_search", "warm_search", "warm_stats_call"):
+        s = results[name]
+        print(f"  {name:<16} mean {s['mean_ms']:>8} ms   p50 {s['p50_ms']:>8} ms   p95 {s['p95_ms']:>8} ms")
+    print("="*70 + "\n")
+
+    with open("tests/bench_knowledge_base_results.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results saved to: tests/bench_knowledge_base_results.json\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Knowledge base search latency benchmark")
+    parser.add_argument("--rounds", "-r", type=int, default=3, help="Passes over the query set (default: 3)")
+    parser.add_argument("--n-results", "-k", type=int, default=8, help="Results per search (default: 8)")
+    args = parser.parse_args()
+
+    run_benchmark(rounds=args.rounds, n_results=args.n_results)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Lexical Analyzer Benchmark
+Compares the per-message keyword/regex loops the detectors used to run with
+the single-pass lexical analyzer, and checks both produce the same features.
+
+Usage: python tests/bench_lexical_analyzer.py [--rounds 200]
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexical_analyzer as la
+from tests.golden_test_data import GOLDEN_TESTS
+
+EXTRA_MESSAGES = [
+    "mujhe sabse sasta iphone chahiye 30000 tak",
+    "is grest genuine or a scam? trustpilot reviews",
+    "grest vs cashify which is better",
+    "samsung s23 vs iphone 14 camera comparison",
+    "tell me more about it",
+    "I want to end my life",
+    "phones between 20000 to 40000",
+    "what is the warranty policy",
+    "cod available",
+    "cod available?",
+    "emi options",
+    "is there a promo code",
+]
+
+# Messages that must land in a keyword group, whatever the baseline says
+EXPECTED_GROUPS = {
+    "cod available": "policy",
+    "cod available?": "policy",
+    "emi options": "policy",
+}
+
+
+def legacy_features(message: str) -> dict:
+    """The original one-loop-per-list implementation, kept here as the baseline."""
+    message_lower = message.lower()
+    words = message_lower.split()
+    hinglish_count = sum(1 for word in words if word in list(la.HINGLISH_WORDS))
+
+    max_price = None
+    min_price = None
+    for pattern in la.MAX_PRICE_PATTERNS:
+        match = re.search(pattern, message_lower)
+        if match:
+            max_price = float(match.group(1).replace(',', ''))
+            break
+    for pattern in la.PRICE_RANGE_PATTERNS:
+        match = re.search(pattern, message_lower)
+        if match:
+            min_price = float(match.group(1).replace(',', ''))
+            max_price = float(match.group(2).replace(',', ''))
+            break
+
+    return {
+        "groups": sorted(
+            set(
+                group for group, keywords in la.KEYWORD_GROUPS.items()
+                if any(kw in message_lower for kw in keywords)
+            ) | set(
+                group for group, pattern in la.KEYWORD_GROUP_PATTERNS.items()
+                if re.search(pattern, message_lower)
+            )
+        ),
+        "hinglish_count": hinglish_count,
+        "coreference": any(re.search(p, message_lower) for p in la.COREFERENCE_PATTERNS),
+        "product_query": any(re.search(p, message_lower) for p in la.PRODUCT_QUERY_PATTERNS),
+        "max_price": max_price,
+        "min_price": min_price,
+        "triggers": sorted(
+            name for name, p in la.SEARCH_TRIGGER_PATTERNS.items()
+            if re.search(p, message_lower)
+        ),
+    }
+
+
+def analyzer_features(message: str) -> dict:
+    features = la.analyze_message(message)
+    return {
+        "groups": sorted(features.keyword_hits),
+        "hinglish_count": features.hinglish_count,
+        "coreference": features.has_coreference,
+        "product_query": features.has_product_query_pattern,
+        "max_price": features.max_price,
+        "min_price": features.min_price,
+        "triggers": sorted(features.search_triggers),
+    }
+
+
+def time_per_message(func, messages, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            func(message)
+    return (time.perf_counter() - start) / (rounds * len(messages)) * 1e6
+
+
+def run_benchmark(rounds: int = 200) -> dict:
+    messages = [t["query"] for t in GOLDEN_TESTS if t.get("query")] + EXTRA_MESSAGES
+
+    mismatches = []
+    for message in messages:
+        expected = legacy_features(message)
+        actual = analyzer_features(message)
+        if expected != actual:
+            mismatches.append({"message": message, "legacy": expected, "analyzer": actual})
+    for message, group in EXPECTED_GROUPS.items():
+        if not la.analyze_message(message).has(group):
+            mismatches.append({"message": message, "expected_group": group,
+                               "analyzer": analyzer_features(message)["groups"]})
+
+    legacy_us = time_per_message(legacy_features, messages, rounds)
+
+    def cold_analyze(message):
+        la.analyze_message.cache_clear()
+        return la.analyze_message(message)
+
+    cold_us = time_per_message(cold_analyze, messages, rounds)
+    warm_us = time_per_message(la.analyze_message, messages, rounds)
+
+    results = {
+        "messages": len(messages),
+        "rounds": rounds,
+        "legacy_us_per_message": round(legacy_us, 2),
+        "analyzer_cold_us_per_message": round(cold_us, 2),
+        "analyzer_cached_us_per_message": round(warm_us, 3),
+        "speedup_cold": round(legacy_us / cold_us, 2) if cold_us else None,
+        "mismatches": mismatches,
+    }
+
+    print("\n" + "="*70)
+    print("LEXICAL ANALYZER BENCHMARK")
+    print("="*70)
+    print(f"  Messages:            {results['messages']}")
+    print(f"  Legacy loops:        {results['legacy_us_per_message']} us/message")
+    print(f"  Analyzer (cold):     {results['analyzer_cold_us_per_message']} us/message")
+    print(f"  Analyzer (cached):   {results['analyzer_cached_us_per_message']} us/message")
+    print(f"  Speedup (cold):      {results['speedup_cold']}x")
+    print(f"  Feature mismatches:  {len(mismatches)}")
+    print("="*70 + "\n")
+
+    with open("tests/bench_lexical_analyzer_results.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results saved to: tests/bench_lexical_analyzer_results.json\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lexical analyzer benchmark")
+    parser.add_argument("--rounds", "-r", type=int, default=200, help="Passes over the message set (default: 200)")
+    args = parser.parse_args()
+
+    results = run_benchmark(rounds=args.rounds)
+    sys.exit(0 if not results["mismatches"] else 1)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Offline Pipeline Benchmark
+Runs generate_response / generate_response_stream end to end with the LLM
+transport in replay or stub mode, so the pipeline can be profiled and
+load-tested without network access.
+
+Record a cassette once against the live API:
+    LLM_TRANSPORT_MODE=record python tests/bench_pipeline_offline.py --mode record
+
+Then replay it anywhere, with the recorded latency and chunk timing:
+    python tests/bench_pipeline_offline.py --mode replay
+
+or with fixed synthetic timings instead:
+    python tests/bench_pipeline_offline.py --mode replay --latency-ms 400 --chunk-ms 15
+
+Usage: python tests/bench_pipeline_offline.py [--mode stub|replay|record] [--limit 30] [--profile]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import cProfile
+import pstats
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings: list) -> dict:
+    return {
+        "count": len(timings),
+        "mean_ms": round(statistics.mean(timings), 1) if timings else 0,
+        "p50_ms": round(percentile(timings, 50), 1),
+        "p95_ms": round(percentile(timings, 95), 1),
+        "max_ms": round(max(timings), 1) if timings else 0,
+    }
+
+
+def run_benchmark(limit: int = 30, profile: bool = False) -> dict:
+    from chatbot_engine import generate_response, generate_response_stream, get_openai_client
+    from tests.golden_test_data import GOLDEN_TESTS
+
+    queries = [t["query"] for t in GOLDEN_TESTS if t.get("query") and not t.get("skip")][:limit]
+
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+
+    blocking_ms = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        generate_response(query, [], session_id=f"bench_block_{i}")
+        blocking_ms.append((time.perf_counter() - start) * 1000)
+
+    first_chunk_ms = []
+    stream_total_ms = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        first = None
+        for event in generate_response_stream(query, [], session_id=f"bench_stream_{i}"):
+            if first is None and event.get("type") == "content":
+                first = (time.perf_counter() - start) * 1000
+        stream_total_ms.append((time.perf_counter() - start) * 1000)
+        if first is not None:
+            first_chunk_ms.append(first)
+
+    if profiler:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+    client = get_openai_client()
+    results = {
+        "mode": os.environ.get("LLM_TRANSPORT_MODE"),
+        "queries": len(queries),
+        "generate_response": summarize(blocking_ms),
+        "stream_first_chunk": summarize(first_chunk_ms),
+        "stream_total": summarize(stream_total_ms),
+        "transport_stats": getattr(client, "stats", None),
+    }
+
+    print("\n" + "="*70)
+    print(f"OFFLINE PIPELINE BENCHMARK ({results['mode']})")
+    print("="*70)
+    for name in ("generate_response", "stream_first_chunk", "stream_total"):
+        s = results[name]
+        print(f"  {name:<20} p50 {s['p50_ms']:>8} ms   p95 {s['p95_ms']:>8} ms   max {s['max_ms']:>8} ms")
+    print(f"  Transport:           {results['transport_stats']}")
+    print("="*70 + "\n")
+
+    with open("tests/bench_pipeline_offline_results.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results saved to: tests/bench_pipeline_offline_results.json\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--mode", "-m", choices=["stub", "replay", "record"], default="stub", help="LLM transport mode (default: stub)")
+    parser.add_argument("--limit", "-n", type=int, default=30, help="Number of golden queries to run (default: 30)")
+    parser.add_argument("--latency-ms", type=int, default=None, help="Synthetic response latency in replay mode (implies synthetic timing)")
+    parser.add_argument("--chunk-ms", type=int, default=None, help="Delay between streamed chunks in replay mode (implies synthetic timing)")
+    parser.add_argument("--cassette", help="Cassette path (default: tests/fixtures/llm_cassette.jsonl)")
+    parser.add_argument("--profile", action="store_true", help="Print a cProfile summary")
+    args = parser.parse_args()
+
+    # Transport settings are read at import time, so set them before importing the pipeline
+    os.environ["LLM_TRANSPORT_MODE"] = args.mode
+    if args.latency_ms is not None or args.chunk_ms is not None:
+        os.environ["LLM_REPLAY_TIMING"] = "synthetic"
+    if args.latency_ms is not None:
+        os.environ["LLM_REPLAY_LATENCY_MS"] = str(args.latency_ms)
+    if args.chunk_ms is not None:
+        os.environ["LLM_REPLAY_CHUNK_MS"] = str(args.chunk_ms)
+    if args.cassette:
+        os.environ["LLM_CASSETTE_PATH"] = args.cassette
+
+    run_benchmark(limit=args.limit, profile=args.profile)
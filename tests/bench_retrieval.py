@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Retrieval Quality and Latency Benchmark
+Builds a knowledge base from the HTML fixtures in tests/fixtures/grest_pages
+(a fixed snapshot of grest.in pages) in a scratch directory, runs the labeled
+queries in tests/fixtures/retrieval_queries.json (derived from
+tests/golden_test_data.py) and reports recall@k, hit@k, MRR, p50/p95 search
+latency, index size and build time as JSON, so runs with different
+CHUNK_SIZE / CHUNK_OVERLAP / n_results / embedding model / backend can be
+compared.
+
+Relevance is judged per source page: a query's relevant list names the
+fixture URLs that answer it, and results are ranked by first appearance of
+each source, as the chatbot groups context by source.
+
+Usage: python tests/bench_retrieval.py [--backend chroma|flat] [--chunk-size 1000] [--chunk-overlap 200] [--n-results 5] [--output results.json]
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+FIXTURES_DIR = REPO_ROOT / "tests" / "fixtures" / "grest_pages"
+QUERIES_FILE = REPO_ROOT / "tests" / "fixtures" / "retrieval_queries.json"
+DEFAULT_OUTPUT = REPO_ROOT / "tests" / "bench_retrieval_results.json"
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def dir_size_bytes(path: Path, exclude: set = frozenset()) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file() and p.name not in exclude)
+
+
+def load_fixture_documents() -> list:
+    from web_scraper import extract_page_text, clean_extracted_text
+
+    manifest = json.loads((FIXTURES_DIR / "manifest.json").read_text())
+    documents = []
+    for filename, url in manifest.items():
+        html = (FIXTURES_DIR / filename).read_text(encoding="utf-8")
+        content = clean_extracted_text(extract_page_text(html))
+        if content:
+            documents.append({"url": url, "content": content, "source": "website"})
+    return documents
+
+
+def ranked_sources(documents: list) -> list:
+    sources = []
+    for doc in documents:
+        if doc["source"] not in sources:
+            sources.append(doc["source"])
+    return sources
+
+
+def score_query(sources: list, relevant: set, ks: list) -> dict:
+    first_hit = next((rank for rank, source in enumerate(sources, 1) if source in relevant), None)
+    scores = {"rr": 1 / first_hit if first_hit else 0.0}
+    for k in ks:
+        found = relevant & set(sources[:k])
+        scores[f"recall@{k}"] = len(found) / len(relevant)
+        scores[f"hit@{k}"] = 1.0 if found else 0.0
+    return scores
+
+
+def run_benchmark(backend: str = "chroma", chunk_size: int = None, chunk_overlap: int = None,
+                  n_results: int = 5, rounds: int = 3, tiering: bool = True,
+                  embedding_cache: str = None, output: Path = DEFAULT_OUTPUT) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="bench_retrieval_"))
+    os.environ["KB_VECTOR_BACKEND"] = backend
+    os.environ["RETRIEVAL_CACHE_SIZE"] = "0"
+    os.environ["KB_EMBEDDING_CACHE_PATH"] = embedding_cache or str(workdir / "embedding_cache.sqlite3")
+    os.chdir(workdir)
+
+    import knowledge_base as kb
+    from lexical_analyzer import analyze_message
+
+    if chunk_size:
+        kb.CHUNK_SIZE = chunk_size
+    if chunk_overlap is not None:
+        kb.CHUNK_OVERLAP = chunk_overlap
+
+    documents = load_fixture_documents()
+    labeled = json.loads(QUERIES_FILE.read_text())["queries"]
+    ks = sorted({1, 3, n_results})
+
+    start = time.perf_counter()
+    chunks = kb.ingest_website_content(clear_existing=False, documents=documents)
+    build_s = time.perf_counter() - start
+
+    # warm the model and index handle so latency excludes one-off loading
+    kb.search_knowledge_base(labeled[0]["query"], n_results=n_results)
+
+    per_query = []
+    timings = []
+    for item in labeled:
+        prefer_authoritative = tiering and analyze_message(item["query"]).has("policy")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            results = kb.search_knowledge_base(item["query"], n_results=n_results, prefer_authoritative=prefer_authoritative)
+            timings.append((time.perf_counter() - start) * 1000)
+        sources = ranked_sources(results)
+        scores = score_query(sources, set(item["relevant"]), ks)
+        per_query.append({"id": item["id"], "query": item["query"], "top_sources": sources[:n_results], **scores})
+
+    def mean_of(key):
+        return round(statistics.mean(q[key] for q in per_query), 4)
+
+    results = {
+        "config": {
+            "backend": backend,
+            "chunk_size": kb.CHUNK_SIZE,
+            "chunk_overlap": kb.CHUNK_OVERLAP,
+            "n_results": n_results,
+            "tiered_policy_retrieval": tiering,
+            "embedding_model": kb.get_embedding_model_name(),
+        },
+        "corpus": {"pages": len(documents), "chunks": chunks},
+        "queries": len(per_query),
+        "mrr": mean_of("rr"),
+        **{f"recall@{k}": mean_of(f"recall@{k}") for k in ks},
+        **{f"hit@{k}": mean_of(f"hit@{k}") for k in ks},
+        "search_latency": {
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "mean_ms": round(statistics.mean(timings), 2),
+        },
+        "build_seconds": round(build_s, 2),
+        "index_bytes": dir_size_bytes(workdir / "vector_db", exclude={"embedding_cache.sqlite3", "embedding_cache.sqlite3-wal", "embedding_cache.sqlite3-shm"}),
+        "per_query": per_query,
+    }
+
+    print("\n" + "="*70)
+    print(f"RETRIEVAL BENCHMARK ({backend}, chunk {kb.CHUNK_SIZE}/{kb.CHUNK_OVERLAP}, k={n_results})")
+    print("="*70)
+    print(f"  Corpus:        {len(documents)} pages, {chunks} chunks (built in {results['build_seconds']}s)")
+    print(f"  Index size:    {results['index_bytes'] / 1024:.1f} KB")
+    print(f"  MRR:           {results['mrr']}")
+    for k in ks:
+        print(f"  recall@{k:<3}     {results[f'recall@{k}']:<8} hit@{k}: {results[f'hit@{k}']}")
+    print(f"  Search:        p50 {results['search_latency']['p50_ms']} ms   p95 {results['search_latency']['p95_ms']} ms")
+    misses = [q["id"] for q in per_query if q["rr"] == 0]
+    if misses:
+        print(f"  No relevant page retrieved: {', '.join(misses)}")
+    print("="*70 + "\n")
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {output}\n")
+
+    os.chdir(REPO_ROOT)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG retrieval quality and latency benchmark on local fixtures")
+    parser.add_argument("--backend", choices=["chroma", "flat"], default="chroma", help="Vector backend (default: chroma)")
+    parser.add_argument("--chunk-size", type=int, help="Override knowledge_base.CHUNK_SIZE")
+    parser.add_argument("--chunk-overlap", type=int, help="Override knowledge_base.CHUNK_OVERLAP")
+    parser.add_argument("--n-results", "-k", type=int, default=5, help="Chunks retrieved per query (default: 5)")
+    parser.add_argument("--rounds", "-r", type=int, default=3, help="Timed searches per query (default: 3)")
+    parser.add_argument("--no-tiering", action="store_true", help="Disable two-tier retrieval for policy questions")
+    parser.add_argument("--embedding-cache", help="Reuse this embedding cache file (default: fresh per run)")
+    parser.add_argument("--output", "-o", type=Path, default=DEFAULT_OUTPUT, help="Results JSON path")
+    args = parser.parse_args()
+
+    run_benchmark(backend=args.backend, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                  n_results=args.n_results, rounds=args.rounds, tiering=not args.no_tiering,
+                  embedding_cache=args.embedding_cache, output=args.output.resolve())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Shopify Sync Engine Benchmark
+Runs a Shopify sync engine against the local Admin API stand-in
+(tests/shopify_standin_server.py) and reports Shopify requests, products and
+variants produced, and fetch + transform time. With --db the full
+populate_database sync also runs against DATABASE_URL.
+
+The REST engine fetches metafields per product through the rate limiter;
+--bucket-size/--leak-rate set the stand-in's call limit so throttling can be
+exercised. --updated-since runs the delta fetch instead (products updated
+since then plus the id-only listing used for deletions).
+
+Usage: python tests/bench_shopify_sync.py [--engine bulk|rest] [--polls 1] [--db] [--bucket-size 40] [--leak-rate 2] [--updated-since 2026-10-12T00:00:00]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.shopify_standin_server import start_standin_server, DEFAULT_FIXTURE
+
+DEFAULT_OUTPUT = REPO_ROOT / "tests" / "bench_shopify_sync_results.json"
+
+
+def run_benchmark(engine: str = "bulk", polls: int = 1, use_db: bool = False,
+                  fixture: Path = DEFAULT_FIXTURE, output: Path = DEFAULT_OUTPUT,
+                  bucket_size: int = 40, leak_rate: float = 2, updated_since: datetime = None) -> dict:
+    server, base_url, state = start_standin_server(fixture=fixture, polls_before_complete=polls,
+                                                   bucket_size=bucket_size, leak_rate=leak_rate)
+    os.environ["SHOPIFY_STORE_URL"] = base_url
+    os.environ.setdefault("SHOPIFY_ACCESS_TOKEN", "standin")
+    os.environ["SHOPIFY_BULK_POLL_INTERVAL"] = "0.05"
+
+    import scrape_grest_products as sgp
+
+    start = time.perf_counter()
+    products = 0
+    rows = []
+    active_ids = None
+    if updated_since:
+        engine = "rest (delta)"
+        fetched = sgp.fetch_all_products(updated_at_min=updated_since)
+        active_ids = sgp.fetch_active_product_ids()
+    else:
+        fetched = sgp.fetch_products(engine)
+    specs_by_product = sgp.prefetch_product_metafields(fetched) if isinstance(fetched, list) else {}
+    for product in fetched:
+        products += 1
+        rows.extend(sgp._prepare_product_variants(product, specs_by_product.get(product["id"])))
+    transform_s = time.perf_counter() - start
+
+    results = {
+        "engine": engine,
+        "products": products,
+        "variants": len(rows),
+        "skus_unique": len({row["sku"] for row in rows}) == len(rows),
+        "fetch_transform_seconds": round(transform_s, 3),
+        "shopify_requests": dict(state.requests),
+        "shopify_requests_total": sum(state.requests.values()),
+        "rate_limiter": sgp.rate_limiter.get_stats(),
+    }
+    if active_ids is not None:
+        results["active_product_ids"] = len(active_ids)
+
+    if use_db:
+        sync = sgp.populate_database(hard_delete_stale=True, engine=engine.split()[0], updated_since=updated_since)
+        results["populate_database"] = sync
+
+    server.shutdown()
+
+    print("\n" + "="*70)
+    print(f"SHOPIFY SYNC ({engine} engine, stand-in at {base_url})")
+    print("="*70)
+    print(f"  Products:          {results['products']}")
+    print(f"  Variants:          {results['variants']} (unique SKUs: {results['skus_unique']})")
+    print(f"  Fetch + transform: {results['fetch_transform_seconds']}s")
+    print(f"  Shopify requests:  {results['shopify_requests_total']} {results['shopify_requests']}")
+    print(f"  Rate limiter:      {results['rate_limiter']}")
+    if active_ids is not None:
+        print(f"  Active product ids: {results['active_product_ids']}")
+    if use_db:
+        print(f"  Database sync:     {results['populate_database']}")
+    print("="*70 + "\n")
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Results saved to: {output}\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shopify sync engine benchmark against the local stand-in")
+    parser.add_argument("--engine", "-e", choices=["bulk", "rest"], default="bulk", help="Sync engine (default: bulk)")
+    parser.add_argument("--polls", type=int, default=1, help="Status polls before the bulk job completes (default: 1)")
+    parser.add_argument("--db", action="store_true", help="Also run populate_database against DATABASE_URL")
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE, help="Recorded bulk JSONL output")
+    parser.add_argument("--bucket-size", type=int, default=40, help="Stand-in REST call limit bucket size (default: 40)")
+    parser.add_argument("--leak-rate", type=float, default=2, help="Stand-in REST calls leaked per second (default: 2)")
+    parser.add_argument("--updated-since", type=datetime.fromisoformat, default=None,
+                        help="Delta fetch of products updated since this UTC time (REST)")
+    parser.add_argument("--output", "-o", type=Path, default=DEFAULT_OUTPUT, help="Results JSON path")
+    args = parser.parse_args()
+
+    run_benchmark(engine=args.engine, polls=args.polls, use_db=args.db, fixture=args.fixture, output=args.output.resolve(),
+                  bucket_size=args.bucket_size, leak_rate=args.leak_rate, updated_since=args.updated_since)
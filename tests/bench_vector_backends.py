@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Vector Backend Benchmark
+Builds the same synthetic index (random unit vectors with knowledge-base-like
+metadata) in the Chroma backend and the flat memory-mapped NumPy backend, then
+compares build time, query latency (p50/p99, unfiltered and with the
+authority filter used for policy questions), resident memory and on-disk size.
+Also checks that flat top-k matches an exact brute-force ranking.
+
+Usage: python tests/bench_vector_backends.py [--chunks 5000] [--dim 384] [--queries 200] [--dtype float32]
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from vector_store import ChromaVectorStore, FlatVectorStore
+
+AUTHORITY_FILTER = {"authority": {"$lte": 2}}
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def rss_mb() -> float:
+    """Resident set size of this process (Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def dir_size_mb(path: Path) -> float:
+    total = sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return round(total / (1024 * 1024), 2)
+
+
+def make_corpus(chunks: int, dim: int, queries: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"chunk_{i}" for i in range(chunks)]
+    documents = [f"Synthetic chunk {i}" for i in range(chunks)]
+    metadatas = [
+        {"source": f"https://grest.in/page-{i % 400}", "type": "website", "chunk_index": i % 12, "authority": 1 + i % 4}
+        for i in range(chunks)
+    ]
+    queries = rng.standard_normal((max(1, queries), dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, ids, documents, metadatas, queries
+
+
+def build(store, vectors, ids, documents, metadatas, batch_size: int = 512) -> float:
+    start = time.perf_counter()
+    with store.deferred_writes():
+        for i in range(0, len(ids), batch_size):
+            store.upsert(
+                ids=ids[i:i + batch_size],
+                documents=documents[i:i + batch_size],
+                metadatas=metadatas[i:i + batch_size],
+                embeddings=vectors[i:i + batch_size].tolist()
+            )
+    return time.perf_counter() - start
+
+
+def time_queries(store, queries, n_results: int, where: dict = None) -> dict:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query(query_embeddings=[query.tolist()], n_results=n_results, where=where)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+    }
+
+
+def exact_recall(store, vectors, queries, n_results: int) -> float:
+    """Fraction of the brute-force top-k returned by the store."""
+    hits = 0
+    for query in queries:
+        expected = set(np.argsort(-(vectors @ query))[:n_results].tolist())
+        got = store.query(query_embeddings=[query.tolist()], n_results=n_results)["ids"][0]
+        hits += len(expected & {int(chunk_id.split("_")[1]) for chunk_id in got})
+    return round(hits / (len(queries) * n_results), 4)
+
+
+def bench_backend(name: str, make_store, corpus, n_results: int, workdir: Path) -> dict:
+    vectors, ids, documents, metadatas, queries = corpus
+    rss_before = rss_mb()
+    store = make_store(workdir)
+    build_s = build(store, vectors, ids, documents, metadatas)
+
+    # re-open so the flat index is served from the memory map, as after a restart
+    store = make_store(workdir)
+    store.query(query_embeddings=[queries[0].tolist()], n_results=n_results)
+
+    return {
+        "backend": name,
+        "build_s": round(build_s, 2),
+        "count": store.count(),
+        "query": time_queries(store, queries, n_results),
+        "query_authority_filter": time_queries(store, queries, n_results, where=AUTHORITY_FILTER),
+        "recall_at_k": exact_recall(store, vectors, queries[:50], n_results),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+        "disk_mb": dir_size_mb(workdir),
+    }
+
+
+def run_benchmark(chunks: int = 5000, dim: int = 384, queries: int = 200, n_results: int = 8,
+                  dtype: str = "float32", backends: list = None) -> dict:
+    corpus = make_corpus(chunks, dim, queries)
+    backends = backends or ["flat", "chroma"]
+    root = Path(tempfile.mkdtemp(prefix="bench_vector_"))
+
+    def make_flat(path):
+        return FlatVectorStore(path, dtype=dtype)
+
+    def make_chroma(path):
+        import chromadb
+        from chromadb.config import Settings
+        client = chromadb.PersistentClient(path=str(path), settings=Settings(anonymized_telemetry=False))
+        return ChromaVectorStore(client.get_or_create_collection(name="bench", embedding_function=None))
+
+    makers = {"flat": make_flat, "chroma": make_chroma}
+    results = {"chunks": chunks, "dim": dim, "queries": len(corpus[4]), "n_results": n_results, "flat_dtype": dtype, "backends": []}
+
+    try:
+        for name in backends:
+            print(f"Benchmarking {name} backend...")
+            results["backends"].append(bench_backend(name, makers[name], corpus, n_results, root / name))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\n" + "="*70)
+    print(f"VECTOR BACKENDS ({chunks} chunks x {dim} dims, k={n_results})")
+    print("="*70)
+    for r in results["backends"]:
+        print(f"  {r['backend']:<7} build {r['build_s']:>7}s   disk {r['disk_mb']:>7} MB   rss +{r['rss_delta_mb']} MB   recall@k {r['recall_at_k']}")
+        for label in ("query", "query_authority_filter"):
+            q = r[label]
+            print(f"          {label:<24} p50 {q['p50_ms']:>8} ms   p99 {q['p99_ms']:>8} ms")
+    print("="*70 + "\n")
+
+    with open("tests/bench_vector_backends_results.json", "w") as f:
+        json.dump(results, f, indent=2)
+    print("Results saved to: tests/bench_vector_backends_results.json\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chroma vs flat NumPy vector backend benchmark")
+    parser.add_argument("--chunks", "-n", type=int, default=5000, help="Synthetic chunks to index (default: 5000)")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (default: 384, MiniLM)")
+    parser.add_argument("--queries", "-q", type=int, default=200, help="Queries to time (default: 200)")
+    parser.add_argument("--n-results", "-k", type=int, default=8, help="Results per query (default: 8)")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32", help="Flat index dtype (default: float32)")
+    parser.add_argument("--backend", action="append", choices=["flat", "chroma"], help="Backend(s) to run (default: both)")
+    args = parser.parse_args()
+
+    run_benchmark(chunks=args.chunks, dim=args.dim, queries=args.queries, n_results=args.n_results,
+                  dtype=args.dtype, backends=args.backend)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Shopify Admin API Stand-in Server
+A local HTTP server that answers the Admin API calls made by the sync engines
+from recorded data, so Shopify syncs can be run and benchmarked offline.
+
+Bulk engine (shopify_bulk_sync.py):
+    POST /admin/api/<version>/graphql.json   bulkOperationRunQuery, then node(id) polls
+    GET  /bulk/products.jsonl                the recorded bulk output
+
+REST engine (scrape_grest_products.fetch_all_products):
+    GET  /admin/api/<version>/products.json                 paginated with Link headers,
+                                                            updated_at_min and fields filters
+    GET  /admin/api/<version>/products/<id>/metafields.json
+
+REST responses carry X-Shopify-Shop-Api-Call-Limit from a simulated leaky
+bucket (--bucket-size, --leak-rate); a request that overflows it gets a 429
+with Retry-After, as Shopify does.
+
+The recorded output is tests/fixtures/shopify_bulk_products.jsonl, in the JSONL
+format Shopify publishes for a bulk query (one object per line, nested
+connections flattened with "__parentId").
+
+Point the app at it with:
+    SHOPIFY_STORE_URL=http://127.0.0.1:8899 SHOPIFY_ACCESS_TOKEN=standin
+
+Usage: python tests/shopify_standin_server.py [--port 8899] [--fixture tests/fixtures/shopify_bulk_products.jsonl] [--bucket-size 40] [--leak-rate 2]
+"""
+
+import os
+import re
+import json
+import argparse
+import threading
+import time
+import sys
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs, urlencode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_FIXTURE = REPO_ROOT / "tests" / "fixtures" / "shopify_bulk_products.jsonl"
+sys.path.insert(0, str(REPO_ROOT))
+
+BULK_OPERATION_ID = "gid://shopify/BulkOperation/1"
+
+
+class StandinState:
+    """Recorded data plus request counters shared by the handler threads."""
+
+    def __init__(self, fixture: Path, polls_before_complete: int = 1, bucket_size: int = 40, leak_rate: float = 2):
+        self.fixture = Path(fixture)
+        self.polls_before_complete = polls_before_complete
+        self.polls_remaining = polls_before_complete
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.bucket_level = 0.0
+        self.bucket_updated = time.monotonic()
+        self._rest_products = None
+        # Fault injection for tests: cap the products.json page size, and answer
+        # these (1-based) products.json pages with a 500
+        self.max_page_size = None
+        self.fail_pages = set()
+
+    def count(self, kind: str):
+        with self.lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def object_count(self) -> int:
+        with open(self.fixture, encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
+
+    def take_call(self):
+        """Add a REST call to the bucket. Returns (allowed, level)."""
+        with self.lock:
+            now = time.monotonic()
+            self.bucket_level = max(0.0, self.bucket_level - (now - self.bucket_updated) * self.leak_rate)
+            self.bucket_updated = now
+            if self.bucket_level + 1 > self.bucket_size:
+                self.requests["rest_throttled"] = self.requests.get("rest_throttled", 0) + 1
+                return False, self.bucket_level
+            self.bucket_level += 1
+            return True, self.bucket_level
+
+    def rest_products(self) -> list:
+        """The recorded products in REST shape, metafields kept separately."""
+        if self._rest_products is None:
+            from unittest import mock
+            import shopify_bulk_sync
+            with open(self.fixture, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+            # regroup with the bulk engine's own parser, reading the file instead of a URL
+            with mock.patch.object(shopify_bulk_sync, "iter_jsonl", lambda url: iter(lines)):
+                self._rest_products = list(shopify_bulk_sync.iter_bulk_products(str(self.fixture)))
+        return self._rest_products
+
+
+def make_handler(state: StandinState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, payload: dict, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not re.match(r"^/admin/api/[^/]+/graphql\.json$", self.path):
+                return self.send_json({"errors": "Not Found"}, 404)
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            query = request.get("query", "")
+
+            if "bulkOperationRunQuery" in query:
+                state.count("graphql_bulk_start")
+                with state.lock:
+                    state.polls_remaining = state.polls_before_complete
+                return self.send_json({"data": {"bulkOperationRunQuery": {
+                    "bulkOperation": {"id": BULK_OPERATION_ID, "status": "CREATED"},
+                    "userErrors": [],
+                }}})
+
+            if "BulkOperation" in query:
+                state.count("graphql_bulk_poll")
+                with state.lock:
+                    running = state.polls_remaining > 0
+                    state.polls_remaining -= 1
+                host, port = self.server.server_address[:2]
+                operation = {"id": BULK_OPERATION_ID, "errorCode": None, "partialDataUrl": None}
+                if running:
+                    operation.update(status="RUNNING", objectCount=str(state.object_count() // 2), url=None)
+                else:
+                    operation.update(status="COMPLETED", objectCount=str(state.object_count()),
+                                     url=f"http://{host}:{port}/bulk/products.jsonl")
+                return self.send_json({"data": {"node": operation}})
+
+            return self.send_json({"errors": [{"message": "Unsupported query"}]}, 400)
+
+        def send_rest(self, kind: str, payload: dict, link: str = None):
+            state.count(kind)
+            allowed, level = state.take_call()
+            body = json.dumps(payload if allowed else {"errors": "Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service."}).encode("utf-8")
+            self.send_response(200 if allowed else 429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Shopify-Shop-Api-Call-Limit", f"{int(level)}/{state.bucket_size}")
+            if not allowed:
+                self.send_header("Retry-After", "1.0")
+            if link and allowed:
+                self.send_header("Link", link)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+            if re.match(r"^/admin/api/[^/]+/products\.json$", url.path):
+                products = state.rest_products()
+                if "updated_at_min" in params:
+                    since = datetime.fromisoformat(params["updated_at_min"].replace("Z", "+00:00"))
+                    products = [p for p in products
+                                if datetime.fromisoformat(p["updated_at"].replace("Z", "+00:00")) >= since]
+                fields = params["fields"].split(",") if "fields" in params else None
+                limit = int(params.get("limit", 50))
+                if state.max_page_size:
+                    limit = min(limit, state.max_page_size)
+                offset = int(params.get("page_info", 0))
+                if offset // limit + 1 in state.fail_pages:
+                    state.count("rest_products_failed")
+                    return self.send_json({"errors": "Internal Server Error"}, 500)
+                page = [{k: v for k, v in product.items() if k != "metafields" and (fields is None or k in fields)}
+                        for product in products[offset:offset + limit]]
+                link = None
+                if offset + limit < len(products):
+                    # Shopify's page_info cursor carries the original filters
+                    host, port = self.server.server_address[:2]
+                    query = urlencode({**params, "limit": limit, "page_info": offset + limit})
+                    link = f'<http://{host}:{port}{url.path}?{query}>; rel="next"'
+                kind = "rest_product_ids" if fields == ["id"] else "rest_products"
+                return self.send_rest(kind, {"products": page}, link)
+
+            match = re.match(r"^/admin/api/[^/]+/products/(\d+)/metafields\.json$", url.path)
+            if match:
+                product = next((p for p in state.rest_products() if p["id"] == int(match.group(1))), None)
+                if product is None:
+                    return self.send_json({"errors": "Not Found"}, 404)
+                return self.send_rest("rest_metafields", {"metafields": product["metafields"]})
+
+            if url.path == "/bulk/products.jsonl":
+                state.count("bulk_download")
+                body = state.fixture.read_bytes()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/jsonl")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self.send_json({"errors": "Not Found"}, 404)
+
+    return Handler
+
+
+def start_standin_server(port: int = 0, fixture: Path = DEFAULT_FIXTURE, polls_before_complete: int = 1,
+                         bucket_size: int = 40, leak_rate: float = 2):
+    """Start the stand-in in a background thread. Returns (server, base_url, state)."""
+    state = StandinState(fixture, polls_before_complete, bucket_size, leak_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, name="shopify-standin", daemon=True).start()
+    host, bound_port = server.server_address[:2]
+    return server, f"http://{host}:{bound_port}", state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Shopify Admin API")
+    parser.add_argument("--port", "-p", type=int, default=8899, help="Port to listen on (default: 8899)")
+    parser.add_argument("--fixture", "-f", type=Path, default=DEFAULT_FIXTURE, help="Recorded bulk JSONL output")
+    parser.add_argument("--bucket-size", type=int, default=40, help="REST call limit bucket size (default: 40)")
+    parser.add_argument("--leak-rate", type=float, default=2, help="REST calls leaked per second (default: 2)")
+    args = parser.parse_args()
+
+    server, base_url, _ = start_standin_server(args.port, args.fixture, bucket_size=args.bucket_size, leak_rate=args.leak_rate)
+    print(f"Shopify stand-in serving {args.fixture} at {base_url}")
+    print(f"  SHOPIFY_STORE_URL={base_url} SHOPIFY_ACCESS_TOKEN=standin")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
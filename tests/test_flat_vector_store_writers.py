@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Flat Vector Store Writers Test
+Two FlatVectorStore instances (standing in for two processes) share one index
+directory and write in turn. Each write must start from the generation the
+other published, so a store opened earlier never overwrites newer chunks.
+
+Usage: python tests/test_flat_vector_store_writers.py [--dim 8]
+"""
+
+import sys
+import os
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from vector_store import FlatVectorStore
+
+
+def run_test(dim: int = 8) -> bool:
+    rng = np.random.default_rng(0)
+    root = Path(tempfile.mkdtemp(prefix="flat_writers_"))
+    try:
+        first = FlatVectorStore(root)
+        second = FlatVectorStore(root)
+
+        first.upsert(["a"], ["chunk a"], [{"source": "first"}], embeddings=rng.normal(size=(1, dim)).tolist())
+        second.upsert(["b"], ["chunk b"], [{"source": "second"}], embeddings=rng.normal(size=(1, dim)).tolist())
+        after_upsert = FlatVectorStore(root).get(include=["metadatas"])
+
+        first.update(["b"], [{"source": "second", "edited_by": "first"}])
+        after_update = FlatVectorStore(root).get(include=["metadatas"])
+        metadata = dict(zip(after_update["ids"], after_update["metadatas"]))
+
+        checks = {
+            "stale upsert keeps the other store's chunk": sorted(after_upsert["ids"]) == ["a", "b"],
+            "stale update keeps every chunk": sorted(after_update["ids"]) == ["a", "b"],
+            "stale update reaches the other store's chunk": metadata.get("b", {}).get("edited_by") == "first",
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\n" + "="*70)
+    print("FLAT VECTOR STORE: TWO WRITERS ON ONE INDEX")
+    print("="*70)
+    for name, ok in checks.items():
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+    print("="*70 + "\n")
+
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Two FlatVectorStore writers sharing one index directory")
+    parser.add_argument("--dim", type=int, default=8, help="Embedding dimension (default: 8)")
+    args = parser.parse_args()
+
+    sys.exit(0 if run_test(dim=args.dim) else 1)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Shopify Delta Sync Failure Test
+Runs a scheduled delta sync (sync_manager.sync_shopify_products) against the
+local Admin API stand-in with page 2 of the products listing answering 500,
+and checks the run is recorded as failed and the next delta sync still starts
+from the last successful run (the lost window is not skipped).
+
+Needs a DATABASE_URL (a scratch SQLite file works, e.g. sqlite:////tmp/sync_failure.db);
+the sync_runs and grest_products tables are created there.
+
+Usage: DATABASE_URL=sqlite:////tmp/sync_failure.db python tests/test_shopify_sync_failure.py [--page-size 2] [--fail-page 2]
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from tests.shopify_standin_server import start_standin_server
+
+# Before the fixture's updatedAt range, so the delta listing spans several pages
+LAST_FULL_STARTED = datetime(2026, 10, 12)
+
+
+def run_test(page_size: int = 2, fail_page: int = 2) -> bool:
+    server, base_url, state = start_standin_server()
+    state.max_page_size = page_size
+    state.fail_pages = {fail_page}
+    os.environ["SHOPIFY_STORE_URL"] = base_url
+    os.environ.setdefault("SHOPIFY_ACCESS_TOKEN", "standin")
+    # Keep the seeded full run recent enough for a delta sync whatever today's date
+    os.environ["SHOPIFY_FULL_SYNC_HOURS"] = str(10 ** 6)
+
+    from database import init_database, get_db_session, SyncRun
+    import sync_manager
+
+    init_database()
+    with get_db_session() as db:
+        if db is None:
+            print("ERROR: DATABASE_URL not set")
+            return False
+        db.query(SyncRun).delete()
+        db.add(SyncRun(trigger_source='scheduled', triggered_by='scheduler', status='success', sync_mode='full',
+                       started_at=LAST_FULL_STARTED, finished_at=LAST_FULL_STARTED, api_calls=10))
+
+    with get_db_session() as db:
+        before = sync_manager.plan_shopify_sync(db)
+    result = sync_manager.sync_shopify_products()
+    with get_db_session() as db:
+        run = db.query(SyncRun).order_by(SyncRun.id.desc()).first()
+        run_mode, run_status = run.sync_mode, run.status
+        after = sync_manager.plan_shopify_sync(db)
+    server.shutdown()
+
+    checks = {
+        "delta sync planned": before["mode"] == "delta",
+        "failed page requested": state.requests.get("rest_products_failed", 0) >= 1,
+        "sync failed fetching products": (not result.get("success")
+                                          and "Failed to fetch products" in str(result.get("error"))),
+        "run recorded as failed": (run_mode, run_status) == ("delta", "failed"),
+        "next sync keeps the watermark": after["updated_since"] == before["updated_since"],
+    }
+
+    print("\n" + "="*70)
+    print(f"SHOPIFY DELTA SYNC FAILURE (page {fail_page} of {page_size}-product pages answers 500)")
+    print("="*70)
+    for name, ok in checks.items():
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+    print(f"  Sync result: {result}")
+    print("="*70 + "\n")
+
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delta sync must fail when a products page fails")
+    parser.add_argument("--page-size", type=int, default=2, help="Stand-in products per page (default: 2)")
+    parser.add_argument("--fail-page", type=int, default=2, help="Products page that answers 500 (default: 2)")
+    args = parser.parse_args()
+
+    sys.exit(0 if run_test(page_size=args.page_size, fail_page=args.fail_page) else 1)
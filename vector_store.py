@@ -0,0 +1,474 @@
+"""
+Vector Store Backends for the GRESTA Knowledge Base
+
+knowledge_base.py talks to its vector index through the small, Chroma-shaped
+`VectorStore` interface defined here (count / get / upsert / update / delete /
+query). Two backends implement it:
+
+- ChromaVectorStore: the existing ChromaDB collection (HNSW + SQLite)
+- FlatVectorStore:   exact brute-force search over a memory-mapped NumPy matrix
+
+The knowledge base is a few thousand chunks, so an exact dot product over an
+mmap'd float32/float16 matrix is fast, fully predictable, and opens instantly.
+FlatVectorStore keeps chunk text and metadata in a JSONL sidecar and writes
+every change as a new generation directory, switched in atomically by
+rewriting a CURRENT pointer file - readers never see a half-written index.
+
+Select with KB_VECTOR_BACKEND=chroma|flat (see knowledge_base.get_or_create_collection).
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+FLAT_INDEX_DTYPE = os.environ.get("KB_FLAT_DTYPE", "float32")
+
+# float16 matrices are scored in blocks upcast to float32 (NumPy has no fast float16 matmul)
+_SCORE_BLOCK_ROWS = 4096
+
+
+class VectorStore:
+    """
+    Interface the knowledge base uses for its vector index.
+
+    Mirrors the subset of the ChromaDB Collection API the module relies on, so
+    results keep Chroma's shapes: `get` returns flat lists, `query` returns one
+    list per query embedding, and distances are squared L2 (lower is closer).
+    """
+
+    backend = "base"
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def get(self, ids: List[str] = None, where: dict = None, include: List[str] = None) -> dict:
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings: List[List[float]] = None):
+        raise NotImplementedError
+
+    def update(self, ids: List[str], metadatas: List[dict]):
+        raise NotImplementedError
+
+    def delete(self, ids: List[str] = None, where: dict = None):
+        raise NotImplementedError
+
+    def query(self, query_embeddings: List[List[float]] = None, n_results: int = 10,
+              where: dict = None, query_texts: List[str] = None) -> dict:
+        raise NotImplementedError
+
+    def delete_all(self):
+        """Remove every chunk."""
+        ids = self.get(include=[]).get("ids") or []
+        if ids:
+            self.delete(ids=ids)
+
+    def defer_writes(self):
+        """Hold index writes until flush() (no-op for backends that write immediately)."""
+
+    def flush(self):
+        """Persist any deferred writes."""
+
+    @contextmanager
+    def deferred_writes(self):
+        """Defer writes for the block and flush when it exits, even on error."""
+        self.defer_writes()
+        try:
+            yield self
+        finally:
+            self.flush()
+
+
+class ChromaVectorStore(VectorStore):
+    """VectorStore over a ChromaDB collection."""
+
+    backend = "chroma"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get(self, ids: List[str] = None, where: dict = None, include: List[str] = None) -> dict:
+        kwargs = {}
+        if ids is not None:
+            kwargs["ids"] = ids
+        if where:
+            kwargs["where"] = where
+        if include is not None:
+            kwargs["include"] = include
+        return self.collection.get(**kwargs)
+
+    def upsert(self, ids, documents, metadatas, embeddings=None):
+        kwargs = {"ids": ids, "documents": documents, "metadatas": metadatas}
+        if embeddings is not None:
+            kwargs["embeddings"] = embeddings
+        self.collection.upsert(**kwargs)
+
+    def update(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids=None, where=None):
+        kwargs = {}
+        if ids is not None:
+            kwargs["ids"] = ids
+        if where:
+            kwargs["where"] = where
+        self.collection.delete(**kwargs)
+
+    def query(self, query_embeddings=None, n_results=10, where=None, query_texts=None):
+        kwargs = {"n_results": n_results}
+        if query_embeddings is not None:
+            kwargs["query_embeddings"] = query_embeddings
+        else:
+            kwargs["query_texts"] = query_texts
+        if where:
+            kwargs["where"] = where
+        return self.collection.query(**kwargs)
+
+
+# =============================================================================
+# Metadata filters (Chroma `where` syntax subset)
+# =============================================================================
+
+_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+
+def matches_where(metadata: dict, where: Optional[dict]) -> bool:
+    """Evaluate a Chroma-style `where` filter against one metadata dict."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                if not _OPERATORS[op](value, operand):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+# =============================================================================
+# Flat NumPy backend
+# =============================================================================
+
+class FlatVectorStore(VectorStore):
+    """
+    Exact nearest-neighbour search over a memory-mapped, L2-normalized matrix.
+
+    On disk (under `root`):
+        CURRENT                   name of the live generation
+        gen-<ns>/vectors.npy      (n, dim) float32/float16, rows L2-normalized
+        gen-<ns>/records.jsonl    one {"id", "document", "metadata"} per row
+
+    The live matrix is opened with mmap_mode='r'. The first mutation copies it
+    into memory; flush() writes a new generation and swaps CURRENT with
+    os.replace, then removes generations older than the previous one. Other processes pick up the
+    new generation on their next query, and before their next write unless
+    they hold unflushed (deferred) changes.
+    """
+
+    backend = "flat"
+
+    def __init__(self, root: Path, embedding_function: Callable[[List[str]], List[List[float]]] = None,
+                 dtype: str = FLAT_INDEX_DTYPE):
+        self.root = Path(root)
+        self.embedding_function = embedding_function
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._deferred = False
+        self._dirty = False
+        self._loaded_generation = None
+        self._current_mtime = None
+        self._load()
+
+    # -- persistence ----------------------------------------------------------
+
+    def _current_file(self) -> Path:
+        return self.root / "CURRENT"
+
+    def _reset_state(self, dim: int = 0):
+        self._vectors = np.zeros((0, dim), dtype=self.dtype)
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[dict] = []
+        self._index: Dict[str, int] = {}
+        self._filter_rows: Dict[str, np.ndarray] = {}
+
+    def _load(self):
+        with self._lock:
+            current = self._current_file()
+            if not current.exists():
+                self._reset_state()
+                self._loaded_generation = None
+                self._current_mtime = None
+                return
+
+            generation = current.read_text().strip()
+            gen_dir = self.root / generation
+            vectors = np.load(gen_dir / "vectors.npy", mmap_mode="r")
+            ids, documents, metadatas = [], [], []
+            with open(gen_dir / "records.jsonl", "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    ids.append(record["id"])
+                    documents.append(record["document"])
+                    metadatas.append(record["metadata"])
+
+            self._vectors = vectors
+            self._ids = ids
+            self._documents = documents
+            self._metadatas = metadatas
+            self._index = {chunk_id: i for i, chunk_id in enumerate(ids)}
+            self._filter_rows = {}
+            self._loaded_generation = generation
+            self._current_mtime = current.stat().st_mtime_ns
+
+    def _maybe_reload(self):
+        """Re-open the index if another process swapped in a new generation."""
+        if self._dirty:
+            return
+        current = self._current_file()
+        mtime = current.stat().st_mtime_ns if current.exists() else None
+        if mtime != self._current_mtime:
+            self._load()
+
+    def flush(self):
+        """Write the in-memory index as a new generation and atomically switch to it."""
+        with self._lock:
+            self._deferred = False
+            if not self._dirty:
+                return
+
+            self.root.mkdir(parents=True, exist_ok=True)
+            generation = f"gen-{time.time_ns()}"
+            staging = self.root / f".{generation}.tmp"
+            staging.mkdir()
+            np.save(staging / "vectors.npy", np.ascontiguousarray(self._vectors, dtype=self.dtype))
+            with open(staging / "records.jsonl", "w", encoding="utf-8") as f:
+                for chunk_id, document, metadata in zip(self._ids, self._documents, self._metadatas):
+                    f.write(json.dumps({"id": chunk_id, "document": document, "metadata": metadata}, ensure_ascii=False) + "\n")
+            os.replace(staging, self.root / generation)
+
+            current = self._current_file()
+            previous = current.read_text().strip() if current.exists() else None
+            pointer = self.root / f"CURRENT.{os.getpid()}.tmp"
+            pointer.write_text(generation)
+            os.replace(pointer, current)
+
+            # Keep the previous generation, which readers may still have mmap'd, and
+            # leave other writers' ".gen-*.tmp" staging directories alone
+            keep = {generation, previous, self._loaded_generation}
+            for old in self.root.iterdir():
+                if old.is_dir() and old.name.startswith("gen-") and old.name not in keep:
+                    shutil.rmtree(old, ignore_errors=True)
+
+            self._dirty = False
+            self._loaded_generation = generation
+            self._current_mtime = self._current_file().stat().st_mtime_ns
+            self._vectors = np.load(self.root / generation / "vectors.npy", mmap_mode="r")
+
+    def defer_writes(self):
+        with self._lock:
+            self._deferred = True
+
+    def _written(self):
+        self._dirty = True
+        self._filter_rows = {}
+        if not self._deferred:
+            self.flush()
+
+    def _writable(self):
+        if not self._vectors.flags.writeable:
+            self._vectors = np.array(self._vectors, dtype=self.dtype)
+
+    # -- helpers --------------------------------------------------------------
+
+    def _normalize(self, embeddings) -> np.ndarray:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if self.embedding_function is None:
+            raise ValueError("FlatVectorStore needs embeddings or an embedding_function")
+        return self.embedding_function(texts)
+
+    def _rows_matching(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """Row indices passing `where`, cached per filter until the next write."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True)
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            rows = np.array([i for i, metadata in enumerate(self._metadatas) if matches_where(metadata, where)], dtype=np.int64)
+            self._filter_rows[key] = rows
+        return rows
+
+    def _scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        matrix = self._vectors if rows is None else self._vectors[rows]
+        if matrix.dtype == np.float32:
+            return matrix @ query
+        scores = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], _SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + _SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + block.shape[0]] = block @ query
+        return scores
+
+    # -- VectorStore API ------------------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            self._maybe_reload()
+            return len(self._ids)
+
+    def get(self, ids=None, where=None, include=None) -> dict:
+        include = ["documents", "metadatas"] if include is None else include
+        with self._lock:
+            self._maybe_reload()
+            if ids is not None:
+                rows = [self._index[i] for i in ids if i in self._index]
+            else:
+                rows = range(len(self._ids))
+            rows = [r for r in rows if matches_where(self._metadatas[r], where)]
+
+            result = {"ids": [self._ids[r] for r in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[r] for r in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [dict(self._metadatas[r]) for r in rows]
+            if "embeddings" in include:
+                result["embeddings"] = [np.asarray(self._vectors[r], dtype=np.float32).tolist() for r in rows]
+            return result
+
+    def upsert(self, ids, documents, metadatas, embeddings=None):
+        # Like Chroma, a repeated id in one call keeps its last copy
+        last_row = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        if len(last_row) != len(ids):
+            keep = sorted(last_row.values())
+            ids = [ids[i] for i in keep]
+            documents = [documents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            if embeddings is not None:
+                embeddings = [embeddings[i] for i in keep]
+        if embeddings is None:
+            embeddings = self._embed(documents)
+        vectors = self._normalize(embeddings).astype(self.dtype)
+
+        with self._lock:
+            self._maybe_reload()
+            if len(self._ids) == 0:
+                self._vectors = np.zeros((0, vectors.shape[1]), dtype=self.dtype)
+            elif vectors.shape[1] != self._vectors.shape[1]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index ({self._vectors.shape[1]})")
+            self._writable()
+
+            new_rows = []
+            for i, chunk_id in enumerate(ids):
+                row = self._index.get(chunk_id)
+                if row is None:
+                    self._index[chunk_id] = len(self._ids) + len(new_rows)
+                    new_rows.append(i)
+                    continue
+                self._vectors[row] = vectors[i]
+                self._documents[row] = documents[i]
+                self._metadatas[row] = dict(metadatas[i])
+
+            if new_rows:
+                self._vectors = np.vstack([self._vectors, vectors[new_rows]])
+                for i in new_rows:
+                    self._ids.append(ids[i])
+                    self._documents.append(documents[i])
+                    self._metadatas.append(dict(metadatas[i]))
+            self._written()
+
+    def update(self, ids, metadatas):
+        with self._lock:
+            self._maybe_reload()
+            for chunk_id, metadata in zip(ids, metadatas):
+                row = self._index.get(chunk_id)
+                if row is not None:
+                    self._metadatas[row] = dict(metadata)
+            self._written()
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            self._maybe_reload()
+            targets = set(self.get(ids=ids, where=where, include=[])["ids"]) if (ids is not None or where) else set(self._ids)
+            if not targets:
+                return
+            keep = [i for i, chunk_id in enumerate(self._ids) if chunk_id not in targets]
+            self._vectors = np.array(self._vectors[keep], dtype=self.dtype) if keep else np.zeros((0, self._vectors.shape[1]), dtype=self.dtype)
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._index = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+            self._written()
+
+    def query(self, query_embeddings=None, n_results=10, where=None, query_texts=None) -> dict:
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts)
+        queries = self._normalize(query_embeddings)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            self._maybe_reload()
+            rows = self._rows_matching(where)
+            pool = len(self._ids) if rows is None else len(rows)
+
+            for query in queries:
+                if pool == 0 or n_results <= 0:
+                    picked, distances = [], []
+                else:
+                    scores = self._scores(query, rows)
+                    k = min(n_results, pool)
+                    top = np.argpartition(-scores, k - 1)[:k] if k < pool else np.arange(pool)
+                    top = top[np.argsort(-scores[top], kind="stable")]
+                    picked = top if rows is None else rows[top]
+                    # squared L2 between unit vectors, matching Chroma's default space
+                    distances = (2.0 - 2.0 * scores[top]).clip(min=0.0).tolist()
+
+                result["ids"].append([self._ids[r] for r in picked])
+                result["documents"].append([self._documents[r] for r in picked])
+                result["metadatas"].append([dict(self._metadatas[r]) for r in picked])
+                result["distances"].append(distances)
+        return result
+
+    def delete_all(self):
+        with self._lock:
+            dim = self._vectors.shape[1] if self._vectors.ndim == 2 else 0
+            self._reset_state(dim)
+            self._written()
+
+    def memory_bytes(self) -> int:
+        """Size of the vector matrix (mapped from disk when clean)."""
+        return int(self._vectors.nbytes)
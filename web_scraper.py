@@ -1,9 +1,157 @@
 import trafilatura
 from urllib.parse import urljoin, urlparse
+import hashlib
+import heapq
+import json
+import os
 import time
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
 from html import unescape
+from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+from xml.etree import ElementTree
+
+from html_cache import HtmlCache
+from extraction_pipeline import extract_html_text, get_extraction_pipeline
+
+BASE_URL = "https://grest.in"
+BASE_DOMAIN = "grest.in"
+
+SEED_PAGES = [
+    "https://grest.in",
+    "https://grest.in/collections/iphones",
+    "https://grest.in/collections/macbook",
+    "https://grest.in/collections/all",
+    "https://grest.in/pages/about",
+    "https://grest.in/pages/faqs",
+    "https://grest.in/pages/contact-us",
+    "https://grest.in/pages/warranty-policy",
+    "https://grest.in/policies/refund-policy",
+    "https://grest.in/policies/shipping-policy",
+    "https://grest.in/blogs/news",
+    "https://grest.in/blogs/news/how-much-storage-do-you-really-need-in-a-refurbished-iphone-64gb-vs-128gb-vs-256gb",
+    "https://grest.in/blogs/news/refurbished-iphone-conditions-fair-good-superb",
+    "https://grest.in/blogs/news/why-refurbished-macbooks-are-a-smart-investment-for-freelancers-startups",
+    "https://grest.in/blogs/news/how-to-choose-the-best-refurbished-ipad-air-vs-mini-vs-pro-what-s-right-for-you",
+    "https://grest.in/blogs/news/trade-in-vs-buying-a-refurbished-iphone-which-route-gives-you-better-value",
+    "https://grest.in/blogs/news/best-time-season-to-buy-a-refurbished-iphone-in-india-festival-deals-to-year-end-discounts",
+]
+
+# Shopify serves a sitemap index pointing at product, collection, page and blog sitemaps
+SITEMAP_PATH = "/sitemap.xml"
+SITEMAP_MAX_FILES = 20
+
+SKIP_EXTENSIONS = ['.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.woff', '.woff2', '.ttf', '.ico', '.webp']
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Crawl concurrency: worker threads overall, simultaneous requests per host,
+# and the minimum gap between request starts to the same host.
+CRAWL_WORKERS = int(os.environ.get("CRAWL_WORKERS", 8))
+CRAWL_PER_HOST_CONCURRENCY = int(os.environ.get("CRAWL_PER_HOST_CONCURRENCY", 4))
+CRAWL_MIN_INTERVAL_SECONDS = float(os.environ.get("CRAWL_MIN_INTERVAL_SECONDS", 0.1))
+
+# URL -> ETag / Last-Modified / content hash / links / cleaned text from the last
+# crawl, used to send conditional requests and reuse the result on 304.
+HTTP_VALIDATORS_FILE = Path(os.environ.get("CRAWL_VALIDATORS_FILE", "knowledge_base/http_validators.json"))
+
+_crawl_session = None
+_crawl_session_lock = threading.Lock()
+
+
+def get_crawl_session() -> requests.Session:
+    """Shared HTTP session for crawling (keep-alive connection pool sized for the workers)."""
+    global _crawl_session
+    with _crawl_session_lock:
+        if _crawl_session is None:
+            session = requests.Session()
+            session.headers.update(REQUEST_HEADERS)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(CRAWL_WORKERS, CRAWL_PER_HOST_CONCURRENCY))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _crawl_session = session
+        return _crawl_session
+
+
+class HostLimiter:
+    """Per-host politeness: caps concurrent requests and spaces out request starts."""
+    
+    def __init__(self, per_host: int = CRAWL_PER_HOST_CONCURRENCY, min_interval: float = CRAWL_MIN_INTERVAL_SECONDS):
+        self.per_host = max(1, per_host)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+    
+    @contextmanager
+    def slot(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start_at = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start_at + self.min_interval
+            if start_at > now:
+                time.sleep(start_at - now)
+            yield
+
+
+class ValidatorStore:
+    """
+    Persistent HTTP validators per crawled URL.
+    
+    Each entry holds the response's ETag and Last-Modified headers plus what the
+    crawler extracted from that response (cleaned text, its hash and the page's
+    links), so a 304 Not Modified can stand in for the full page.
+    """
+    
+    def __init__(self, path: Path = HTTP_VALIDATORS_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read {self.path}, starting without validators: {e}")
+    
+    def get(self, url: str) -> dict:
+        with self._lock:
+            return self._entries.get(url.rstrip('/'))
+    
+    def update(self, url: str, etag: str, last_modified: str, content: str, links: list, lastmod: str = None):
+        with self._lock:
+            self._entries[url.rstrip('/')] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "lastmod": lastmod,
+                "content_hash": hashlib.md5(content.encode()).hexdigest(),
+                "links": links,
+                "content": content,
+            }
+    
+    def save(self, keep_urls: set = None):
+        """Write the store atomically, keeping only keep_urls if given."""
+        with self._lock:
+            if keep_urls is not None:
+                keep = {url.rstrip('/') for url in keep_urls}
+                self._entries = {url: entry for url, entry in self._entries.items() if url in keep}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
 
 
 def is_printable_text(text: str, threshold: float = 0.85) -> bool:
@@ -14,41 +162,63 @@ def is_printable_text(text: str, threshold: float = 0.85) -> bool:
     return (printable_chars / len(text)) >= threshold
 
 
-def fetch_page_content(url: str, timeout: int = 15) -> str:
+def fetch_page(url: str, timeout: int = 15, session: requests.Session = None, validator: dict = None) -> dict:
     """
-    Fetch page content using requests with proper encoding handling.
-    Returns decoded HTML string or empty string on failure.
+    Fetch a page, conditionally if a stored validator is given.
+    
+    Returns {"html", "not_modified", "etag", "last_modified"}; html is the decoded
+    page or an empty string on failure, not_modified is True on a 304 response.
     """
+    result = {"html": "", "not_modified": False, "etag": None, "last_modified": None}
+    headers = {}
+    if validator:
+        if validator.get("etag"):
+            headers['If-None-Match'] = validator["etag"]
+        if validator.get("last_modified"):
+            headers['If-Modified-Since'] = validator["last_modified"]
+    
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
+        if session is not None:
+            response = session.get(url, headers=headers, timeout=timeout)
+        else:
+            response = requests.get(url, headers={**REQUEST_HEADERS, **headers}, timeout=timeout)
         
-        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and headers:
+            result["not_modified"] = True
+            return result
         response.raise_for_status()
         
         content_type = response.headers.get('Content-Type', '')
         if not any(t in content_type.lower() for t in ['text/html', 'text/plain', 'application/xhtml']):
             print(f"  Skipping non-HTML content type: {content_type}")
-            return ""
+            return result
         
         response.encoding = response.apparent_encoding or 'utf-8'
         html = response.text
         
         if not is_printable_text(html[:1000] if len(html) > 1000 else html, threshold=0.80):
             print(f"  Content appears to be binary or encoded, skipping")
-            return ""
+            return result
         
-        return html
+        result["html"] = html
+        result["etag"] = response.headers.get('ETag')
+        result["last_modified"] = response.headers.get('Last-Modified')
+        return result
         
     except requests.RequestException as e:
         print(f"  Request error: {e}")
-        return ""
+        return result
     except Exception as e:
         print(f"  Error fetching {url}: {e}")
-        return ""
+        return result
+
+
+def fetch_page_content(url: str, timeout: int = 15, session: requests.Session = None) -> str:
+    """
+    Fetch page content using requests with proper encoding handling.
+    Returns decoded HTML string or empty string on failure.
+    """
+    return fetch_page(url, timeout=timeout, session=session)["html"]
 
 
 def extract_text_from_html(html: str) -> str:
@@ -80,35 +250,58 @@ def extract_text_from_html(html: str) -> str:
     return text
 
 
+def extract_page_text(html: str) -> str:
+    """
+    Extract main text content from page HTML.
+    Uses trafilatura, falling back to plain tag stripping.
+    """
+    text = trafilatura.extract(
+        html, 
+        include_links=False, 
+        include_images=False,
+        include_tables=True,
+        no_fallback=False
+    )
+    
+    if text and len(text.strip()) > 100 and is_printable_text(text):
+        return text
+    
+    fallback_text = extract_text_from_html(html)
+    if len(fallback_text) > 200 and is_printable_text(fallback_text):
+        return fallback_text
+    
+    return ""
+
+
+def fetch_page_html(url: str, session: requests.Session = None) -> str:
+    """
+    Download a page once: requests first, trafilatura's fetcher only if that fails.
+    Returns the HTML or an empty string.
+    """
+    html = fetch_page_content(url, session=session)
+    if html:
+        return html
+    return fetch_page_fallback(url)
+
+
+def fetch_page_fallback(url: str) -> str:
+    """Download a page with trafilatura's fetcher, used when requests fails."""
+    downloaded = trafilatura.fetch_url(url)
+    if downloaded and is_printable_text(downloaded[:500] if len(downloaded) > 500 else downloaded):
+        return downloaded
+    return ""
+
+
 def get_website_text_content(url: str) -> str:
     """
     Extract main text content from a website URL.
     Uses requests for fetching and trafilatura for extraction.
     """
     try:
-        html = fetch_page_content(url)
-        if not html:
-            downloaded = trafilatura.fetch_url(url)
-            if downloaded and is_printable_text(downloaded[:500] if len(downloaded) > 500 else downloaded):
-                html = downloaded
-            else:
-                return ""
+        html = fetch_page_html(url)
         
         if html:
-            text = trafilatura.extract(
-                html, 
-                include_links=False, 
-                include_images=False,
-                include_tables=True,
-                no_fallback=False
-            )
-            
-            if text and len(text.strip()) > 100 and is_printable_text(text):
-                return text
-            
-            fallback_text = extract_text_from_html(html)
-            if len(fallback_text) > 200 and is_printable_text(fallback_text):
-                return fallback_text
+            return extract_page_text(html)
                 
         return ""
     except Exception as e:
@@ -163,80 +356,261 @@ def clean_extracted_text(text: str) -> str:
     return '\n'.join(cleaned_lines)
 
 
-def scrape_grest_website(max_pages: int = 50) -> list:
+def crawl_priority(url: str) -> int:
     """
-    Scrape the GREST website and return a list of documents.
-    Each document contains the URL and its text content.
+    Crawl order for a URL, lower first. Mirrors the knowledge base's source
+    authority: policies, FAQs, contact/about, other pages, then collections,
+    products and blogs.
     """
-    base_url = "https://grest.in"
-    base_domain = "grest.in"
-    
-    common_pages = [
-        "https://grest.in",
-        "https://grest.in/collections/iphones",
-        "https://grest.in/collections/macbook",
-        "https://grest.in/collections/all",
-        "https://grest.in/pages/about",
-        "https://grest.in/pages/faqs",
-        "https://grest.in/pages/contact-us",
-        "https://grest.in/pages/warranty-policy",
-        "https://grest.in/policies/refund-policy",
-        "https://grest.in/policies/shipping-policy",
-        "https://grest.in/blogs/news",
-        "https://grest.in/blogs/news/how-much-storage-do-you-really-need-in-a-refurbished-iphone-64gb-vs-128gb-vs-256gb",
-        "https://grest.in/blogs/news/refurbished-iphone-conditions-fair-good-superb",
-        "https://grest.in/blogs/news/why-refurbished-macbooks-are-a-smart-investment-for-freelancers-startups",
-        "https://grest.in/blogs/news/how-to-choose-the-best-refurbished-ipad-air-vs-mini-vs-pro-what-s-right-for-you",
-        "https://grest.in/blogs/news/trade-in-vs-buying-a-refurbished-iphone-which-route-gives-you-better-value",
-        "https://grest.in/blogs/news/best-time-season-to-buy-a-refurbished-iphone-in-india-festival-deals-to-year-end-discounts",
-    ]
+    path = urlparse(url).path.lower()
+    if path.startswith('/policies/') or path.startswith('/pages/warranty'):
+        return 0
+    if path.startswith('/pages/faq'):
+        return 1
+    if any(x in path for x in ['contact', 'about']):
+        return 2
+    if path.startswith('/pages/') or path in ('', '/'):
+        return 3
+    if path.startswith('/collections/'):
+        return 4
+    if path.startswith('/products/'):
+        return 5
+    if path.startswith('/blogs/'):
+        return 6
+    return 7
+
+
+class CrawlFrontier:
+    """URLs waiting to be crawled, popped by crawl_priority then discovery order."""
     
-    skip_extensions = ['.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.woff', '.woff2', '.ttf', '.ico', '.webp']
+    def __init__(self):
+        self._heap = []
+        self._queued = set()
     
-    visited = set()
-    to_visit = common_pages.copy()
-    documents = []
+    def push(self, url: str) -> bool:
+        normalized = url.rstrip('/')
+        if normalized in self._queued:
+            return False
+        self._queued.add(normalized)
+        heapq.heappush(self._heap, (crawl_priority(url), len(self._queued), url))
+        return True
     
-    print(f"Starting to scrape {base_url}...")
+    def pop(self) -> str:
+        return heapq.heappop(self._heap)[2]
     
-    while to_visit and len(visited) < max_pages:
-        url = to_visit.pop(0)
-        
-        normalized_url = url.rstrip('/')
-        if normalized_url in visited:
+    def __len__(self):
+        return len(self._heap)
+
+
+def fetch_sitemap_entries(session: requests.Session = None, sitemap_url: str = None) -> dict:
+    """
+    Read the site's sitemap (following a sitemap index one level down).
+    Returns url -> lastmod (or None) for same-domain, crawlable URLs.
+    """
+    session = session or get_crawl_session()
+    pending = [sitemap_url or BASE_URL + SITEMAP_PATH]
+    entries = {}
+    files_read = 0
+    
+    while pending and files_read < SITEMAP_MAX_FILES:
+        url = pending.pop(0)
+        files_read += 1
+        try:
+            response = session.get(url, timeout=15)
+            response.raise_for_status()
+            root = ElementTree.fromstring(response.content)
+        except (requests.RequestException, ElementTree.ParseError) as e:
+            print(f"  Could not read sitemap {url}: {e}")
             continue
-            
-        visited.add(normalized_url)
-        
-        print(f"Scraping ({len(visited)}/{max_pages}): {url}")
-        
-        content = get_website_text_content(url)
-        
-        if content and len(content.strip()) > 100:
-            cleaned_content = clean_extracted_text(content)
-            if len(cleaned_content) > 100 and is_printable_text(cleaned_content):
-                documents.append({
-                    "url": url,
-                    "content": cleaned_content,
-                    "source": "website"
-                })
-                print(f"  - Found {len(cleaned_content)} chars of content")
-            else:
-                print(f"  - Content failed quality check, skipping")
-        
-        new_links = get_all_links(url, base_domain)
-        for link in new_links:
-            normalized_link = link.rstrip('/')
-            if any(ext in normalized_link.lower() for ext in skip_extensions):
-                continue
-            if '/cdn/' in normalized_link:
+        
+        for element in root:
+            tag = element.tag.rsplit('}', 1)[-1]
+            fields = {child.tag.rsplit('}', 1)[-1]: (child.text or "").strip() for child in element}
+            loc = fields.get("loc")
+            if not loc:
                 continue
-            if normalized_link not in visited and link not in to_visit:
-                to_visit.append(link)
+            if tag == "sitemap":
+                pending.append(loc)
+            elif tag == "url" and BASE_DOMAIN in urlparse(loc).netloc and should_follow_link(loc):
+                entries[loc.rstrip('/')] = fields.get("lastmod") or None
+    
+    return entries
+
+
+def should_follow_link(link: str) -> bool:
+    """Skip static assets and CDN paths when crawling."""
+    normalized_link = link.rstrip('/').lower()
+    if any(ext in normalized_link for ext in SKIP_EXTENSIONS):
+        return False
+    return '/cdn/' not in normalized_link
+
+
+def page_text_from_html(html: str) -> str:
+    """
+    Extracted, cleaned page text that passes the quality checks, or an empty string.
+    """
+    content = extract_page_text(html)
+    if content and len(content.strip()) > 100:
+        cleaned_content = clean_extracted_text(content)
+        if len(cleaned_content) > 100 and is_printable_text(cleaned_content):
+            return cleaned_content
+    return ""
+
+
+def crawl_page(url: str, session: requests.Session = None, limiter: HostLimiter = None,
+               validators: ValidatorStore = None, conditional: bool = False, lastmod: str = None,
+               html_cache: HtmlCache = None) -> dict:
+    """
+    Fetch one page and extract both its text and its internal links from the same HTML.
+    Returns {"url", "content", "links", "not_modified"}; content is empty if the page
+    has no usable text.
+    
+    With a validator store, the response's ETag/Last-Modified and extraction result
+    are recorded. If conditional is also set, the request carries If-None-Match /
+    If-Modified-Since and a 304 reuses the stored text and links without extracting
+    (the entry's lastmod is still updated).
+    Downloaded HTML is kept in html_cache if one is given. Text extraction runs
+    in the extraction pipeline's worker processes.
+    """
+    page = {"url": url, "content": "", "links": [], "not_modified": False}
+    try:
+        validator = validators.get(url) if (validators is not None and conditional) else None
+        if limiter is not None:
+            with limiter.slot(url):
+                response = fetch_page(url, session=session, validator=validator)
+        else:
+            response = fetch_page(url, session=session, validator=validator)
+        
+        if response["not_modified"]:
+            page["content"] = validator.get("content", "")
+            page["links"] = validator.get("links", [])
+            page["not_modified"] = True
+            print(f"  - {url}: not modified")
+            # Record the new sitemap lastmod so the next crawl can skip the request
+            validators.update(url, response["etag"] or validator.get("etag"),
+                              response["last_modified"] or validator.get("last_modified"),
+                              page["content"], page["links"], lastmod or validator.get("lastmod"))
+            return page
+        
+        html = response["html"]
+        if not html:
+            html = fetch_page_fallback(url)
+        if not html:
+            return page
+        
+        if html_cache is not None:
+            html_cache.put(url, html)
+        
+        page["links"] = get_all_links(url, BASE_DOMAIN, html=html)
+        
+        page["content"] = get_extraction_pipeline().run(extract_html_text, html)
+        if page["content"]:
+            print(f"  - {url}: {len(page['content'])} chars of content")
+        else:
+            print(f"  - {url}: no content passed the quality check, skipping")
         
-        time.sleep(0.3)
+        if validators is not None and (response["etag"] or response["last_modified"] or lastmod):
+            validators.update(url, response["etag"], response["last_modified"], page["content"], page["links"], lastmod)
+    except Exception as e:
+        print(f"Error processing {url}: {e}")
+    return page
+
+
+def scrape_grest_website(max_pages: int = 50, workers: int = CRAWL_WORKERS, conditional: bool = False,
+                         use_sitemap: bool = True) -> list:
+    """
+    Scrape the GREST website and return a list of documents.
+    Each document contains the URL and its text content.
+    
+    The frontier is seeded from sitemap.xml (with lastmod) plus SEED_PAGES and
+    grows with links found on crawled pages. URLs are taken in crawl_priority
+    order - policies, FAQs and about pages before collections, products and
+    blogs - so the max_pages budget goes to the most authoritative pages first.
+    A pool of worker threads shares one keep-alive session, with per-host
+    politeness limits (CRAWL_PER_HOST_CONCURRENCY, CRAWL_MIN_INTERVAL_SECONDS).
+    Each page is downloaded once. Documents are returned in crawl order.
+    
+    Downloaded HTML goes to the raw HTML cache (html_cache.HTML_CACHE_DIR) so the
+    knowledge base can be rebuilt offline. HTTP validators are recorded in
+    HTTP_VALIDATORS_FILE on every crawl. With
+    conditional=True, pages whose sitemap lastmod matches the last crawl are not
+    requested at all, other pages are requested conditionally; documents for
+    either carry the previously extracted text and "not_modified": True.
+    max_pages counts requested pages only; up to max_pages further unchanged
+    pages are skipped, after which they are requested conditionally too.
+    """
+    session = get_crawl_session()
+    limiter = HostLimiter()
+    validators = ValidatorStore()
+    html_cache = HtmlCache()
+    
+    print(f"Starting to scrape {BASE_URL} with {workers} workers...")
+    start = time.perf_counter()
+    
+    sitemap = fetch_sitemap_entries(session) if use_sitemap else {}
+    if sitemap:
+        print(f"  Sitemap lists {len(sitemap)} pages")
+    
+    frontier = CrawlFrontier()
+    for url in list(sitemap) + SEED_PAGES:
+        frontier.push(url)
+    
+    crawl_order = {}
+    pages = {}
+    fetched = 0
+    skipped = 0
+    
+    def add_page(url: str, page: dict):
+        if page["content"]:
+            pages[url] = page
+        for link in page["links"]:
+            if should_follow_link(link):
+                frontier.push(link)
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="crawler") as pool:
+        in_flight = {}
+        while frontier or in_flight:
+            while frontier and len(in_flight) < workers and fetched < max_pages:
+                url = frontier.pop()
+                crawl_order[url] = len(crawl_order)
+                lastmod = sitemap.get(url.rstrip('/'))
+                
+                entry = validators.get(url) if conditional else None
+                if entry and lastmod and entry.get("lastmod") == lastmod and skipped < max_pages:
+                    skipped += 1
+                    print(f"Skipping ({skipped}/{max_pages}): {url} (lastmod unchanged)")
+                    add_page(url, {"url": url, "content": entry.get("content", ""),
+                                   "links": entry.get("links", []), "not_modified": True})
+                    continue
+                
+                fetched += 1
+                print(f"Scraping ({fetched}/{max_pages}): {url}")
+                in_flight[pool.submit(crawl_page, url, session, limiter, validators, conditional,
+                                       lastmod, html_cache)] = url
+            
+            if not in_flight:
+                break
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = in_flight.pop(future)
+                add_page(url, future.result())
+    
+    documents = [
+        {"url": url, "content": pages[url]["content"], "source": "website", "not_modified": pages[url]["not_modified"]}
+        for url in sorted(pages, key=crawl_order.get)
+    ]
+    
+    try:
+        validators.save(keep_urls=set(crawl_order))
+        html_cache.save(keep_urls=set(crawl_order))
+    except OSError as e:
+        print(f"Warning: could not save crawl state: {e}")
     
-    print(f"Scraping complete. Found {len(documents)} pages with content.")
+    elapsed = time.perf_counter() - start
+    not_modified = sum(1 for doc in documents if doc["not_modified"])
+    print(f"Scraping complete. Found {len(documents)} pages with content, {not_modified} not modified "
+          f"({fetched} fetched in {elapsed:.1f}s).")
     return documents
 
 
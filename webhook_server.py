@@ -19,31 +19,66 @@ from channel_handlers import (
     process_channel_message,
     get_channel_status
 )
-from chatbot_engine import generate_response, generate_response_stream, generate_conversation_summary, fix_typos_with_llm
+from chatbot_engine import generate_response, generate_response_stream, fix_typos_with_llm
 from conversation_logger import log_feedback, log_conversation, ensure_session_exists
-from database import get_or_create_user, get_user_conversation_history, get_conversation_summary, upsert_conversation_summary
-from knowledge_base import initialize_knowledge_base, get_knowledge_base_stats
-from sync_manager import start_sync_manager, get_sync_manager
+from database import get_or_create_user, get_user_conversation_history, get_conversation_summary
+from knowledge_base import initialize_knowledge_base, get_knowledge_base_stats, ingest_website_content
+from kb_snapshot import restore_latest_snapshot
+from sync_manager import start_sync_manager, get_sync_manager, export_knowledge_base_snapshot
 from rate_limiter import rate_limiter, get_client_ip
+from summary_worker import get_summary_worker
 
 app = Flask(__name__)
 CORS(app)
 
+def _crawl_knowledge_base_in_background():
+    """Crawl the website into the knowledge base off the startup path, then snapshot it."""
+    def crawl():
+        try:
+            chunks = ingest_website_content(max_pages=50, clear_existing=False)
+            print(f"[Startup] Background website crawl added {chunks} chunks")
+            if chunks:
+                export_knowledge_base_snapshot("startup_crawl")
+        except Exception as e:
+            print(f"[Startup] Warning: Background website crawl failed: {e}")
+    
+    from threading import Thread
+    Thread(target=crawl, name="kb-startup-crawl", daemon=True).start()
+
+
 def init_knowledge_base_on_startup():
-    """Initialize knowledge base on startup if empty (for autoscale cold starts)."""
+    """
+    Initialize knowledge base on startup if empty (for autoscale cold starts).
+    
+    Restores the newest snapshot from kb_snapshots/ when one exists; otherwise
+    loads the bundled documents and crawls the website in the background, so
+    the server can start serving immediately.
+    """
     try:
         stats = get_knowledge_base_stats()
-        if stats["total_chunks"] == 0:
-            print("[Startup] Knowledge base is empty, rebuilding from website...")
-            initialize_knowledge_base(force_refresh=False, enable_web_scrape=True)
-            stats = get_knowledge_base_stats()
-            print(f"[Startup] Knowledge base rebuilt with {stats['total_chunks']} chunks")
-        else:
+        if stats["total_chunks"] > 0:
             print(f"[Startup] Knowledge base ready with {stats['total_chunks']} chunks")
+            return
+        
+        print("[Startup] Knowledge base is empty, restoring from snapshot...")
+        snapshot = restore_latest_snapshot()
+        if snapshot:
+            print(f"[Startup] Knowledge base restored from {snapshot['file']} "
+                  f"({snapshot['restored_chunks']} chunks, built {snapshot['created_at']})")
+            return
+        
+        print("[Startup] No snapshot available, loading documents and crawling website in background...")
+        initialize_knowledge_base(force_refresh=False, enable_web_scrape=False)
+        stats = get_knowledge_base_stats()
+        print(f"[Startup] Knowledge base serving {stats['total_chunks']} document chunks while the crawl runs")
+        _crawl_knowledge_base_in_background()
     except Exception as e:
         print(f"[Startup] Warning: Failed to initialize knowledge base: {e}")
 
-init_knowledge_base_on_startup()
+# Extraction worker processes (extraction_pipeline, started with "spawn") re-run
+# this script as __mp_main__; only the server process runs the startup tasks.
+if __name__ != "__mp_main__":
+    init_knowledge_base_on_startup()
 
 def init_sync_manager():
     """Initialize the sync manager to run automatic syncs every 6 hours."""
@@ -53,7 +88,8 @@ def init_sync_manager():
     except Exception as e:
         print(f"[Startup] Warning: Failed to start SyncManager: {e}")
 
-init_sync_manager()
+if __name__ != "__mp_main__":
+    init_sync_manager()
 
 conversation_histories = {}
 
@@ -273,19 +309,11 @@ def api_chat():
     if len(conversation_histories[session_id]) > 100:
         conversation_histories[session_id] = conversation_histories[session_id][-100:]
     
-    if user_id and len(conversation_histories[session_id]) >= 4:
+    if user_id:
         try:
-            summary = generate_conversation_summary(conversation_histories[session_id])
-            if summary:
-                upsert_conversation_summary(
-                    user_id=user_id,
-                    emotional_themes=summary.get('emotional_themes'),
-                    recommended_programs=summary.get('recommended_programs'),
-                    last_topics=summary.get('last_topics'),
-                    conversation_status=summary.get('conversation_status')
-                )
+            get_summary_worker().notify(user_id, conversation_histories[session_id])
         except Exception as e:
-            print(f"Error updating conversation summary: {e}")
+            print(f"Error scheduling conversation summary: {e}")
     
     return jsonify({
         "response": result.get("response", "I apologize, but I encountered an issue. Please try again."),
@@ -430,19 +458,11 @@ def api_chat_stream():
         if len(conversation_histories[session_id]) > 100:
             conversation_histories[session_id] = conversation_histories[session_id][-100:]
         
-        if user_id and len(conversation_histories[session_id]) >= 4:
+        if user_id:
             try:
-                summary = generate_conversation_summary(conversation_histories[session_id])
-                if summary:
-                    upsert_conversation_summary(
-                        user_id=user_id,
-                        emotional_themes=summary.get('emotional_themes'),
-                        recommended_programs=summary.get('recommended_programs'),
-                        last_topics=summary.get('last_topics'),
-                        conversation_status=summary.get('conversation_status')
-                    )
+                get_summary_worker().notify(user_id, conversation_histories[session_id])
             except Exception as e:
-                print(f"Error updating conversation summary: {e}")
+                print(f"Error scheduling conversation summary: {e}")
     
     return Response(
         generate(),
@@ -912,8 +932,13 @@ def admin_sync_history():
                     "productsCreated": run.products_created or 0,
                     "productsUpdated": run.products_updated or 0,
                     "productsDeleted": run.products_deleted or 0,
+                    "productsUnchanged": run.products_unchanged,
                     "shopifyCount": run.shopify_product_count,
                     "dbCount": run.db_product_count,
+                    "syncMode": run.sync_mode or "full",
+                    "apiCalls": run.api_calls,
+                    "apiCallsSaved": run.api_calls_saved,
+                    "secondsSaved": run.seconds_saved,
                     "duration": duration,
                     "errorLog": run.error_log
                 })
@@ -952,7 +977,8 @@ def admin_sync_run():
             sync_run = SyncRun(
                 trigger_source='manual',
                 triggered_by=triggered_by,
-                status='running'
+                status='running',
+                sync_mode='full'
             )
             db.add(sync_run)
             db.flush()
@@ -1041,9 +1067,11 @@ def _execute_sync(run_id: int):
                 sync_run.status = status
                 sync_run.products_created = created_count
                 sync_run.products_updated = updated_count
+                sync_run.products_unchanged = result.get('variants_unchanged')
                 sync_run.products_deleted = deleted_count
                 sync_run.shopify_product_count = shopify_count
                 sync_run.db_product_count = db_count
+                sync_run.api_calls = result.get('api_calls')
             
             event = SyncRunEvent(
                 sync_run_id=run_id,
@@ -1062,6 +1090,7 @@ def _execute_sync(run_id: int):
                 "variantsProcessed": shopify_count,
                 "variantsCreated": created_count,
                 "variantsUpdated": updated_count,
+                "variantsUnchanged": result.get('variants_unchanged'),
                 "variantsDeleted": deleted_count,
                 "dbCount": db_count,
             }
@@ -1339,6 +1368,28 @@ def rate_limiter_stats():
     return jsonify(rate_limiter.get_stats())
 
 
+@app.route("/api/admin/summary-worker/stats", methods=["GET"])
+def summary_worker_stats():
+    """Get conversation summary queue depth, lag and outcome counters."""
+    if not validate_internal_api_key():
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    return jsonify(get_summary_worker().get_stats())
+
+@app.route("/api/admin/retrieval-cache/stats", methods=["GET"])
+def retrieval_cache_stats():
+    """Get retrieval result cache and query embedding cache hit rates."""
+    if not validate_internal_api_key():
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    from retrieval_cache import get_retrieval_cache
+    from embedding_service import get_embedding_service
+    return jsonify({
+        "retrieval_cache": get_retrieval_cache().get_stats(),
+        "query_embeddings": get_embedding_service().get_stats()
+    })
+
+
 @app.route("/api/admin/rate-limiter/ip/<ip>", methods=["GET"])
 def rate_limiter_ip_activity(ip):
     """Get rate limiter activity for a specific IP."""